@@ -1,11 +1,13 @@
 # MACHINE LEARNING ALGORITHM FUNCTIONS USED BY MAIN.PY
 # STATUS: WORKING
-# LAST UPDATED: 16/06/2024
+# LAST UPDATED: 18/10/2026
 
 
 import os
-import time
+import pickle
 import logging
+import warnings
+import time as tm
 import traceback
 import numpy as np
 import pandas as pd
@@ -14,52 +16,44 @@ import matplotlib.pyplot as plt
 import seaborn as sb
 from datetime import datetime
 from itertools import compress
+from sklearn.base import clone
 from sklearn.pipeline import Pipeline
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, LeaveOneGroupOut, GroupKFold
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.feature_selection import SequentialFeatureSelector
 from sklearn.model_selection import GridSearchCV
 from sklearn.svm import SVC
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.naive_bayes import ComplementNB
-from sklearn.metrics import confusion_matrix, classification_report, accuracy_score
-from config import columns, feature_names, gesture_names
+from sklearn.metrics import confusion_matrix, classification_report, accuracy_score, precision_score, recall_score
+from joblib import Parallel, delayed
+from config import feature_names, gesture_names
+from Dataset import readFeatures, list_table_nums
+from ModelExport import exportModel, loadModel, model_filename
+from ModelSearch import PathFeatureSearchCV, HalvingSearchCV, CachedGridSearchCV, ResultCache, run_cached, fold_digest
+from SubsetSearch import rankSubsets, top_subsets, SubsetSelector
+from FeatureRanking import rankFeatures, top_features
+from Instrumentation import span
 
 
 default = False  # Enable to generate default metrics for all models using default parameters
 select = False  # Enable to select which gesture to use (if false use all gestures)
 gesture_selection = [0, 1, 2, 4]  # indexes of selected gestures
+export = True  # Enable to export the optimised model for online inference
 cv_splits = 10
+n_jobs = -1  # Number of processes used by the parallel search (-1 uses all cores)
+compare = False  # Enable to also time the exhaustive hyperparameter grid when using the halving search
+latency_samples = 200  # single-sample predictions timed per candidate by the latency-aware refit strategy
+latency_resolution = 0.05  # candidates within 5% of the lowest latency are equally cheap (timing noise)
+cache_filename = 'CV_Cache.sqlite'  # CV result cache, stored next to the .h5 file
+feature_ranking = True  # Enable to rank the features with filter methods (MI, ANOVA F, Fisher, ReliefF) before the wrapper feature search
+subset_candidates = 20  # best ranked subsets cross-validated with SVC by the exhaustive feature search
+shared_state = True  # Enable to evaluate KNN and SVC candidates from one neighbour graph / kernel matrix per fold in the parallel and halving searches
 
 logger = logging.getLogger(name=__name__)
 
 
-def list_table_nums(h5file: tb.File) -> list:
-    """
-    Get new table number based on existing tables in features group of .h5 file
-
-    STATUS: WORKING
-
-    : param h5file: .h5 file object
-    : type h5file: File object
-    : return: table number
-    : rtype: integer
-    """
-
-    nodes = []
-    for node in h5file:
-        nodes.append(str(object=node))
-
-    filtered_tables = list(filter(lambda x: '(Table' in x, nodes))
-    if not filtered_tables:  # no groups found
-        table_nums = []
-    else:
-        table_nums = [int((x.split(" ")[0]).split("_")[-1])for x in filtered_tables]
-
-    return table_nums
-
-
-def importData(hdfFile: str) -> pd.DataFrame:
+def importData(hdfFile: str, labels: list = None, sessions: bool = False) -> pd.DataFrame:
     """
     Open file for reading and import all tables from features group
 
@@ -67,7 +61,11 @@ def importData(hdfFile: str) -> pd.DataFrame:
 
     : param hdfFile: .h5 filename
     : type hdfFile: string
-    : return: pandas dataframe containing all feature data
+    : param labels: gesture labels to import, in the order rows should be returned (default: all labels)
+    : type labels: list
+    : param sessions: also import the session (table number) of each row as a 'session' column
+    : type sessions: boolean
+    : return: pandas dataframe containing the label and feature data
     : rtype: pd.DataFrame
     """
 
@@ -95,16 +93,15 @@ def importData(hdfFile: str) -> pd.DataFrame:
         # IMPORT DATA
         print("Importing data...")
         logger.info(msg=" Importing data...")
-        dataframes = []
-        table_nums = list_table_nums(h5file=h5file)
-        #combs = fset_combinations(table_nums=table_nums)
-        for table in table_nums:
-            table_name = "fset_" + str(object=table)
-            nodeObject = h5file.get_node(where="/features", name=table_name)
-            dataframes.append(pd.DataFrame.from_records(
-                data=nodeObject.read(), columns=columns))  # type: ignore
-        dataframe = pd.concat(objs=dataframes, ignore_index=True)
-        dataframe = dataframe.drop(labels='timestamp', axis=1)
+        with span(name='import_data') as s:
+            data = readFeatures(h5file=h5file, fields=['label'] + feature_names + (['session'] if sessions else []), labels=labels)
+            s.add(counter='rows_read', n=data.shape[0])
+            s.add(counter='bytes_read', n=data.nbytes)
+        if labels is not None and data.shape[0]:  # group rows by label in the requested order
+            order = np.zeros(shape=np.iinfo(data['label'].dtype).max + 1, dtype=np.intp)
+            order[labels] = np.arange(start=0, stop=len(labels), step=1)
+            data = data[np.argsort(order[data['label']], kind='stable')]
+        dataframe = pd.DataFrame(data=data)
     except:
         print("EXCEPTION OCCURED WHILE IMPORTING DATA!\n")
         logger.info(msg=" EXCEPTION OCCURED WHILE IMPORTING DATA!\n")
@@ -180,6 +177,138 @@ def refit_strategy(cv_results):
     return top_recall_and_precision_index
 
 
+def predict_latency(classifier, X: np.ndarray, samples: int = latency_samples) -> float:
+    """
+    Median single-sample predict latency [s] on numpy input, as in the online process
+
+    : rtype: float
+    """
+
+    X = np.asarray(X)
+    latencies = np.empty(shape=min(samples, X.shape[0]))
+    with warnings.catch_warnings():
+        warnings.simplefilter(action='ignore', category=UserWarning)  # fitted with feature names
+        classifier.predict(X[:1])  # warm-up
+        for i in range(0, latencies.shape[0], 1):
+            sample = X[i:i + 1]
+            start = tm.perf_counter()
+            classifier.predict(sample)
+            latencies[i] = tm.perf_counter() - start
+
+    return float(np.median(a=latencies))
+
+
+def latency_refit_strategy(estimator, X, y, latency_budget: float = None, size_budget: int = None, tolerance: float = None):
+    """
+    Build a refit strategy for online control: the cheapest model within an accuracy tolerance of the best recall
+
+    Every candidate within the tolerance is refitted on the training data to measure its single-sample predict latency
+    and pickled size (CV score times of shared or cached evaluations are not per candidate). Of the candidates within
+    both budgets, those within latency_resolution of the lowest latency are equally cheap and the one with the highest
+    precision + recall is selected. If no candidate is within the budgets all candidates are considered.
+
+    STATUS: WORKING
+
+    : param estimator: pipeline searched over, with a 'classifier' step
+    : type estimator: sklearn.pipeline.Pipeline
+    : param X: training data the search is fitted on
+    : type X: array-like
+    : param y: training labels
+    : type y: array-like
+    : param latency_budget: per-prediction latency budget [s] (default: no budget)
+    : type latency_budget: float
+    : param size_budget: pickled model size budget [bytes] (default: no budget)
+    : type size_budget: integer
+    : param tolerance: recall tolerance below the best recall (default: one standard deviation, as in refit_strategy)
+    : type tolerance: float
+    : return: refit callable taking cv_results and returning the index of the selected estimator
+    : rtype: function
+    """
+
+    def refit(cv_results) -> int:
+        cv_results_ = pd.DataFrame(data=cv_results)[
+            [
+                "mean_score_time",
+                "mean_test_recall_micro",
+                "std_test_recall_micro",
+                "mean_test_precision_micro",
+                "std_test_precision_micro",
+                "rank_test_recall_micro",
+                "rank_test_precision_micro",
+                "params",
+            ]
+        ]
+        recall = cv_results_["mean_test_recall_micro"]
+        if tolerance is None:  # as in refit_strategy
+            threshold = recall.max() - recall.std()
+            within_recall = recall > threshold
+        else:
+            threshold = recall.max() - tolerance
+            within_recall = recall >= threshold
+        if not within_recall.any():  # a single candidate or equal recalls (std nan or 0)
+            within_recall = recall == recall.max()
+        candidates = cv_results_[within_recall].copy()
+
+        # Measure single-sample latency and size of each candidate
+        latencies = []
+        sizes = []
+        for params in candidates["params"]:
+            classifier = clone(estimator=estimator).set_params(**clone(estimator=params, safe=False)).fit(X, y).named_steps['classifier']
+            latencies.append(predict_latency(classifier=classifier, X=X))
+            sizes.append(len(pickle.dumps(obj=classifier)))
+        candidates["predict_latency"] = latencies
+        candidates["model_size"] = sizes
+        candidates["precision_recall_summation"] = candidates["mean_test_precision_micro"] + candidates["mean_test_recall_micro"]
+
+        print(f"Out of the previously selected models, we measure the {candidates.shape[0]} models\nwithin {recall.max() - threshold:0.3f} of the highest recall model:")
+        logger.info(msg=f" Out of the previously selected models, we measure the {candidates.shape[0]} models\nwithin {recall.max() - threshold:0.3f} of the highest recall model:")
+        for mean_precision, std_precision, mean_recall, std_recall, latency, size, params in zip(
+            candidates["mean_test_precision_micro"],
+            candidates["std_test_precision_micro"],
+            candidates["mean_test_recall_micro"],
+            candidates["std_test_recall_micro"],
+            candidates["predict_latency"],
+            candidates["model_size"],
+            candidates["params"],
+        ):
+            print(f"precision: {mean_precision:0.3f} (±{std_precision:0.03f}),\n recall: {mean_recall:0.3f} (±{std_recall:0.03f}),\n latency: {latency*1e3:0.3f} ms, size: {size/1e3:0.1f} kB,\n for {params}")
+            logger.info(msg=f" precision: {mean_precision:0.3f} (±{std_precision:0.03f}),\n recall: {mean_recall:0.3f} (±{std_recall:0.03f}),\n latency: {latency*1e3:0.3f} ms, size: {size/1e3:0.1f} kB,\n for {params}")
+        print()
+
+        # Select the lowest latency model within the budgets
+        within = np.ones(shape=candidates.shape[0], dtype=bool)
+        if latency_budget is not None:
+            within &= candidates["predict_latency"].to_numpy() <= latency_budget
+        if size_budget is not None:
+            within &= candidates["model_size"].to_numpy() <= size_budget
+        if not within.any():
+            print("No model is within the latency and size budgets, the cheapest model is selected")
+            logger.info(msg=" No model is within the latency and size budgets, the cheapest model is selected")
+            within[:] = True
+        cheapest = candidates[within]
+        cheapest = cheapest[cheapest["predict_latency"] <= cheapest["predict_latency"].min() * (1.0 + latency_resolution)]
+        selected = cheapest["precision_recall_summation"].idxmax()
+
+        print(f"\nThe selected final model is the one with the lowest predict latency within the budgets.\nSelected Model:\n{candidates.loc[selected]}")
+        logger.info(msg=f" \nThe selected final model is the one with the lowest predict latency within the budgets.\nSelected Model:\n{candidates.loc[selected]}")
+
+        return selected
+
+    return refit
+
+
+def candidates_fitted(search) -> int:
+    """
+    Number of (candidate, fold) fits performed by a fitted search
+
+    : rtype: integer
+    """
+
+    if hasattr(search, 'history_'):  # HalvingSearchCV
+        return int(sum(h['n_candidates'] * h['n_folds'] for h in search.history_))
+    return len(search.cv_results_['params']) * search.n_splits_
+
+
 def displayMetrics(y_test, y_pred, gestures: list, class_distribution: list, cmap: str, logger) -> None:
     """
     Compute and display the Confusion matrix and classification report
@@ -222,7 +351,30 @@ def displayMetrics(y_test, y_pred, gestures: list, class_distribution: list, cma
     logger.info(msg=f' Overall Accuracy {accuracy}%')
 
 
-def classifyFeatureData(hdfFile: str, test_split: float) -> None:
+def open_cache(hdfFile: str, cache: bool):
+    """
+    CV result cache next to the .h5 file, or None when caching is disabled
+
+    : rtype: ResultCache
+    """
+
+    return ResultCache(cacheFile=os.path.join(os.path.dirname(hdfFile), cache_filename)) if cache else None
+
+
+def report_cache(cv_cache) -> None:
+    """
+    Print and log the CV result cache hits and misses
+
+    : rtype: None
+    """
+
+    if cv_cache is not None:
+        print(f"CV Cache: {cv_cache.hits} results reused, {cv_cache.misses} evaluated ({cv_cache.cacheFile})")
+        logger.info(msg=f" CV Cache: {cv_cache.hits} results reused, {cv_cache.misses} evaluated ({cv_cache.cacheFile})")
+
+
+def classifyFeatureData(hdfFile: str, test_split: float, search: str = 'parallel', latency_budget: float = None, size_budget: int = None,
+                        tolerance: float = None, cache: bool = True, features: str = 'sequential', top_k: int = None) -> None:
     """
     - Import, Select, Split, and Normalize Data
     - Train, Optimise, and Test Classification Models
@@ -237,6 +389,23 @@ def classifyFeatureData(hdfFile: str, test_split: float) -> None:
     : type hdfFile: string
     : param test_split: percentage split of data for testing
     : type test_split: float
+    : param search: 'grid' for single process GridSearchCV, 'parallel' for process pool search with shared selection paths,
+                    neighbour graphs and kernel matrices, 'halving' to also use successive halving over deduplicated
+                    candidates for the hyperparameter search
+    : type search: string
+    : param latency_budget: per-prediction latency budget [s] of the final model, selects it with latency_refit_strategy
+    : type latency_budget: float
+    : param size_budget: pickled size budget [bytes] of the final model, selects it with latency_refit_strategy
+    : type size_budget: integer
+    : param tolerance: recall tolerance of latency_refit_strategy (default: one standard deviation)
+    : type tolerance: float
+    : param cache: reuse and store the fold results of the 'parallel' and 'halving' searches in the CV result cache
+    : type cache: boolean
+    : param features: 'sequential' to search SequentialFeatureSelector settings, 'exhaustive' to rank every feature subset
+                      with closed-form models (rankSubsets) and cross-validate the best subset_candidates with SVC
+    : type features: string
+    : param top_k: prune the wrapper feature search to the top_k features of the filter ranking (default: all features)
+    : type top_k: integer
     : return: None
     : rtype: None
     """
@@ -249,21 +418,15 @@ def classifyFeatureData(hdfFile: str, test_split: float) -> None:
     logger.info(msg=' Started')
 
     try:
-        # IMPORT DATA
-        imported_data = importData(hdfFile=hdfFile)
-
-        # SELECT DATA
+        # IMPORT & SELECT DATA
         if select == True:  # selection of gestures
             logger.info(msg=" select flag enabled")
             logger.info(msg=f" Gestures Selected {[gesture_names[g] for g in gesture_selection]}")
-            dataframes = []
-            for l in gesture_selection:
-                dataframes.append(imported_data.loc[imported_data['label'] == l])
-            dataframe = pd.concat(objs=dataframes, axis=0, ignore_index=True)
+            dataframe = importData(hdfFile=hdfFile, labels=gesture_selection)
             gesture_indexes = gesture_selection
             gestures = [gesture_names[i] for i in gesture_indexes]
         else:  # all gestures
-            dataframe = imported_data
+            dataframe = importData(hdfFile=hdfFile)
             gestures = gesture_names
             gesture_indexes = list(np.arange(start=0, stop=len(gestures), step=1))
 
@@ -273,12 +436,13 @@ def classifyFeatureData(hdfFile: str, test_split: float) -> None:
         X = dataframe_X.to_numpy(dtype=np.float16)
         y = dataframe_y.to_numpy(dtype=np.int8)
 
-        # NORMALIZE DATA
-        scaler = MinMaxScaler(feature_range=(0, 1))
-        scaled_X = scaler.fit_transform(X=X)
+        with span(name='scale_split'):
+            # NORMALIZE DATA
+            scaler = MinMaxScaler(feature_range=(0, 1))
+            scaled_X = scaler.fit_transform(X=X)
 
-        # SPLIT DATA
-        X_train, X_test, y_train, y_test = train_test_split(scaled_X, y, test_size=test_split, random_state=0, stratify=y)
+            # SPLIT DATA
+            X_train, X_test, y_train, y_test = train_test_split(scaled_X, y, test_size=test_split, random_state=0, stratify=y)
         class_distribution = []
         for g in gesture_indexes:
             count = 0
@@ -345,22 +509,58 @@ def classifyFeatureData(hdfFile: str, test_split: float) -> None:
             X_train_dataframe = pd.DataFrame(data=X_train, columns=feature_names, dtype=np.float16)
             X_test_dataframe = pd.DataFrame(data=X_test, columns=feature_names, dtype=np.float16)
             selector = SequentialFeatureSelector(estimator=SVC(), n_features_to_select=3, direction='forward')
+            cv_cache = open_cache(hdfFile=hdfFile, cache=cache and search in ('parallel', 'halving'))
             feature_pipe = Pipeline(memory=None, steps=[('selector', selector), ('classifier', SVC())], verbose=True)
             scores = ['precision_micro', 'recall_micro']
+            logger.info(msg=f" Search: {search}, Features: {features}")
+
+            # FILTER RANKING, OPTIONALLY PRUNING THE WRAPPER SEARCH TO THE TOP-K FEATURES
+            search_features = feature_names
+            if feature_ranking == True or top_k is not None:
+                with span(name='feature_ranking', features=len(feature_names)) as s:
+                    feature_table = rankFeatures(X=X_train, y=y_train, feature_names=feature_names)
+                method_times = ', '.join(f"{method}: {t*1e3:.1f} ms" for method, t in feature_table.attrs['timings'].items())
+                print(f"\nFeature Ranking Duration: {s.wall:.2f} s ({method_times})\n")
+                logger.info(msg=f" Feature Ranking Duration: {s.wall:.2f} s ({method_times})")
+                print(feature_table.to_string(index=False, float_format='%.3f'))
+                logger.info(msg=f"\n{feature_table.to_string(index=False, float_format='%.3f')}")
+                if top_k is not None:
+                    search_features = top_features(table=feature_table, k=top_k, feature_names=feature_names)
+                    print(f"\nWrapper search pruned to the top {top_k} features: {search_features}\n")
+                    logger.info(msg=f" Wrapper search pruned to the top {top_k} features: {search_features}")
+            search_X_train = X_train_dataframe[search_features]
             feature_search_space = [{'selector__estimator': [SVC(), KNeighborsClassifier(), ComplementNB()],
-                                     'selector__n_features_to_select': [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16],
+                                     'selector__n_features_to_select': list(range(1, len(search_features) + 1, 1)),
                                      'selector__direction': ['forward', 'backward']}]
-            feature_grid_search = GridSearchCV(estimator=feature_pipe, param_grid=feature_search_space, scoring=scores, refit=refit_strategy, cv=cv_splits, verbose=2)
+
+            if features == 'exhaustive':
+                with span(name='subset_ranking') as s:
+                    subset_table = rankSubsets(X=search_X_train, y=y_train, cv=cv_splits, feature_names=search_features)
+                    s.add(counter='subsets_scored', n=len(subset_table))
+                print(f"\nSubset Ranking Duration: {s.wall:.1f} s ({len(subset_table)} subsets x models)\n")
+                logger.info(msg=f" Subset Ranking Duration: {s.wall:.1f} s ({len(subset_table)} subsets x models)")
+                print(subset_table.head(n=10)[['features', 'model', 'mean_test_score', 'std_test_score', 'rank']].to_string(index=False))
+                logger.info(msg=f"\n{subset_table.head(n=10)[['features', 'model', 'mean_test_score', 'std_test_score', 'rank']].to_string(index=False)}")
+                feature_pipe = Pipeline(memory=None, steps=[('selector', SubsetSelector()), ('classifier', SVC())], verbose=True)
+                feature_search_space = [{'selector__features': top_subsets(table=subset_table, n=subset_candidates)}]
+                feature_grid_search = CachedGridSearchCV(estimator=feature_pipe, param_grid=feature_search_space, scoring=scores, refit=refit_strategy, cv=cv_splits,
+                                                         n_jobs=n_jobs if search != 'grid' else 1, verbose=2, cache=cv_cache)
+            elif search in ('parallel', 'halving'):
+                feature_grid_search = PathFeatureSearchCV(estimator=feature_pipe, param_grid=feature_search_space, scoring=scores, refit=refit_strategy, cv=cv_splits, n_jobs=n_jobs, verbose=2,
+                                                          cache=cv_cache)
+            else:
+                feature_grid_search = GridSearchCV(estimator=feature_pipe, param_grid=feature_search_space, scoring=scores, refit=refit_strategy, cv=cv_splits, verbose=2)
             try:
-                start = time.time()
-                feature_grid_search.fit(X=X_train_dataframe, y=y_train)
-                end = round(number=(time.time() - start)/60.0, ndigits=None)
+                with span(name='feature_selection') as s:
+                    feature_grid_search.fit(X=search_X_train, y=y_train)
+                    s.add(counter='candidates_fitted', n=candidates_fitted(search=feature_grid_search))
+                end = round(number=s.wall/60.0, ndigits=None)
             except:
                 print("EXCEPTION OCCURRED WHILE PERFORMING FEATURE SELECTION!")
                 logger.info(msg="EXCEPTION OCCURRED WHILE PERFORMING FEATURE SELECTION!")
                 traceback.print_exc()
                 logger.info(msg=f"\n{traceback.print_exc()}")
-            selected_features = list(compress(data=feature_names, selectors=feature_grid_search.best_estimator_.named_steps['selector'].get_support()))
+            selected_features = list(compress(data=search_features, selectors=feature_grid_search.best_estimator_.named_steps['selector'].get_support()))
             print(f"\nFeature Selection Duration: ~{end} minutes\n")
             logger.info(msg=f" Feature Selection Duration: ~{end} minutes")
             print(f"\nOptimal Features: {selected_features}\n")
@@ -383,12 +583,27 @@ def classifyFeatureData(hdfFile: str, test_split: float) -> None:
                                        'classifier__metric': ['minkowski']},
                                        {'classifier': [ComplementNB()],
                                         'classifier__alpha': [1e-3, 1e-2, 1e-1, 1.0]}]
-            grid_search = GridSearchCV(estimator=parameter_pipe, param_grid=parameter_search_space, scoring=scores, refit=refit_strategy, cv=cv_splits, verbose=2)
+            if latency_budget is None and size_budget is None and tolerance is None:
+                parameter_refit = refit_strategy
+            else:
+                logger.info(msg=f" Latency Budget: {latency_budget} s, Size Budget: {size_budget} bytes, Recall Tolerance: {tolerance}")
+                parameter_refit = latency_refit_strategy(estimator=parameter_pipe, X=opt_X_train, y=y_train, latency_budget=latency_budget,
+                                                         size_budget=size_budget, tolerance=tolerance)
+            if search == 'halving':
+                grid_search = HalvingSearchCV(estimator=parameter_pipe, param_grid=parameter_search_space, scoring=scores, refit=parameter_refit, cv=cv_splits, n_jobs=n_jobs, verbose=2,
+                                              cache=cv_cache, shared=shared_state)
+            elif search == 'parallel':
+                grid_search = CachedGridSearchCV(estimator=parameter_pipe, param_grid=parameter_search_space, scoring=scores, refit=parameter_refit, cv=cv_splits, n_jobs=n_jobs, verbose=2,
+                                                 cache=cv_cache, shared=shared_state)
+            else:
+                grid_search = GridSearchCV(estimator=parameter_pipe, param_grid=parameter_search_space, scoring=scores, refit=parameter_refit, cv=cv_splits, verbose=2)
             try:
-                start = time.time()
-                grid_search.fit(X=opt_X_train, y=y_train)
-                end = round(number=(time.time() - start)/60.0, ndigits=None)
-                y_pred = grid_search.predict(X=opt_X_test)
+                with span(name='hyperparameter_search') as s:
+                    grid_search.fit(X=opt_X_train, y=y_train)
+                    s.add(counter='candidates_fitted', n=candidates_fitted(search=grid_search))
+                end = round(number=s.wall/60.0, ndigits=None)
+                with span(name='predict', rows=opt_X_test.shape[0]):
+                    y_pred = grid_search.predict(X=opt_X_test)
             except:
                 print("EXCEPTION OCCURRED DURING FITTING OF OPTIMAL MODEL!")
                 logger.info(msg="EXCEPTION OCCURRED DURING FITTING OF OPTIMAL MODEL!")
@@ -396,6 +611,29 @@ def classifyFeatureData(hdfFile: str, test_split: float) -> None:
                 logger.info(msg=f"\n{traceback.print_exc()}")
             print(f"\nModel + Hyperparameter Selection Duration: ~{end} minutes\n")
             logger.info(msg=f" Model + Hyperparameter Selection Duration: ~{end} minutes")
+            report_cache(cv_cache=cv_cache)
+            if search == 'halving':
+                print(f"Halving: {grid_search.n_candidates_} candidates, {grid_search.n_unique_candidates_} prediction-equivalent groups")
+                logger.info(msg=f" Halving: {grid_search.n_candidates_} candidates, {grid_search.n_unique_candidates_} prediction-equivalent groups")
+                for h in grid_search.history_:
+                    print(f"Round {h['round']}: {h['n_candidates']} candidates x {h['n_folds']} folds x {h['n_samples']} samples in {h['time']:.2f} s")
+                    logger.info(msg=f" Round {h['round']}: {h['n_candidates']} candidates x {h['n_folds']} folds x {h['n_samples']} samples in {h['time']:.2f} s")
+                if compare == True:
+                    # Search time only on both sides: the halving rounds, and the exhaustive grid without the refit strategy and refit
+                    halving_time = sum(h['time'] for h in grid_search.history_)
+                    exhaustive_search = GridSearchCV(estimator=parameter_pipe, param_grid=parameter_search_space, scoring=scores, refit=False, cv=cv_splits, n_jobs=n_jobs)
+                    with span(name='exhaustive_search') as s:
+                        exhaustive_search.fit(X=opt_X_train, y=y_train)
+                        s.add(counter='candidates_fitted', n=candidates_fitted(search=exhaustive_search))
+                    exhaustive_time = s.wall
+                    exhaustive_best = exhaustive_search.cv_results_['params'][parameter_refit(exhaustive_search.cv_results_)]
+                    print(f"\nSearch Time Comparison: halving {halving_time:.2f} s, exhaustive {exhaustive_time:.2f} s ({exhaustive_time/halving_time:.1f}x)")
+                    logger.info(msg=f" Search Time Comparison: halving {halving_time:.2f} s, exhaustive {exhaustive_time:.2f} s ({exhaustive_time/halving_time:.1f}x)")
+                    print(f"Exhaustive best params: {exhaustive_best}\n")
+                    logger.info(msg=f" Exhaustive best params: {exhaustive_best}")
+            final_latency = predict_latency(classifier=grid_search.best_estimator_.named_steps['classifier'], X=opt_X_test)
+            print(f"\nFinal Model Predict Latency: {final_latency*1e3:.3f} ms (single sample, median)")
+            logger.info(msg=f" Final Model Predict Latency: {final_latency*1e3:.3f} ms (single sample, median)")
             print(f"\nBest estimator: {grid_search.best_estimator_}\n")
             logger.info(msg=f" Best estimator: {grid_search.best_estimator_}")
             print(f"\nBest params: {grid_search.best_estimator_.get_params()}\n")
@@ -404,6 +642,18 @@ def classifyFeatureData(hdfFile: str, test_split: float) -> None:
             # BEST MODEL PERFORMANCE METRICS
             displayMetrics(y_test=y_test, y_pred=y_pred, gestures=gestures, class_distribution=class_distribution, cmap='Purples', logger=logger)
 
+            # EXPORT BEST MODEL
+            if export == True:
+                model_file = os.path.join(os.path.dirname(hdfFile), model_filename)
+                with tb.open_file(filename=hdfFile, mode='r') as h5file:
+                    trained_sessions = list_table_nums(h5file=h5file)
+                with span(name='export_model'):
+                    exportModel(modelFile=model_file, scaler=scaler, feature_names=feature_names, selected_features=selected_features,
+                                model=grid_search.best_estimator_.named_steps['classifier'], gesture_map={g: gesture_names[g] for g in gesture_indexes},
+                                sessions=trained_sessions)
+                print(f"Model exported to {model_file}")
+                logger.info(msg=f" Model exported to {model_file}")
+
         logger.info(msg=" Finished")
         print("DONE.")
         print("EXITING...")
@@ -412,3 +662,113 @@ def classifyFeatureData(hdfFile: str, test_split: float) -> None:
         logger.info(msg=" EXCEPTION OCCURED WHILE PERFORMING CLASSIFICATION!\n")
         traceback.print_exc()
         logger.info(msg=f"\n{traceback.print_exc()}")
+
+
+def evaluate_fold(estimator, X: np.ndarray, y: np.ndarray, train: np.ndarray, test: np.ndarray, feature_indexes: np.ndarray) -> tuple:
+    """
+    Scale on the training sessions, fit, and predict the held-out sessions of one fold
+
+    : rtype: tuple
+    """
+
+    start = tm.perf_counter()
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    X_train = scaler.fit_transform(X=X[train])[:, feature_indexes]
+    X_test = scaler.transform(X=X[test])[:, feature_indexes]
+    y_pred = clone(estimator=estimator).fit(X=X_train, y=y[train]).predict(X=X_test)
+
+    return y_pred, tm.perf_counter() - start
+
+
+def evaluateSessions(hdfFile: str, folds: int = None, modelFile: str = None, n_jobs: int = n_jobs, cache: bool = True) -> pd.DataFrame:
+    """
+    Leave-one-session-out (or GroupKFold over sessions) evaluation of a model configuration
+
+    Unlike the random split of classifyFeatureData, all windows of a session are on the same side of each split, so
+    the metrics show how the model does on a new recording. The scaler is refitted on the training sessions of each
+    fold and the folds run in parallel processes.
+
+    STATUS: WORKING
+
+    : param hdfFile: .h5 filename
+    : type hdfFile: string
+    : param folds: number of GroupKFold folds (default: one fold per session)
+    : type folds: integer
+    : param modelFile: exported model whose selected features and classifier are evaluated (default: SVC on all features)
+    : type modelFile: string
+    : param n_jobs: number of processes (-1 uses all cores)
+    : type n_jobs: integer
+    : param cache: reuse and store the fold predictions in the CV result cache
+    : type cache: boolean
+    : return: per-session metrics (session, rows, accuracy, precision, recall, fold_time of the fold holding the session)
+    : rtype: pd.DataFrame
+    """
+
+    datetime_str = datetime.now().strftime("%d_%m_%Y-%H_%M")
+    logging.basicConfig(filename='loso_class_log_' + datetime_str + '.log', level=logging.INFO)
+    logger.info(msg=' Started')
+
+    # Model configuration
+    if modelFile is not None and os.path.exists(path=modelFile):
+        model = loadModel(modelFile=modelFile)
+        estimator = clone(estimator=model.model)
+        feature_indexes = model.feature_indexes
+        labels = sorted(model.gesture_map)
+        print(f"Model: {modelFile}")
+        logger.info(msg=f" Model: {modelFile}")
+    else:
+        estimator = SVC()
+        feature_indexes = np.arange(start=0, stop=len(feature_names), step=1)
+        labels = None
+    print(f"Estimator: {estimator}, Features: {[feature_names[i] for i in feature_indexes]}")
+    logger.info(msg=f" Estimator: {estimator}, Features: {[feature_names[i] for i in feature_indexes]}")
+
+    # Data with session identity
+    dataframe = importData(hdfFile=hdfFile, labels=labels, sessions=True)
+    X = dataframe[feature_names].to_numpy(dtype=np.float16)
+    y = dataframe['label'].to_numpy(dtype=np.int8)
+    groups = dataframe['session'].to_numpy()
+    n_sessions = np.unique(groups).shape[0]
+    if n_sessions < 2:
+        print("AT LEAST TWO SESSIONS ARE REQUIRED FOR SESSION EVALUATION!\nEXITING...")
+        logger.info(msg=" AT LEAST TWO SESSIONS ARE REQUIRED FOR SESSION EVALUATION!\nEXITING...")
+        return None
+    cv = LeaveOneGroupOut() if folds is None else GroupKFold(n_splits=min(folds, n_sessions))
+    splits = list(cv.split(X=X, y=y, groups=groups))
+    print(f"Sessions: {n_sessions}, Folds: {len(splits)}, Rows: {X.shape[0]}")
+    logger.info(msg=f" Sessions: {n_sessions}, Folds: {len(splits)}, Rows: {X.shape[0]}")
+
+    # Run the folds in parallel, skipping folds whose sessions and configuration were evaluated before
+    cv_cache = open_cache(hdfFile=hdfFile, cache=cache)
+    with span(name='session_evaluation', folds=len(splits)) as s:
+        fold_results = run_cached(parallel=Parallel(n_jobs=n_jobs), cache=cv_cache,
+                                  tasks=[(None if cv_cache is None else ResultCache.key('session_fold', fold_digest(X=X, y=y, train=train, test=test), estimator, feature_indexes),
+                                          delayed(evaluate_fold)(estimator=estimator, X=X, y=y, train=train, test=test, feature_indexes=feature_indexes))
+                                         for train, test in splits])
+    report_cache(cv_cache=cv_cache)
+    y_pred = np.empty_like(y)
+    fold_times = np.empty(shape=X.shape[0])
+    for (train, test), (fold_pred, fold_time) in zip(splits, fold_results):
+        y_pred[test] = fold_pred
+        fold_times[test] = fold_time
+
+    # Per-session metrics
+    results = []
+    for session in np.unique(groups):
+        rows = groups == session
+        results.append({'session': int(session), 'rows': int(rows.sum()),
+                        'accuracy': accuracy_score(y_true=y[rows], y_pred=y_pred[rows]),
+                        'precision': precision_score(y_true=y[rows], y_pred=y_pred[rows], average='macro', zero_division=0),
+                        'recall': recall_score(y_true=y[rows], y_pred=y_pred[rows], average='macro', zero_division=0),
+                        'fold_time': float(fold_times[rows][0])})
+    results = pd.DataFrame(data=results)
+
+    print(f"\n{results.to_string(index=False, float_format='%.3f')}\n")
+    logger.info(msg=f"\n{results.to_string(index=False, float_format='%.3f')}")
+    print(f"Session Accuracy: {results['accuracy'].mean():.3f} (±{results['accuracy'].std():.3f}), Pooled Accuracy: {accuracy_score(y_true=y, y_pred=y_pred):.3f}")
+    logger.info(msg=f" Session Accuracy: {results['accuracy'].mean():.3f} (±{results['accuracy'].std():.3f}), Pooled Accuracy: {accuracy_score(y_true=y, y_pred=y_pred):.3f}")
+    print(f"Evaluation Duration: {s.wall:.2f} s ({len(splits)} folds)")
+    logger.info(msg=f" Evaluation Duration: {s.wall:.2f} s ({len(splits)} folds)")
+    logger.info(msg=" Finished")
+
+    return results
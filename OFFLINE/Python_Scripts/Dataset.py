@@ -0,0 +1,399 @@
+# FEATURE DATASET FUNCTIONS SHARED BY CLASSIFICATION.PY, VISUALISATION.PY AND MAIN.PY
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+
+
+import os
+import numpy as np
+import tables as tb
+from config import columns, NUM_GESTURES, SMOOTH, WINDOW, TONE_ON, TONE_OFF, START_CUT_ERROR, END_CUT_ERROR, ZERO_OFFSET, WILLISON_THRESHOLD
+
+
+# Compressed table layout: byte shuffle groups the bytes of each column, zstd then removes the redundancy
+# (constant timestamps and labels within a session, slowly varying float exponents)
+compression_filters = tb.Filters(complevel=5, complib='blosc:zstd', shuffle=True)
+CHUNK_BYTES = 64 * 1024  # upper bound of one table chunk
+BLOCK_ROWS = 65536  # rows per block read by iterFeatures
+
+
+class sessionData(tb.IsDescription):
+    table_num = tb.UInt32Col(pos=0)
+    table_name = tb.StringCol(itemsize=16, pos=1)
+    creation = tb.StringCol(itemsize=20, pos=2)  # dd/mm/YYYY, HH:MM:SS
+    start_time = tb.Int64Col(pos=3)  # first row timestamp [ns]
+    end_time = tb.Int64Col(pos=4)  # last row timestamp [ns]
+    rows = tb.UInt32Col(pos=5)
+    label_counts = tb.UInt32Col(shape=(NUM_GESTURES,), pos=6)
+    repetitions = tb.UInt16Col(pos=7)
+    backfilled = tb.BoolCol(pos=8)  # catalogued after collection, repetitions estimated and settings unknown
+    # Firmware feature extraction settings at collection time
+    smooth = tb.BoolCol(pos=9)
+    window = tb.UInt16Col(pos=10)
+    tone_on = tb.UInt16Col(pos=11)
+    tone_off = tb.UInt16Col(pos=12)
+    start_cut_error = tb.UInt16Col(pos=13)
+    end_cut_error = tb.UInt16Col(pos=14)
+    zero_offset = tb.Float32Col(pos=15)
+    willison_threshold = tb.Float32Col(pos=16)
+
+
+def table_num(name: str) -> int:
+    return int(name.split('_')[-1])
+
+
+def get_catalogue(h5file: tb.File) -> tb.Table:
+    """
+    Session catalogue table of the .h5 file (None if the file has no catalogue)
+
+    : rtype: Table object
+    """
+
+    return h5file.get_node(where='/catalogue') if '/catalogue' in h5file else None
+
+
+def session_row(table: tb.Table, repetitions: int = None) -> tuple:
+    """
+    Catalogue row of a feature table, settings are taken from config unless the table is backfilled
+
+    : rtype: tuple
+    """
+
+    labels = table.col('label')
+    timestamps = table.col('timestamp')
+    label_counts = np.bincount(labels, minlength=NUM_GESTURES)[:NUM_GESTURES]
+    creation = table._v_title.split('session ')[-1] if 'session ' in table._v_title else ''
+    backfilled = repetitions is None
+    if backfilled:
+        repetitions = int(label_counts.max())
+    settings = (False, 0, 0, 0, 0, 0, np.nan, np.nan) if backfilled else \
+        (SMOOTH, WINDOW, TONE_ON, TONE_OFF, START_CUT_ERROR, END_CUT_ERROR, ZERO_OFFSET, WILLISON_THRESHOLD)
+
+    return (table_num(name=table.name), table.name, creation,
+            int(timestamps.min()) if table.nrows else 0, int(timestamps.max()) if table.nrows else 0,
+            table.nrows, label_counts, repetitions, backfilled) + settings
+
+
+def syncCatalogue(h5file: tb.File) -> tb.Table:
+    """
+    Create the session catalogue if needed and backfill rows for feature tables that are not catalogued
+
+    STATUS: WORKING
+
+    : param h5file: .h5 file object (writable)
+    : type h5file: File object
+    : return: catalogue table
+    : rtype: Table object
+    """
+
+    catalogue = get_catalogue(h5file=h5file)
+    if catalogue is None:
+        catalogue = h5file.create_table(where='/', name='catalogue', description=sessionData, title='Feature data sessions',
+                                        filters=compression_filters)
+        catalogue.cols.table_num.create_index()
+        catalogue.cols.start_time.create_index()
+        catalogue.attrs.next_table_num = 0
+    catalogued = set(catalogue.col('table_num').tolist())
+    if '/features' in h5file:
+        for name in h5file.get_node(where='/features')._v_children.keys():  # names only, catalogued tables are not opened
+            if table_num(name=name) not in catalogued:
+                catalogue.append(rows=[session_row(table=h5file.get_node(where='/features', name=name))])
+                catalogue.attrs.next_table_num = max(catalogue.attrs.next_table_num, table_num(name=name) + 1)
+    catalogue.flush()
+
+    return catalogue
+
+
+def recordSession(h5file: tb.File, table: tb.Table, repetitions: int) -> None:
+    """
+    Add (or replace) the catalogue row of a newly collected feature table and bring its label index up to date
+
+    STATUS: WORKING
+
+    : param h5file: .h5 file object (writable)
+    : type h5file: File object
+    : param table: collected feature table
+    : type table: Table object
+    : param repetitions: repetitions per gesture requested for the session
+    : type repetitions: integer
+    : return: None
+    : rtype: None
+    """
+
+    table.reindex_dirty()
+    catalogue = syncCatalogue(h5file=h5file)
+    num = table_num(name=table.name)
+    existing = catalogue.get_where_list(f"table_num == {num}")
+    if len(existing):
+        catalogue.remove_rows(start=int(existing[0]), stop=int(existing[0]) + 1)
+    catalogue.append(rows=[session_row(table=table, repetitions=repetitions)])
+    catalogue.attrs.next_table_num = max(catalogue.attrs.next_table_num, num + 1)
+    catalogue.flush()
+
+
+def next_table_num(h5file: tb.File) -> int:
+    """
+    Number of the next feature table, read from the catalogue without enumerating the file
+
+    STATUS: WORKING
+
+    : param h5file: .h5 file object
+    : type h5file: File object
+    : return: table number
+    : rtype: integer
+    """
+
+    catalogue = get_catalogue(h5file=h5file)
+    if catalogue is not None:
+        return int(catalogue.attrs.next_table_num)
+    table_nums = list_table_nums(h5file=h5file)
+
+    return max(table_nums) + 1 if table_nums else 0
+
+
+def list_table_nums(h5file: tb.File, start: int = None, end: int = None) -> list:
+    """
+    Get table numbers of the tables in features group of .h5 file
+
+    With a catalogue the numbers are read from it, and a time range is found with its start_time index.
+
+    STATUS: WORKING
+
+    : param h5file: .h5 file object
+    : type h5file: File object
+    : param start: only sessions ending at or after this timestamp [ns]
+    : type start: integer
+    : param end: only sessions starting at or before this timestamp [ns]
+    : type end: integer
+    : return: sorted table numbers
+    : rtype: list
+    """
+
+    catalogue = get_catalogue(h5file=h5file)
+    if catalogue is None:
+        sessions = [(table_num(name=t._v_name), t) for t in h5file.list_nodes(where='/features', classname='Table')] if '/features' in h5file else []
+        if start is not None or end is not None:
+            sessions = [(n, t) for n, t in sessions if t.nrows and (start is None or t.col('timestamp').max() >= start)
+                        and (end is None or t.col('timestamp').min() <= end)]
+        return sorted(n for n, _ in sessions)
+    if start is None and end is None:
+        return sorted(catalogue.col('table_num').tolist())
+    conditions = ([f"(start_time <= {int(end)})"] if end is not None else []) + ([f"(end_time >= {int(start)})"] if start is not None else [])
+
+    return sorted(catalogue.read_where(' & '.join(conditions), field='table_num').tolist())
+
+
+def list_tables(h5file: tb.File, table_nums: list = None) -> list:
+    """
+    Get tables in the features group of .h5 file, sorted by table number
+
+    STATUS: WORKING
+
+    : param h5file: .h5 file object
+    : type h5file: File object
+    : param table_nums: table numbers to get (default: all tables)
+    : type table_nums: list
+    : return: table objects
+    : rtype: list
+    """
+
+    if '/features' not in h5file:
+        return []
+    if table_nums is None:
+        table_nums = list_table_nums(h5file=h5file)
+
+    names = ['/features/fset_' + str(object=n) for n in sorted(table_nums)]
+
+    return [h5file.get_node(where=name) for name in names if name in h5file]
+
+
+def label_condition(labels: list) -> str:
+    """
+    PyTables query condition selecting rows with any of the given labels
+
+    : rtype: string
+    """
+
+    return ' | '.join(f"(label == {int(l)})" for l in labels)
+
+
+def readFeatures(h5file: tb.File, fields: list = None, labels: list = None, table_nums: list = None) -> np.ndarray:
+    """
+    Read feature tables directly into one preallocated structured array
+
+    Label filtering is done by PyTables in-kernel queries and only the requested fields are kept, so at most one
+    table's selected rows are held in memory in addition to the result. Sessions the catalogue lists without any of
+    the selected labels are not opened.
+
+    STATUS: WORKING
+
+    : param h5file: .h5 file object
+    : type h5file: File object
+    : param fields: columns to read, 'session' gives the table number of each row (default: all columns in config order)
+    : type fields: list
+    : param labels: gesture labels to read (default: all labels)
+    : type labels: list
+    : param table_nums: table numbers to read (default: all tables)
+    : type table_nums: list
+    : return: structured array of the selected rows and fields
+    : rtype: np.ndarray
+    """
+
+    if fields is None:
+        fields = [name for name, _ in columns]
+    if table_nums is None:
+        table_nums = list_table_nums(h5file=h5file)
+    catalogue = get_catalogue(h5file=h5file)
+    if labels is not None and catalogue is not None:  # skip sessions without the selected labels without opening them
+        sessions = catalogue.read()
+        has_labels = sessions['label_counts'][:, [int(l) for l in labels if int(l) < NUM_GESTURES]].sum(axis=1) > 0
+        table_nums = sorted(set(table_nums) & set(sessions['table_num'][has_labels].tolist()))
+    tables = list_tables(h5file=h5file, table_nums=table_nums)
+    if not tables:
+        return np.empty(shape=0, dtype=[(f, np.float64) for f in fields])
+
+    # Find selected rows and allocate result
+    if labels is None:
+        coords = [None for t in tables]
+        counts = [t.nrows for t in tables]
+    else:
+        condition = label_condition(labels=labels)
+        coords = [t.get_where_list(condition) for t in tables]
+        counts = [len(c) for c in coords]
+    dtype = np.dtype([(f, np.uint32 if f == 'session' else tables[0].coldtypes[f]) for f in fields])
+    data = np.empty(shape=sum(counts), dtype=dtype)
+
+    # Fill result one table at a time
+    offset = 0
+    for table, coord, count in zip(tables, coords, counts):
+        if count == 0:
+            continue
+        rows = table.read() if coord is None else table.read_coordinates(coords=coord)
+        for f in fields:
+            data[f][offset:offset + count] = table_num(name=table.name) if f == 'session' else rows[f]
+        offset += count
+
+    return data
+
+
+def iterFeatures(h5file: tb.File, fields: list = None, table_nums: list = None, block_rows: int = BLOCK_ROWS):
+    """
+    Read feature tables in blocks of at most block_rows rows, so memory use does not grow with the file
+
+    STATUS: WORKING
+
+    : param h5file: .h5 file object
+    : type h5file: File object
+    : param fields: columns to read, 'session' gives the table number of each row (default: all columns in config order)
+    : type fields: list
+    : param table_nums: table numbers to read, in this order (default: all tables)
+    : type table_nums: list
+    : param block_rows: most rows per block
+    : type block_rows: integer
+    : return: generator of (table number, first row of the block in its table, structured array of the block's fields)
+    : rtype: generator
+    """
+
+    if fields is None:
+        fields = [name for name, _ in columns]
+    if table_nums is None:
+        table_nums = list_table_nums(h5file=h5file)
+    for num in table_nums:
+        name = '/features/fset_' + str(object=num)
+        if name not in h5file:
+            continue
+        table = h5file.get_node(where=name)
+        try:
+            dtype = np.dtype([(f, np.uint32 if f == 'session' else table.coldtypes[f]) for f in fields])
+            for start in range(0, table.nrows, block_rows):
+                rows = table.read(start=start, stop=min(start + block_rows, table.nrows))
+                block = np.empty(shape=rows.shape[0], dtype=dtype)
+                for f in fields:
+                    block[f] = num if f == 'session' else rows[f]
+                yield num, start, block
+        finally:
+            table.close()  # open tables keep their chunk cache and I/O buffers, so memory would grow with the number of tables
+
+
+def chunk_rows(expectedrows: int, row_size: int) -> int:
+    """
+    Chunk length in rows for a table: a whole session in one chunk if it fits in CHUNK_BYTES
+
+    : rtype: integer
+    """
+
+    return int(max(1, min(expectedrows, CHUNK_BYTES // row_size)))
+
+
+def createFeatureTable(h5file: tb.File, name: str, description, title: str, expectedrows: int, compressed: bool = True) -> tb.Table:
+    """
+    Create a table in the features group, chunked and compressed for the expected number of rows, with an index on label
+
+    STATUS: WORKING
+
+    : param h5file: .h5 file object
+    : type h5file: File object
+    : param name: table name
+    : type name: string
+    : param description: table description
+    : type description: tb.IsDescription or np.dtype
+    : param title: table title
+    : type title: string
+    : param expectedrows: expected number of rows (i.e. NUM_GESTURES * repetitions)
+    : type expectedrows: integer
+    : param compressed: use the chunked, compressed layout (otherwise PyTables defaults)
+    : type compressed: boolean
+    : return: new table
+    : rtype: Table object
+    """
+
+    if not compressed:
+        table = h5file.create_table(where='/features', name=name, description=description, title=title)
+    else:
+        row_size = tb.description.dtype_from_descr(description).itemsize
+        table = h5file.create_table(where='/features', name=name, description=description, title=title,
+                                    filters=compression_filters, expectedrows=expectedrows,
+                                    chunkshape=(chunk_rows(expectedrows=expectedrows, row_size=row_size),))
+    table.cols.label.create_index(kind='ultralight')
+    table.autoindex = False  # updating the index on every flush is ~20x slower than appending, recordSession rebuilds it once
+
+    return table
+
+
+def migrateFeatureFile(hdfFile: str, outFile: str = None) -> None:
+    """
+    Rewrite all feature tables of a .h5 file into the chunked, compressed layout, with label indexes and a session catalogue
+
+    Rows and user attributes are copied to a temporary file which replaces the original once every table has been
+    copied, so an interrupted migration leaves the original file untouched.
+
+    STATUS: WORKING
+
+    : param hdfFile: .h5 filename
+    : type hdfFile: string
+    : param outFile: migrated .h5 filename (default: replace hdfFile)
+    : type outFile: string
+    : return: None
+    : rtype: None
+    """
+
+    if outFile is None:
+        outFile = hdfFile
+    tmpFile = outFile + '.tmp'
+    with tb.open_file(filename=hdfFile, mode='r') as src, tb.open_file(filename=tmpFile, mode='w') as dst:
+        group = dst.create_group(where='/', name='features')
+        if '/features' in src:
+            src.root.features._v_attrs._f_copy(where=group)
+        for table in list_tables(h5file=src):
+            copied = table.copy(newparent=group, newname=table.name, filters=compression_filters, expectedrows=table.nrows,
+                                chunkshape=(chunk_rows(expectedrows=table.nrows, row_size=table.rowsize),))
+            if copied.nrows != table.nrows:
+                raise ValueError(f"{table.name}: copied {copied.nrows} of {table.nrows} rows")
+            copied.cols.label.create_index(kind='ultralight')
+        catalogue = get_catalogue(h5file=src)
+        if catalogue is not None:
+            catalogue.copy(newparent=dst.root, newname='catalogue', propindexes=True)
+        syncCatalogue(h5file=dst)
+    before = os.path.getsize(filename=hdfFile)
+    os.replace(src=tmpFile, dst=outFile)
+    after = os.path.getsize(filename=outFile)
+    print(f"Migrated {hdfFile}: {before} -> {after} bytes ({after/before*100.0:.1f}%)")
@@ -1,17 +1,23 @@
 # FEATURE DATA COLLECTION FUNCTION
 # STATUS: WORKING
-# LAST UPDATED: 11/06/2024
+# LAST UPDATED: 18/10/2026
 # NOTE: ~6s for 2 channel read + write (i.e., 1 rep)
+# NOTE: Serial reads and decoding run on a background thread, rows are appended to the .h5 file in bulk
+# NOTE: Misaligned data is resynchronised, link statistics are saved as table attributes
 
 
 import os
+import queue
 import serial
-import struct
+import threading
 import tables as tb
 import numpy as np
 import time as tm
 import datetime as dt
-from config import NUM_CHANNELS, NUM_GESTURES
+from config import NUM_CHANNELS, NUM_GESTURES, BUFFER_CUT_SIZE, extracted_features
+from Dataset import next_table_num, createFeatureTable, recordSession
+from Transport import openLink
+from Instrumentation import span
 
 
 gesture_map = {0: 'asl for 1', 1: 'asl for 2', 2: 'asl for 3', 3: 'asl for 4', 4: 'asl for 5'}
@@ -38,9 +44,20 @@ class featureData(tb.IsDescription):
     ch1_hj_c = tb.Float32Col()
 
 
+PACKET_SIZE = 32  # sizeof(featurePacket) including padding, i.e. struct.calcsize('@HfffHHfff')
+
+# Numpy equivalent of the '@HfffHHfff' feature struct
+packet_dtype = np.dtype({'names': ['channel', 'mav', 'rms', 'wl', 'zc', 'wa', 'hj_a', 'hj_m', 'hj_c'],
+                         'formats': ['<u2', '<f4', '<f4', '<f4', '<u2', '<u2', '<f4', '<f4', '<f4'],
+                         'offsets': [0, 4, 8, 12, 16, 18, 20, 24, 28],
+                         'itemsize': PACKET_SIZE})
+
+feature_dtype = tb.description.dtype_from_descr(featureData)  # row layout of the fset_N tables
+
+
 def get_set_num(h5file: tb.File) -> int:
     """
-    Get new table number based on existing tables in features group of .h5 file
+    Get new table number from the session catalogue (or the existing tables) of the .h5 file
 
     STATUS: WORKING
 
@@ -50,27 +67,215 @@ def get_set_num(h5file: tb.File) -> int:
     : rtype: integer
     """
 
-    nodes = []
-    for node in h5file:
-        nodes.append(str(object=node))
+    return next_table_num(h5file=h5file)
 
-    filtered_tables = list(filter(lambda x: '(Table' in x, nodes))
-    if not filtered_tables:  # no groups found
-        table_num = 0
-    else:
-        table_nums = [int((x.split(" ")[0]).split("_")[-1]) for x in filtered_tables]
-        table_num = max(table_nums) + 1
 
-    return table_num
+def validSets(packets: np.ndarray) -> np.ndarray:
+    """
+    Check which packet sets are plausible: channels 0..NUM_CHANNELS-1 in order, ZC and WA within the cut buffer size,
+    finite, non-negative float features and an activity consistent with the MAV and RMS
+
+    A flat window (activity 0, e.g. a disconnected electrode) is sent by the firmware with nan mobility and complexity,
+    so nan is accepted for those two features when the activity is 0.
+
+    STATUS: WORKING
+
+    : param packets: packets of packet_dtype, length a multiple of NUM_CHANNELS
+    : type packets: np.ndarray
+    : return: validity of each packet set
+    : rtype: np.ndarray
+    """
+
+    sets = packets.reshape(-1, NUM_CHANNELS)
+    valid = (sets['channel'] == np.arange(start=0, stop=NUM_CHANNELS, step=1)).all(axis=1)
+    for feature in ('zc', 'wa'):
+        valid &= (sets[feature] <= BUFFER_CUT_SIZE).all(axis=1)
+    with np.errstate(invalid='ignore', over='ignore'):
+        for feature in ('mav', 'rms', 'wl', 'hj_a'):
+            valid &= (np.isfinite(sets[feature]) & (sets[feature] >= 0)).all(axis=1)
+        flat = sets['hj_a'] == 0
+        for feature in ('hj_m', 'hj_c'):
+            valid &= ((np.isfinite(sets[feature]) & (sets[feature] >= 0)) | (flat & np.isnan(sets[feature]))).all(axis=1)
+
+        # Activity is the population variance, i.e. rms^2 - mav^2 up to float32 rounding
+        mav = sets['mav'].astype(np.float64)
+        rms = sets['rms'].astype(np.float64)
+        valid &= (np.abs(sets['hj_a'] - (rms**2 - mav**2)) <= 1e-6 * rms**2).all(axis=1)
+
+    return valid
+
+
+class PacketDecoder:
+    """
+    Decode packet sets (one packet per channel) from a byte stream, recovering alignment after corrupted or lost bytes
+
+    When a set fails validSets, bytes are skipped until the next offset holding a valid set. Each set is numbered
+    in transmission order: every set_size skipped bytes (rounded) count as one lost set, so the labels of the
+    following sets stay aligned with the gestures. Whole sets lost without corrupting the stream cannot be detected
+    as the packets carry no sequence number.
+
+    STATUS: WORKING
+    """
+
+    set_size = PACKET_SIZE * NUM_CHANNELS
+
+    def __init__(self) -> None:
+        self.sets = 0  # sets decoded or lost so far
+        self.bytes_received = 0
+        self.bytes_discarded = 0
+        self.corrupted_sets = 0
+        self.lost_sets = 0
+        self.resyncing = False
+        self.skipped = 0
+
+    @property
+    def dropped_packets(self) -> int:
+        return int(np.ceil(self.bytes_discarded / PACKET_SIZE))
+
+    def find_sync(self, buffer: bytes, start: int) -> int:
+        """
+        Offset of the first valid packet set at or after start (None if there is none in the buffer)
+        """
+
+        data = np.frombuffer(buffer=buffer, dtype=np.uint8)
+        end = len(buffer) - self.set_size + 1
+        if end <= start:
+            return None
+        candidates = np.arange(start=start, stop=end, step=1)
+        candidates = candidates[(data[candidates] == 0) & (data[candidates + 1] == 0)]  # channel 0 (little endian)
+        for cha in range(1, NUM_CHANNELS, 1):
+            offsets = candidates + cha * PACKET_SIZE
+            candidates = candidates[(data[offsets] == cha) & (data[offsets + 1] == 0)]
+        for offset in candidates:
+            packets = np.frombuffer(buffer=buffer, dtype=packet_dtype, count=NUM_CHANNELS, offset=int(offset))
+            if validSets(packets=packets)[0]:
+                return int(offset)
+        return None
+
+    def decode(self, buffer: bytearray) -> tuple:
+        """
+        Decode and remove all complete packet sets from the start of the buffer
+
+        : param buffer: received bytes, decoded and discarded bytes are removed in place
+        : type buffer: bytearray
+        : return: packets of packet_dtype ordered channel 0, channel 1, channel 0, ..., and the number of each set
+        : rtype: tuple(np.ndarray, np.ndarray)
+        """
 
+        data = bytes(buffer)  # numpy views would block resizing the buffer
+        decoded = []
+        numbers = []
+        pos = 0
+        while len(data) - pos >= self.set_size:
+            count = (len(data) - pos) // self.set_size
+            packets = np.frombuffer(buffer=data, dtype=packet_dtype, count=count * NUM_CHANNELS, offset=pos)
+            valid = validSets(packets=packets)
+            good = count if valid.all() else int(np.argmin(valid))  # sets before the first invalid set
+            if good:
+                if self.resyncing:  # end of a resynchronisation
+                    lost = int(self.skipped / self.set_size + 0.5)  # inserted noise between intact sets loses nothing
+                    self.lost_sets += lost
+                    self.sets += lost
+                    self.resyncing = False
+                    self.skipped = 0
+                decoded.append(packets[:good * NUM_CHANNELS].copy())
+                numbers.append(np.arange(start=self.sets, stop=self.sets + good, step=1))
+                self.sets += good
+                pos += good * self.set_size
+            if good == count:
+                break
 
-def collectFeatureData(port: str, baud: int, hdfFile: str, repetitions: int) -> None:
+            # Resynchronise
+            if not self.resyncing:
+                self.corrupted_sets += 1
+                self.resyncing = True
+            sync = self.find_sync(buffer=data, start=pos + 1)
+            new_pos = sync if sync is not None else max(pos, len(data) - self.set_size + 1)  # keep a tail that may start a set
+            self.skipped += new_pos - pos
+            self.bytes_discarded += new_pos - pos
+            pos = new_pos
+            if sync is None:
+                break
+        del buffer[:pos]
+
+        if not decoded:
+            return np.empty(shape=0, dtype=packet_dtype), np.empty(shape=0, dtype=np.int64)
+        return np.concatenate(decoded), np.concatenate(numbers)
+
+
+def packetRows(packets: np.ndarray, labels, timestamp) -> np.ndarray:
+    """
+    Join the channel packets of each repetition into rows of the featureData table layout
+
+    STATUS: WORKING
+
+    : param packets: packets of packet_dtype as returned by PacketDecoder.decode
+    : type packets: np.ndarray
+    : param labels: gesture label of each row
+    : type labels: integer or array-like
+    : param timestamp: timestamp [ns] of each row
+    : type timestamp: integer or array-like
+    : return: structured array ready for Table.append()
+    : rtype: np.ndarray
+    """
+
+    rows = np.empty(shape=packets.shape[0] // NUM_CHANNELS, dtype=feature_dtype)
+    rows['timestamp'] = timestamp
+    rows['label'] = labels
+    for cha in range(0, NUM_CHANNELS, 1):
+        channel_packets = packets[cha::NUM_CHANNELS]
+        for feature in extracted_features:
+            rows['ch' + str(object=cha) + '_' + feature] = channel_packets[feature]
+
+    return rows
+
+
+class PacketReader(threading.Thread):
+    """
+    Background thread draining the serial input buffer and decoding all complete packet sets at once
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, link) -> None:
+        super().__init__(name='PacketReader', daemon=True)
+        self.link = link
+        self.buffer = bytearray()
+        self.packets = queue.Queue()
+        self.stop_event = threading.Event()
+        self.error = None
+        self.decoder = PacketDecoder()
+
+    def run(self) -> None:
+        try:
+            while not self.stop_event.is_set():
+                serial_read = self.link.read(size=max(1, self.link.in_waiting))  # whatever is buffered, or wait for 1 byte
+                if not serial_read:  # timeout
+                    continue
+                timestamp = tm.time_ns()
+                self.decoder.bytes_received += len(serial_read)
+                self.buffer += serial_read
+                with span(name='decode_packets', bytes_read=len(serial_read)) as s:
+                    packets, numbers = self.decoder.decode(buffer=self.buffer)
+                    s.add(counter='packets_decoded', n=packets.shape[0])
+                if packets.shape[0]:
+                    self.packets.put((timestamp, packets, numbers))
+        except Exception as e:
+            self.error = e
+            self.packets.put(None)
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.join()
+
+
+def collectFeatureData(port: str, baud: int, hdfFile: str, repetitions: int, compressed: bool = True) -> None:
     """
     Read the feature data from the specified serial port, decode it and add it to the .h5 file.
 
     STATUS: WORKING
 
-    : param port: serial comport to read from
+    : param port: serial comport, device path or pySerial URL to read from
     : type port: string
     : param baud: serial comport baudrate
     : type baud: integer
@@ -78,6 +283,8 @@ def collectFeatureData(port: str, baud: int, hdfFile: str, repetitions: int) ->
     : type h5file: File object
     : param repetitions: number of repetitions to record for each gesture
     : type repetitions: integer
+    : param compressed: create the table with the chunked, compressed layout
+    : type compressed: boolean
     : return: table number
     : rtype: integer
     """
@@ -100,74 +307,73 @@ def collectFeatureData(port: str, baud: int, hdfFile: str, repetitions: int) ->
         group._v_attrs.creation = dt.datetime.now().strftime("%d/%m/%Y, %H:%M:%S")  # add date group created to metadata
         print("New file created")
 
+    link = None
+    featureTable = None
     try:
         # Define .h5 file structure
         table_num = get_set_num(h5file=h5file)
         table_name = "fset_" + str(object=table_num)
         print(f"Table: {table_name}")
         session_time = dt.datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
-        featureTable = h5file.create_table(where="/features", name=table_name, description=featureData, title=f"Feature data for session {session_time}")  # new table created for each gesture
-        data = featureTable.row
+        featureTable = createFeatureTable(h5file=h5file, name=table_name, description=featureData, title=f"Feature data for session {session_time}",
+                                          expectedrows=NUM_GESTURES * repetitions, compressed=compressed)  # new table created for each session
 
         # Define the serial connection
         print("Attempting to establish serial connection")
-        link = serial.Serial(port=port, baudrate=baud, bytesize=serial.EIGHTBITS, timeout=None, parity=serial.PARITY_NONE)
-        if link.is_open:
-            link.close()
-            link.open()
-        else:
-            link.open()
-        link.reset_input_buffer()
+        link = openLink(port=port, baud=baud, timeout=0.1, parity=serial.PARITY_NONE)
 
         if link:
             print("Serial connection established")
             print("Starting...")
 
-            for ges in range(0, NUM_GESTURES, 1):
-                print(f"Gesture: {gesture_map[ges]}")
-
-                for rep in range(0, repetitions, 1):
-                    print(f"Repetition: {rep}")
-                    #print(f"Rep Start = {tm.time_ns()} ns")
-
-                    for cha in range(0, NUM_CHANNELS, 1):
-                        print(f"Channel: {cha}")
-
-                        # Read & decode data
-                        serial_read = link.read(size=32)
-                        #print(f"Bytes in input buffer: {link.in_waiting}")
-                        feature_struct = struct.unpack('@HfffHHfff', serial_read)
-                        #print(serial_read.hex(sep=':'))
-                        #print(feature_struct)
-
-                        # Check
-                        if feature_struct[0] != cha:
-                            print("\nERROR: DATA MISALNMENT!")
-                            print(f"EXPECTED DATA FOR CHANNEL {cha}, RECEIVED DATA FOR CHANNEL {feature_struct[0]}")
-                            print("EXITING...\n")
-                            link.close()
-                            h5file.close()
-                            exit(code=1)
-
-                        # Add data to buffer
-                        if cha == 0:
-                            data['timestamp'] = np.uint64(tm.time_ns())
-                            data['label'] = ges
-                        data['ch' + str(object=cha) + '_mav'] = feature_struct[1]
-                        data['ch' + str(object=cha) + '_rms'] = feature_struct[2]
-                        data['ch' + str(object=cha) + '_wl'] = feature_struct[3]
-                        data['ch' + str(object=cha) + '_zc'] = feature_struct[4]
-                        data['ch' + str(object=cha) + '_wa'] = feature_struct[5]
-                        data['ch' + str(object=cha) + '_hj_a'] = feature_struct[6]
-                        data['ch' + str(object=cha) + '_hj_m'] = feature_struct[7]
-                        data['ch' + str(object=cha) + '_hj_c'] = feature_struct[8]
-                        if cha == 1:
-                            data.append()
-
-                    #print(f"Rep End = {tm.time_ns()} ns")
-
-                # Write data to file
-                featureTable.flush()
+            reader = PacketReader(link=link)
+            reader.start()
+            start_time = tm.time()
+            num_rows = NUM_GESTURES * repetitions
+            set_count = 0
+            link_history = []
+            while set_count < num_rows:
+                # Wait for decoded data
+                item = reader.packets.get()
+                if item is None:
+                    raise reader.error
+                timestamp, packets, numbers = item
+
+                # Add data to table, lost sets are left out but still count towards the repetitions
+                keep = numbers < num_rows
+                labels = numbers[keep] // repetitions
+                keep = np.repeat(keep, NUM_CHANNELS)
+                with span(name='hdf5_append', rows_written=labels.shape[0]):
+                    featureTable.append(rows=packetRows(packets=packets[keep], labels=labels, timestamp=np.uint64(timestamp)))
+
+                for r in range(set_count, min(int(numbers[-1]) + 1, num_rows), 1):
+                    if r % repetitions == 0:
+                        print(f"Gesture: {gesture_map[r // repetitions]}")
+                    print(f"Repetition: {r % repetitions}" + ("" if r in numbers else " (LOST)"))
+                    if r % repetitions == repetitions - 1:
+                        # Write data to file
+                        with span(name='hdf5_flush'):
+                            featureTable.flush()
+                        decoder = reader.decoder
+                        link_history.append((tm.time() - start_time, decoder.bytes_received, decoder.bytes_discarded, decoder.lost_sets))
+                set_count = int(numbers[-1]) + 1
+
+            reader.stop()
+            featureTable.flush()
+
+            # Record link statistics
+            decoder = reader.decoder
+            duration = tm.time() - start_time
+            featureTable.attrs.bytes_received = decoder.bytes_received
+            featureTable.attrs.bytes_discarded = decoder.bytes_discarded
+            featureTable.attrs.dropped_packets = decoder.dropped_packets
+            featureTable.attrs.corrupted_sets = decoder.corrupted_sets
+            featureTable.attrs.lost_repetitions = decoder.lost_sets
+            featureTable.attrs.duration = duration
+            featureTable.attrs.throughput = decoder.bytes_received / duration  # bytes/s
+            featureTable.attrs.link_history = np.array(object=link_history, dtype=np.float64)  # per gesture: time [s], received, discarded, lost
+            print(f"Received: {decoder.bytes_received} bytes in {duration:.1f} s ({decoder.bytes_received/duration:.0f} bytes/s)")
+            print(f"Dropped Packets: {decoder.dropped_packets}, Corrupted Sets: {decoder.corrupted_sets}, Lost Repetitions: {decoder.lost_sets}")
 
         print("Data Collection Completed Successfully")
         print("EXITING...")
@@ -179,5 +385,8 @@ def collectFeatureData(port: str, baud: int, hdfFile: str, repetitions: int) ->
         import traceback
         traceback.print_exc()
     finally:
-        link.close()
+        if link is not None:
+            link.close()
+        if featureTable is not None:
+            recordSession(h5file=h5file, table=featureTable, repetitions=repetitions)  # also catalogue incomplete sessions
         h5file.close()
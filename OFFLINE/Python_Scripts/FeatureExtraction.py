@@ -0,0 +1,141 @@
+# HOST-SIDE FEATURE EXTRACTION FUNCTIONS
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Mirrors the extract() function in fdcReceiver.ino, batched over (windows, channels, samples)
+
+
+import time as tm
+import numpy as np
+from FeatureCollection import feature_dtype
+from config import SMOOTH, WINDOW, TONE_ON, START_CUT_ERROR, BUFFER_CUT_SIZE, ZERO_OFFSET, WILLISON_THRESHOLD, extracted_features
+
+
+def smooth(data: np.ndarray, window: int = WINDOW) -> np.ndarray:
+    """
+    Moving average smoothing along the last axis.
+
+    As in the firmware only buffer_size - window means are computed (the final full window is dropped).
+
+    STATUS: WORKING
+
+    : param data: raw data of shape (..., samples)
+    : type data: np.ndarray
+    : param window: moving average window length
+    : type window: integer
+    : return: smoothed data of shape (..., samples - window)
+    : rtype: np.ndarray
+    """
+
+    data = np.asarray(data, dtype=np.float64)
+    cumulative = np.cumsum(a=data, axis=-1)
+    cumulative = np.concatenate((np.zeros(shape=data.shape[:-1] + (1,)), cumulative), axis=-1)
+    size = data.shape[-1] - window
+
+    return (cumulative[..., window:window + size] - cumulative[..., :size]) / window
+
+
+def cut(data: np.ndarray) -> np.ndarray:
+    """
+    Reduce the data to the range in which the gesture was performed (tone_on - start_cut_error onwards).
+
+    STATUS: WORKING
+
+    : param data: data of shape (..., samples)
+    : type data: np.ndarray
+    : return: data of shape (..., BUFFER_CUT_SIZE)
+    : rtype: np.ndarray
+    """
+
+    start = TONE_ON - START_CUT_ERROR
+    if data.shape[-1] < start + BUFFER_CUT_SIZE:
+        raise ValueError(f"Buffer of {data.shape[-1]} samples is too short to cut {BUFFER_CUT_SIZE} samples from index {start}")
+
+    return data[..., start:start + BUFFER_CUT_SIZE]
+
+
+def extractFeatures(data: np.ndarray, smoothing: bool = SMOOTH) -> np.ndarray:
+    """
+    Compute MAV, RMS, WL, ZC, WA and the Hjorth activity, mobility and complexity for every window and channel in one pass.
+
+    The Hjorth differentials are computed as in the firmware, i.e. zero-padded to the buffer length
+    before the mean and (n - 1) variance are taken.
+
+    STATUS: WORKING
+
+    : param data: raw data [V] of shape (windows, channels, samples)
+    : type data: np.ndarray
+    : param smoothing: perform moving average smoothing before feature extraction
+    : type smoothing: boolean
+    : return: features of shape (windows, channels, 8) in the extracted_features order
+    : rtype: np.ndarray
+    """
+
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim != 3:
+        raise ValueError(f"Expected data of shape (windows, channels, samples), got {data.shape}")
+    if smoothing:
+        data = smooth(data=data)
+    data = cut(data=data)
+    buffer_size = data.shape[-1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):  # flat windows produce nan/inf, as on the Teensy
+        # Mean Absolute Value (MAV)
+        mean_absolute_value = data.mean(axis=-1)
+
+        # Root Mean Square (RMS)
+        root_mean_square = np.sqrt(np.mean(a=data**2, axis=-1))
+
+        # Waveform Length (WL)
+        df = np.diff(a=data, axis=-1)
+        abs_df = np.abs(df)
+        waveform_length = abs_df.sum(axis=-1)
+
+        # Zero Crossings (ZC)
+        above = data >= ZERO_OFFSET
+        zero_crossings = np.count_nonzero(above[..., 1:] != above[..., :-1], axis=-1)
+
+        # Willison Amplitude (WA)
+        willison_amplitude = np.count_nonzero(abs_df >= WILLISON_THRESHOLD, axis=-1)
+
+        # Activity (HJ_A)
+        activity = np.mean(a=(data - mean_absolute_value[..., None])**2, axis=-1)
+
+        # Mobility (HJ_M)
+        pad = np.zeros(shape=data.shape[:-1] + (1,))
+        df_one = np.concatenate((df, pad), axis=-1)
+        var_one = np.sum(a=(df_one - df_one.mean(axis=-1, keepdims=True))**2, axis=-1) / (buffer_size - 1)
+        mobility = np.sqrt(var_one / activity)
+
+        # Complexity (HJ_C)
+        df_two = np.concatenate((np.diff(a=df_one, axis=-1), pad), axis=-1)
+        var_two = np.sum(a=(df_two - df_two.mean(axis=-1, keepdims=True))**2, axis=-1) / (buffer_size - 1)
+        complexity = np.sqrt(var_two / var_one) / mobility
+
+    return np.stack((mean_absolute_value, root_mean_square, waveform_length, zero_crossings,
+                     willison_amplitude, activity, mobility, complexity), axis=-1)
+
+
+def featureRows(features: np.ndarray, labels, timestamps=None) -> np.ndarray:
+    """
+    Pack extracted features into rows of the featureData table layout.
+
+    STATUS: WORKING
+
+    : param features: features of shape (windows, channels, 8) as returned by extractFeatures
+    : type features: np.ndarray
+    : param labels: gesture label for each window (or a single label for all windows)
+    : type labels: integer or array-like
+    : param timestamps: timestamp [ns] for each window (default: current time for all windows)
+    : type timestamps: integer or array-like
+    : return: structured array ready for Table.append()
+    : rtype: np.ndarray
+    """
+
+    rows = np.empty(shape=features.shape[0], dtype=feature_dtype)
+    rows['timestamp'] = np.uint64(tm.time_ns()) if timestamps is None else timestamps
+    rows['label'] = labels
+    for cha in range(0, features.shape[1], 1):
+        for f, feature in enumerate(extracted_features):
+            rows['ch' + str(object=cha) + '_' + feature] = features[:, cha, f]  # cast to float32 as in the feature struct
+
+    return rows
@@ -0,0 +1,161 @@
+# FILTER FEATURE RANKING FUNCTIONS USED BY CLASSIFICATION.PY
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Methods are registered in ranking_methods, each maps (X, y, stats) to one score per feature (higher is better)
+# NOTE: ANOVA F and Fisher score share one pass of class statistics, ReliefF uses per-class neighbour indexes
+
+
+import time
+import numpy as np
+import pandas as pd
+from sklearn.feature_selection import mutual_info_classif
+from sklearn.neighbors import NearestNeighbors
+
+
+relief_samples = 200  # instances sampled by ReliefF
+relief_neighbours = 10  # nearest hits and misses per class used by ReliefF
+random_state = 0
+
+
+class ClassStatistics:
+    """
+    Class counts, means and variances of every feature, computed once for all filter methods
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, X: np.ndarray, y: np.ndarray) -> None:
+        self.classes, self.y_encoded = np.unique(y, return_inverse=True)
+        one_hot = np.eye(self.classes.shape[0])[self.y_encoded]
+        self.counts = one_hot.sum(axis=0)
+        self.means = (one_hot.T @ X) / self.counts[:, None]
+        self.variances = (one_hot.T @ (X - self.means[self.y_encoded]) ** 2) / self.counts[:, None]
+        self.mean = X.mean(axis=0)
+
+
+def anova_f(X: np.ndarray, y: np.ndarray, stats: ClassStatistics) -> np.ndarray:
+    """
+    ANOVA F statistic: between-class over within-class mean squares (as f_classif)
+
+    : rtype: np.ndarray
+    """
+
+    n_classes = stats.classes.shape[0]
+    between = (stats.counts[:, None] * (stats.means - stats.mean) ** 2).sum(axis=0) / (n_classes - 1)
+    within = (stats.counts[:, None] * stats.variances).sum(axis=0) / (X.shape[0] - n_classes)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nan_to_num(between / within, nan=0.0, posinf=0.0)
+
+
+def fisher_score(X: np.ndarray, y: np.ndarray, stats: ClassStatistics) -> np.ndarray:
+    """
+    Fisher score: sum(n_c (mean_c - mean)^2) / sum(n_c var_c)
+
+    : rtype: np.ndarray
+    """
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = (stats.counts[:, None] * (stats.means - stats.mean) ** 2).sum(axis=0) / (stats.counts[:, None] * stats.variances).sum(axis=0)
+    return np.nan_to_num(score, nan=0.0, posinf=0.0)
+
+
+def mutual_information(X: np.ndarray, y: np.ndarray, stats: ClassStatistics) -> np.ndarray:
+    """
+    Mutual information between each feature and the label (k-nearest neighbour estimate)
+
+    : rtype: np.ndarray
+    """
+
+    return mutual_info_classif(X=X, y=stats.y_encoded, random_state=random_state)
+
+
+def relieff(X: np.ndarray, y: np.ndarray, stats: ClassStatistics) -> np.ndarray:
+    """
+    ReliefF weights: for sampled instances, mean feature difference to the nearest misses of each other class
+    (weighted by class prior) minus that to the nearest hits, on range-normalised features
+
+    : rtype: np.ndarray
+    """
+
+    span = X.max(axis=0) - X.min(axis=0)
+    Z = (X - X.min(axis=0)) / np.where(span > 0, span, 1.0)
+    rng = np.random.default_rng(seed=random_state)
+    sample = rng.choice(X.shape[0], size=min(relief_samples, X.shape[0]), replace=False)
+    priors = stats.counts / stats.counts.sum()
+    weights = np.zeros(shape=X.shape[1])
+    for c in range(0, stats.classes.shape[0], 1):
+        members = np.flatnonzero(stats.y_encoded == c)
+        if members.shape[0] < 2:
+            continue
+        k = min(relief_neighbours, members.shape[0] - 1)
+        index = NearestNeighbors(n_neighbors=k + 1, metric='manhattan').fit(Z[members])
+        # Nearest hits of the sampled instances of class c (the first neighbour is the instance itself)
+        own = sample[stats.y_encoded[sample] == c]
+        if own.shape[0]:
+            _, hits = index.kneighbors(X=Z[own], n_neighbors=k + 1)
+            weights -= np.abs(Z[own][:, None, :] - Z[members[hits[:, 1:]]]).mean(axis=1).sum(axis=0)
+        # Nearest misses in class c of the sampled instances of the other classes
+        other = sample[stats.y_encoded[sample] != c]
+        if other.shape[0]:
+            _, misses = index.kneighbors(X=Z[other], n_neighbors=k)
+            scale = priors[c] / (1.0 - priors[stats.y_encoded[other]])
+            weights += (scale[:, None] * np.abs(Z[other][:, None, :] - Z[members[misses]]).mean(axis=1)).sum(axis=0)
+
+    return weights / sample.shape[0]
+
+
+ranking_methods = {'mi': mutual_information, 'anova': anova_f, 'fisher': fisher_score, 'relieff': relieff}
+
+
+def rankFeatures(X, y, feature_names: list, methods: tuple = ('mi', 'anova', 'fisher', 'relieff')) -> pd.DataFrame:
+    """
+    Score every feature with each filter method and rank them by their mean rank over the methods
+
+    STATUS: WORKING
+
+    : param X: training features
+    : type X: array-like
+    : param y: training labels
+    : type y: array-like
+    : param feature_names: column names (chN_<feature>)
+    : type feature_names: list
+    : param methods: filter methods from ranking_methods
+    : type methods: tuple
+    : return: one row per feature (feature, channel, type, score and rank of each method, mean_rank, rank, type_rank),
+              best first; type_rank ranks the feature types by their mean rank over both channels; the time [s] of
+              each method is in .attrs['timings']
+    : rtype: pd.DataFrame
+    """
+
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    timings = {}
+    start = time.perf_counter()
+    stats = ClassStatistics(X=X, y=y)
+    timings['statistics'] = time.perf_counter() - start
+    table = pd.DataFrame(data={'feature': feature_names,
+                               'channel': [name.split('_', 1)[0] for name in feature_names],
+                               'type': [name.split('_', 1)[-1] for name in feature_names]})
+    for method in methods:
+        start = time.perf_counter()
+        table[method] = ranking_methods[method](X=X, y=y, stats=stats)
+        timings[method] = time.perf_counter() - start
+        table[method + '_rank'] = table[method].rank(method='min', ascending=False).astype(int)
+    table['mean_rank'] = table[[method + '_rank' for method in methods]].mean(axis=1)
+    table['rank'] = table['mean_rank'].rank(method='min').astype(int)
+    table['type_rank'] = table.groupby(by='type')['mean_rank'].transform('mean').rank(method='dense').astype(int)
+    table = table.sort_values(by=['rank', 'feature'], kind='stable', ignore_index=True)
+    table.attrs['timings'] = timings
+
+    return table
+
+
+def top_features(table: pd.DataFrame, k: int, feature_names: list) -> list:
+    """
+    Names of the k best ranked features of a rankFeatures table, in feature_names order
+
+    : rtype: list
+    """
+
+    best = set(table['feature'].head(n=k))
+    return [name for name in feature_names if name in best]
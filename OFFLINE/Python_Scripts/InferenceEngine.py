@@ -0,0 +1,261 @@
+# LOW-LATENCY INFERENCE FUNCTIONS
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Numpy only, the fitted sklearn estimators are compiled into precomputed arrays so single-sample predictions skip sklearn's input validation and dispatch
+# NOTE: Predictions match sklearn's, except for k-nearest neighbours with equidistant neighbours at the k-th distance (sklearn's own algorithms break these ties differently)
+
+
+import numpy as np
+
+
+BRUTE_FORCE_ROWS = 20000  # training sets up to this size are searched by brute force, larger ones with a KD-tree
+BATCH_ROWS = 1024  # rows per kernel block in batched predictions
+BLOCK_ELEMENTS = 2 ** 22  # most elements (32 MB of float64) of a brute-force difference block
+
+
+class SVCEvaluator:
+    """
+    One-vs-one SVC decision functions as one kernel expansion: dec = K(X, SV) @ W + b, then libsvm's vote
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, estimator) -> None:
+        self.classes = estimator.classes_
+        self.kernel = estimator.kernel
+        self.gamma = float(estimator._gamma)
+        self.coef0 = float(estimator.coef0)
+        self.degree = int(estimator.degree)
+        support_vectors = np.asarray(estimator.support_vectors_, dtype=np.float64)
+        dual_coef = np.asarray(estimator._dual_coef_, dtype=np.float64)
+        n_classes = self.classes.shape[0]
+        starts = np.concatenate(([0], np.cumsum(estimator._n_support)))
+
+        # Decision function of class pair (i, j): sum of the class i and class j support vector coefficients (libsvm layout)
+        pairs = [(i, j) for i in range(0, n_classes, 1) for j in range(i + 1, n_classes, 1)]
+        W = np.zeros(shape=(support_vectors.shape[0], len(pairs)), dtype=np.float64)
+        for p, (i, j) in enumerate(pairs):
+            W[starts[i]:starts[i + 1], p] = dual_coef[j - 1, starts[i]:starts[i + 1]]
+            W[starts[j]:starts[j + 1], p] = dual_coef[i, starts[j]:starts[j + 1]]
+        self.intercept = np.asarray(estimator._intercept_, dtype=np.float64)
+
+        # libsvm vote: dec > 0 votes for class i of the pair, otherwise for class j, i.e. votes = (dec > 0) @ D + c
+        first = np.eye(n_classes)[[i for i, _ in pairs]]
+        second = np.eye(n_classes)[[j for _, j in pairs]]
+        self.vote_diff = first - second
+        self.vote_base = second.sum(axis=0)
+
+        # break_ties: argmax of sklearn's ovr decision function (votes plus summed pair confidences squashed into (-1/3, 1/3))
+        if estimator.break_ties and estimator.decision_function_shape == 'ovo':
+            raise ValueError("break_ties must be False when decision_function_shape is 'ovo'")
+        self.break_ties = estimator.break_ties and n_classes > 2
+
+        if self.kernel == 'linear':  # fold the support vectors into the weights
+            self.W = support_vectors.T @ W
+        elif self.kernel in ('rbf', 'poly', 'sigmoid'):
+            self.W = W
+            self.support_vectors = support_vectors
+            self.sv_norms = np.einsum('ij,ij->i', support_vectors, support_vectors)
+        else:
+            raise ValueError(f"Unsupported SVC kernel {self.kernel}")
+
+    def decision(self, Z: np.ndarray) -> np.ndarray:
+        if self.kernel == 'linear':
+            return Z @ self.W + self.intercept
+        dot = Z @ self.support_vectors.T
+        if self.kernel == 'rbf':
+            sq_dist = np.einsum('ij,ij->i', Z, Z)[:, None] + self.sv_norms - 2.0 * dot
+            K = np.exp(-self.gamma * np.maximum(sq_dist, 0.0))
+        elif self.kernel == 'poly':
+            K = (self.gamma * dot + self.coef0) ** self.degree
+        else:
+            K = np.tanh(self.gamma * dot + self.coef0)
+        return K @ self.W + self.intercept
+
+    def predict(self, Z: np.ndarray) -> np.ndarray:
+        dec = self.decision(Z=Z)
+        if self.break_ties:
+            confidence = dec @ self.vote_diff
+            votes = (dec >= 0) @ self.vote_diff + self.vote_base + confidence / (3 * (np.abs(confidence) + 1))
+            return self.classes[votes.argmax(axis=1)]
+        votes = (dec > 0) @ self.vote_diff + self.vote_base
+        return self.classes[votes.argmax(axis=1)]  # ties go to the lowest class, as in libsvm
+
+
+class KNNEvaluator:
+    """
+    k-nearest neighbours vote over a brute-force distance scan (small training sets) or a KD-tree index
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, estimator) -> None:
+        self.classes = estimator.classes_
+        self.labels = np.asarray(estimator._y, dtype=np.intp)  # class indexes of the training rows
+        self.train = np.asarray(estimator._fit_X, dtype=np.float64)
+        self.k = int(estimator.n_neighbors)
+        self.weights = estimator.weights
+        if callable(self.weights):
+            raise ValueError("Unsupported callable KNN weights")
+        metric = estimator.effective_metric_
+        params = estimator.effective_metric_params_
+        if metric == 'euclidean':
+            self.p = 2.0
+        elif metric == 'manhattan':
+            self.p = 1.0
+        elif metric == 'chebyshev':
+            self.p = np.inf
+        elif metric == 'minkowski' and params.get('w') is None:
+            self.p = float(params.get('p', estimator.p))
+        else:
+            raise ValueError(f"Unsupported KNN metric {metric}")
+        self.tree = None
+        if self.train.shape[0] > BRUTE_FORCE_ROWS:
+            from scipy.spatial import cKDTree
+            self.tree = cKDTree(data=self.train)
+
+    def neighbours(self, Z: np.ndarray) -> tuple:
+        if self.tree is not None:
+            dist, index = self.tree.query(x=Z, k=self.k, p=self.p)
+            return dist.reshape(Z.shape[0], self.k), index.reshape(Z.shape[0], self.k)
+        rows = max(1, BLOCK_ELEMENTS // self.train.size)
+        if Z.shape[0] > rows:
+            blocks = [self.neighbours(Z=Z[i:i + rows]) for i in range(0, Z.shape[0], rows)]
+            return np.concatenate([d for d, _ in blocks]), np.concatenate([i for _, i in blocks])
+        # Neighbours are selected on the reduced distance (no root), as in sklearn's trees
+        diff = Z[:, None, :] - self.train[None, :, :]
+        if self.p == 2.0:
+            dist = np.einsum('ijk,ijk->ij', diff, diff)
+        elif self.p == 1.0:
+            dist = np.abs(diff).sum(axis=2)
+        elif self.p == np.inf:
+            dist = np.abs(diff).max(axis=2)
+        else:
+            dist = (np.abs(diff) ** self.p).sum(axis=2)
+        if self.k < dist.shape[1]:
+            index = np.argpartition(dist, kth=self.k - 1, axis=1)[:, :self.k]
+        else:
+            index = np.broadcast_to(np.arange(dist.shape[1]), dist.shape)
+        dist = np.take_along_axis(dist, index, axis=1)
+        if self.p not in (1.0, np.inf):
+            dist = dist ** (1.0 / self.p)
+        return dist, index
+
+    def predict(self, Z: np.ndarray) -> np.ndarray:
+        dist, index = self.neighbours(Z=Z)
+        labels = self.labels[index]
+        if self.weights == 'distance':
+            with np.errstate(divide='ignore'):
+                weights = 1.0 / dist
+            exact = np.isinf(weights)
+            rows = exact.any(axis=1)
+            weights[rows] = exact[rows]  # exact matches outvote everything else, as in sklearn
+        else:
+            weights = None
+        n_classes = self.classes.shape[0]
+        votes = np.bincount((labels + n_classes * np.arange(Z.shape[0])[:, None]).ravel(), weights=None if weights is None else weights.ravel(),
+                            minlength=Z.shape[0] * n_classes).reshape(Z.shape[0], n_classes)
+        return self.classes[votes.argmax(axis=1)]
+
+
+class CNBEvaluator:
+    """
+    Complement naive Bayes as one log-probability matrix product
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, estimator) -> None:
+        self.classes = estimator.classes_
+        self.W = np.ascontiguousarray(np.asarray(estimator.feature_log_prob_, dtype=np.float64).T)
+        self.prior = np.asarray(estimator.class_log_prior_, dtype=np.float64) if self.classes.shape[0] == 1 else 0.0
+
+    def predict(self, Z: np.ndarray) -> np.ndarray:
+        return self.classes[(Z @ self.W + self.prior).argmax(axis=1)]
+
+
+evaluators = {'SVC': SVCEvaluator, 'KNeighborsClassifier': KNNEvaluator, 'ComplementNB': CNBEvaluator}
+
+
+def compileEstimator(estimator):
+    """
+    Compile a fitted SVC, KNeighborsClassifier or ComplementNB into a numpy evaluator
+
+    STATUS: WORKING
+
+    : param estimator: fitted classifier
+    : type estimator: sklearn estimator
+    : return: evaluator with a predict(Z) method taking scaled, selected features of shape (samples, features)
+    : rtype: SVCEvaluator, KNNEvaluator or CNBEvaluator
+    """
+
+    name = type(estimator).__name__
+    if name not in evaluators:
+        raise ValueError(f"No compiled evaluator for {name}, expected one of {list(evaluators)}")
+
+    return evaluators[name](estimator)
+
+
+class CompiledModel:
+    """
+    Drop-in replacement of GestureModel: the MinMax scaling is restricted to the selected features and the
+    classifier is compiled with compileEstimator
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, scaler_min, scaler_scale, feature_indexes, dtype, estimator, gesture_map: dict) -> None:
+        self.dtype = np.dtype(dtype)
+        self.feature_indexes = np.asarray(feature_indexes, dtype=np.intp)
+        self.n_features = np.asarray(scaler_scale).shape[0]
+        self.scaler_min = np.asarray(scaler_min, dtype=self.dtype)[self.feature_indexes]
+        self.scaler_scale = np.asarray(scaler_scale, dtype=self.dtype)[self.feature_indexes]
+        self.evaluator = compileEstimator(estimator=estimator)
+        self.gesture_map = gesture_map
+
+    def transform(self, X) -> np.ndarray:
+        """
+        Scale and select features in the training precision, as GestureModel.transform
+
+        : param X: unscaled feature vectors of shape (samples, n_features)
+        : type X: array-like
+        : return: model input of shape (samples, len(feature_indexes))
+        : rtype: np.ndarray
+        """
+
+        X = np.asarray(X).reshape(-1, self.n_features)[:, self.feature_indexes].astype(self.dtype)
+        return (X * self.scaler_scale + self.scaler_min).astype(np.float64)
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict gesture labels for unscaled feature vectors, in blocks of BATCH_ROWS for replays
+
+        : param X: unscaled feature vectors of shape (samples, n_features)
+        : type X: array-like
+        : return: predicted labels
+        : rtype: np.ndarray
+        """
+
+        Z = self.transform(X=X)
+        if Z.shape[0] <= BATCH_ROWS:
+            return self.evaluator.predict(Z=Z)
+        return np.concatenate([self.evaluator.predict(Z=Z[i:i + BATCH_ROWS]) for i in range(0, Z.shape[0], BATCH_ROWS)])
+
+    def predict_gestures(self, X) -> list:
+        return [self.gesture_map[int(label)] for label in self.predict(X=X)]
+
+
+def compileModel(model) -> CompiledModel:
+    """
+    Compile a loaded GestureModel (scaler parameters, selected features and classifier)
+
+    STATUS: WORKING
+
+    : param model: model returned by ModelExport.loadModel
+    : type model: GestureModel
+    : return: compiled model with the same transform/predict/predict_gestures interface
+    : rtype: CompiledModel
+    """
+
+    return CompiledModel(scaler_min=model.scaler_min, scaler_scale=model.scaler_scale, feature_indexes=model.feature_indexes,
+                         dtype=model.dtype, estimator=model.model, gesture_map=model.gesture_map)
@@ -0,0 +1,156 @@
+# SPAN AND COUNTER INSTRUMENTATION FUNCTIONS
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: CPU time is that of the calling process, work done in joblib/process pool workers only shows in the wall time
+
+
+import sys
+import json
+import threading
+import time as tm
+import datetime as dt
+from contextlib import contextmanager
+
+
+enabled = False  # Record spans and counter totals, set by main.py only for --timings/--metrics so long runs do not keep every span
+
+records = []  # finished spans, in completion order
+counters = {}  # process-wide counter totals
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Span:
+    """
+    Wall time, CPU time and counters of one stage
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, name: str, parent: str = None) -> None:
+        self.name = name
+        self.parent = parent
+        self.counters = {}
+        self.start = dt.datetime.now().isoformat(timespec='milliseconds')
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def add(self, counter: str, n: int = 1) -> None:
+        """
+        Add n to a counter of this span and to the process-wide total
+
+        : rtype: None
+        """
+
+        self.counters[counter] = self.counters.get(counter, 0) + n
+        if enabled:
+            with _lock:
+                counters[counter] = counters.get(counter, 0) + n
+
+    def record(self) -> dict:
+        return {'name': self.name, 'parent': self.parent, 'start': self.start, 'wall': self.wall, 'cpu': self.cpu, **self.counters}
+
+
+@contextmanager
+def span(name: str, **initial):
+    """
+    Time a stage, e.g. `with span('import_data') as s: ...; s.add('rows_read', n)`
+
+    Spans nest per thread, the enclosing span is recorded as the parent.
+
+    STATUS: WORKING
+
+    : param name: stage name
+    : type name: string
+    : param initial: counters to start the span with
+    : type initial: integers
+    : return: the running span
+    : rtype: Span
+    """
+
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    s = Span(name=name, parent=stack[-1].name if stack else None)
+    for counter, n in initial.items():
+        s.add(counter=counter, n=n)
+    stack.append(s)
+    wall_start = tm.perf_counter()
+    cpu_start = tm.process_time()
+    try:
+        yield s
+    finally:
+        s.wall = tm.perf_counter() - wall_start
+        s.cpu = tm.process_time() - cpu_start
+        stack.pop()
+        if enabled:
+            with _lock:
+                records.append(s)
+
+
+def summary() -> str:
+    """
+    Table of the recorded spans aggregated by name (calls, total and mean wall time, CPU time and counters)
+
+    STATUS: WORKING
+
+    : return: summary table
+    : rtype: string
+    """
+
+    stages = {}
+    with _lock:
+        for s in records:
+            stage = stages.setdefault(s.name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'counters': {}})
+            stage['calls'] += 1
+            stage['wall'] += s.wall
+            stage['cpu'] += s.cpu
+            for counter, n in s.counters.items():
+                stage['counters'][counter] = stage['counters'].get(counter, 0) + n
+    lines = [f"{'STAGE':>24} {'CALLS':>6} {'WALL [s]':>10} {'MEAN [s]':>10} {'CPU [s]':>10}  COUNTERS"]
+    for name, stage in sorted(stages.items(), key=lambda item: -item[1]['wall']):
+        extra = ', '.join(f"{counter}={n}" for counter, n in stage['counters'].items())
+        lines.append(f"{name:>24} {stage['calls']:>6} {stage['wall']:>10.3f} {stage['wall']/stage['calls']:>10.4f} {stage['cpu']:>10.3f}  {extra}")
+
+    return '\n'.join(lines)
+
+
+def exportMetrics(jsonFile: str) -> None:
+    """
+    Append the recorded spans to a JSON lines file, one object per span
+
+    STATUS: WORKING
+
+    : param jsonFile: .jsonl filename
+    : type jsonFile: string
+    : return: None
+    : rtype: None
+    """
+
+    with _lock:
+        lines = [json.dumps(obj=s.record()) for s in records]
+    with open(file=jsonFile, mode='a') as f:
+        for line in lines:
+            f.write(line + '\n')
+
+
+def peak_rss() -> int:
+    """
+    Peak resident set size of the process [bytes], from resource (POSIX) or psutil (Windows), None if neither is available
+
+    : rtype: integer
+    """
+
+    try:
+        import resource  # POSIX only
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, kB elsewhere
+    except ImportError:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+
+    return getattr(info, 'peak_wset', info.rss)  # peak working set on Windows, current RSS elsewhere
@@ -0,0 +1,141 @@
+# MODEL ARTEFACT EXPORT AND LOADING FUNCTIONS
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Kept free of pandas and sklearn search imports so the online process can load models quickly
+
+
+import copy
+import pickle
+import numpy as np
+from datetime import datetime
+from InferenceEngine import compileModel
+
+
+MODEL_VERSION = 1
+model_filename = 'Gesture_Model.pkl'
+
+
+class GestureModel:
+    """
+    Ready-to-predict model: raw feature vector -> MinMax scaling -> feature selection -> classifier
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, artefact: dict) -> None:
+        self.version = artefact['version']
+        self.created = artefact['created']
+        self.feature_names = artefact['feature_names']
+        self.dtype = np.dtype(artefact['dtype'])
+        self.scaler_min = np.asarray(artefact['scaler_min'], dtype=self.dtype)
+        self.scaler_scale = np.asarray(artefact['scaler_scale'], dtype=self.dtype)
+        self.feature_indexes = np.asarray(artefact['feature_indexes'], dtype=np.intp)
+        self.model = artefact['model']
+        self.gesture_map = artefact['gesture_map']
+        self.data_min = artefact.get('data_min')
+        self.data_max = artefact.get('data_max')
+        self.feature_range = artefact.get('feature_range', (0, 1))
+        self.sessions = artefact.get('sessions')  # training table numbers (None for models exported before it was recorded)
+
+    @property
+    def selected_features(self) -> list:
+        return [self.feature_names[i] for i in self.feature_indexes]
+
+    def transform(self, X) -> np.ndarray:
+        """
+        Scale and select features
+
+        : param X: unscaled feature vectors of shape (samples, len(feature_names))
+        : type X: array-like
+        : return: model input of shape (samples, len(feature_indexes))
+        : rtype: np.ndarray
+        """
+
+        X = np.asarray(X, dtype=self.dtype).reshape(-1, self.scaler_scale.shape[0])  # same precision as in training
+        return (X * self.scaler_scale + self.scaler_min)[:, self.feature_indexes]
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict gesture labels for unscaled feature vectors
+
+        : param X: unscaled feature vectors of shape (samples, len(feature_names))
+        : type X: array-like
+        : return: predicted labels
+        : rtype: np.ndarray
+        """
+
+        return self.model.predict(self.transform(X=X))
+
+    def predict_gestures(self, X) -> list:
+        return [self.gesture_map[int(label)] for label in self.predict(X=X)]
+
+
+def exportModel(modelFile: str, scaler, feature_names: list, selected_features: list, model, gesture_map: dict, sessions: list = None) -> None:
+    """
+    Export the fitted scaler parameters, selected feature indexes, model and gesture map as a versioned artefact
+
+    STATUS: WORKING
+
+    : param modelFile: model filename
+    : type modelFile: string
+    : param scaler: fitted MinMaxScaler (fitted on all feature_names)
+    : type scaler: sklearn.preprocessing.MinMaxScaler
+    : param feature_names: names of the scaler input features
+    : type feature_names: list
+    : param selected_features: names of the features used by the model
+    : type selected_features: list
+    : param model: fitted classifier
+    : type model: sklearn estimator
+    : param gesture_map: label to gesture name map
+    : type gesture_map: dict
+    : param sessions: table numbers of the sessions the model was trained on (used by ModelUpdate.updateModel)
+    : type sessions: list
+    : return: None
+    : rtype: None
+    """
+
+    # The model is given plain arrays at inference time, the feature names are recorded in the artefact instead
+    model = copy.deepcopy(model)
+    if hasattr(model, 'feature_names_in_'):
+        del model.feature_names_in_
+
+    artefact = {'version': MODEL_VERSION,
+                'created': datetime.now().strftime("%d/%m/%Y, %H:%M:%S"),
+                'feature_names': list(feature_names),
+                'dtype': np.dtype(scaler.scale_.dtype).str,
+                'scaler_min': np.asarray(scaler.min_),
+                'scaler_scale': np.asarray(scaler.scale_),
+                'data_min': np.asarray(scaler.data_min_, dtype=np.float64),
+                'data_max': np.asarray(scaler.data_max_, dtype=np.float64),
+                'feature_range': tuple(scaler.feature_range),
+                'feature_indexes': np.array([list(feature_names).index(f) for f in selected_features], dtype=np.intp),
+                'model': model,
+                'gesture_map': {int(k): v for k, v in gesture_map.items()},
+                'sessions': None if sessions is None else [int(n) for n in sessions]}
+
+    with open(file=modelFile, mode='wb') as f:
+        pickle.dump(obj=artefact, file=f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loadModel(modelFile: str, compiled: bool = False):
+    """
+    Load a model artefact written by exportModel
+
+    STATUS: WORKING
+
+    : param modelFile: model filename
+    : type modelFile: string
+    : param compiled: compile the scaler and classifier with InferenceEngine for low-latency predictions
+    : type compiled: boolean
+    : return: ready-to-predict model
+    : rtype: GestureModel or CompiledModel
+    """
+
+    with open(file=modelFile, mode='rb') as f:
+        artefact = pickle.load(file=f)
+    if artefact.get('version') != MODEL_VERSION:
+        raise ValueError(f"{modelFile} has model version {artefact.get('version')}, expected {MODEL_VERSION}")
+
+    model = GestureModel(artefact=artefact)
+
+    return compileModel(model=model) if compiled else model
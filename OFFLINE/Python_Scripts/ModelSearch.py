@@ -0,0 +1,840 @@
+# MODEL SEARCH FUNCTIONS USED BY CLASSIFICATION.PY
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Produces GridSearchCV compatible cv_results so refit_strategy can be used unchanged
+# NOTE: Fold results can be stored in a ResultCache, keyed by the fold data, the candidate parameters and the scoring
+# NOTE: KNN candidates share one neighbour query and SVC candidates one kernel matrix per fold, falling back to a full fit on ties
+
+
+import time
+import pickle
+import sqlite3
+import hashlib
+import sklearn
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.stats import rankdata
+from sklearn.base import BaseEstimator, ClassifierMixin, clone, is_classifier
+from sklearn.metrics import get_scorer
+from sklearn.metrics.pairwise import pairwise_kernels
+from sklearn.neighbors import NearestNeighbors, KNeighborsClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.svm import SVC
+from sklearn.model_selection import ParameterGrid, check_cv, cross_val_score
+
+
+def format_results(candidate_params: list, n_splits: int, fit_times, score_times, test_scores: dict) -> dict:
+    """
+    Build a GridSearchCV style cv_results dictionary
+
+    STATUS: WORKING
+
+    : param candidate_params: parameters of each candidate
+    : type candidate_params: list of dict
+    : param n_splits: number of CV splits
+    : type n_splits: integer
+    : param fit_times: fit times of shape (n_candidates, n_splits)
+    : type fit_times: array-like
+    : param score_times: score times of shape (n_candidates, n_splits)
+    : type score_times: array-like
+    : param test_scores: score name -> scores of shape (n_candidates, n_splits), nan for failed fits
+    : type test_scores: dict
+    : return: cv_results
+    : rtype: dict
+    """
+
+    results = {}
+
+    def _store(key_name, array, splits=False, rank=False):
+        array = np.array(array, dtype=np.float64).reshape(len(candidate_params), n_splits)
+        if splits:
+            for split_idx in range(0, n_splits, 1):
+                results[f"split{split_idx}_{key_name}"] = array[:, split_idx]
+        array_means = np.mean(a=array, axis=1)
+        results[f"mean_{key_name}"] = array_means
+        results[f"std_{key_name}"] = np.sqrt(np.mean(a=(array - array_means[:, np.newaxis])**2, axis=1))
+        if rank:
+            if np.isnan(array_means).all():
+                results[f"rank_{key_name}"] = np.ones_like(array_means, dtype=np.int32)
+            else:  # failed candidates are tied with the worst performers
+                array_means = np.nan_to_num(array_means, nan=np.nanmin(array_means) - 1)
+                results[f"rank_{key_name}"] = rankdata(-array_means, method='min').astype(np.int32)
+
+    _store(key_name='fit_time', array=fit_times)
+    _store(key_name='score_time', array=score_times)
+    for name in sorted(set(k for p in candidate_params for k in p)):
+        results[f"param_{name}"] = np.ma.MaskedArray(data=[p.get(name) for p in candidate_params],
+                                                      mask=[name not in p for p in candidate_params], dtype=object)
+    results['params'] = candidate_params
+    for name, scores in test_scores.items():
+        _store(key_name=f"test_{name}", array=scores, splits=True, rank=True)
+
+    return results
+
+
+ignored_params = {'memory', 'verbose', 'n_jobs'}  # never change the results of a fit
+
+
+def param_token(value):
+    """
+    Hashable description of a parameter value, estimators are described by their full parameters
+
+    : rtype: tuple or string
+    """
+
+    if hasattr(value, 'get_params') and not isinstance(value, type):
+        return (type(value).__module__, type(value).__qualname__,
+                tuple(sorted((k, param_token(value=v)) for k, v in value.get_params(deep=False).items() if k not in ignored_params)))
+    if isinstance(value, dict):
+        return tuple(sorted((repr(k), param_token(value=v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(param_token(value=v) for v in value)
+    if isinstance(value, np.ndarray):
+        return ('ndarray', value.dtype.str, value.shape, hashlib.blake2b(value.tobytes(), digest_size=16).hexdigest())
+    return repr(value)
+
+
+def fold_digest(X: np.ndarray, y: np.ndarray, train: np.ndarray, test: np.ndarray) -> str:
+    """
+    Content digest of the training and test rows of a fold
+
+    : rtype: string
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    for rows in (train, test):
+        for array in (X[rows], y[rows]):
+            array = np.ascontiguousarray(array)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())
+            digest.update(array.tobytes())
+
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent, content-addressed store of CV fold results (scores, fit and score times) and selection paths
+
+    Keys hash the fold data, the candidate parameters, the scoring and the sklearn version, so a result is reused by
+    any later search that evaluates the same candidate on the same rows, whatever grid or split it comes from.
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, cacheFile: str) -> None:
+        """
+        : param cacheFile: .sqlite filename (created if it does not exist)
+        : type cacheFile: string
+        """
+
+        self.cacheFile = cacheFile
+        self.hits = 0
+        self.misses = 0
+        with sqlite3.connect(database=cacheFile) as db:
+            db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB)")
+
+    @staticmethod
+    def key(*parts) -> str:
+        return hashlib.blake2b(pickle.dumps(obj=(sklearn.__version__,) + param_token(value=parts), protocol=4), digest_size=20).hexdigest()
+
+    def get(self, keys: list) -> dict:
+        """
+        Stored results of the given keys
+
+        : rtype: dict
+        """
+
+        keys = list(set(keys))
+        found = {}
+        with sqlite3.connect(database=self.cacheFile) as db:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = db.execute(f"SELECT key, value FROM results WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                found.update((key, pickle.loads(value)) for key, value in rows)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+
+        return found
+
+    def put(self, items: dict) -> None:
+        with sqlite3.connect(database=self.cacheFile) as db:
+            db.executemany("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+                           [(key, pickle.dumps(obj=value, protocol=pickle.HIGHEST_PROTOCOL)) for key, value in items.items()])
+
+
+def candidate_tokens(estimator, candidates: list, cache: ResultCache = None) -> list:
+    """
+    Parameter token of each candidate estimator, the grid's estimator objects are cloned so they are not modified
+
+    : rtype: list
+    """
+
+    if cache is None:
+        return [None] * len(candidates)
+    return [param_token(value=clone(estimator).set_params(**clone(params, safe=False))) for params in candidates]
+
+
+def run_cached(parallel, tasks: list, cache: ResultCache = None) -> list:
+    """
+    Run (key, delayed call) tasks in parallel, skipping tasks whose key is cached or repeated and storing new results
+
+    STATUS: WORKING
+
+    : param parallel: joblib Parallel instance
+    : type parallel: joblib.Parallel
+    : param tasks: (cache key, delayed call) pairs
+    : type tasks: list
+    : param cache: result cache (default: run every task)
+    : type cache: ResultCache
+    : return: results in task order
+    : rtype: list
+    """
+
+    if cache is None:
+        return parallel(call for _, call in tasks)
+    results = cache.get(keys=[key for key, _ in tasks])
+    missing = {key: call for key, call in tasks if key not in results}
+    new = dict(zip(missing.keys(), parallel(missing.values())))
+    cache.put(items=new)
+    results.update(new)
+
+    return [results[key] for key, _ in tasks]
+
+
+def selection_path(estimator, X: np.ndarray, y: np.ndarray, direction: str, cv=5, scoring=None) -> np.ndarray:
+    """
+    Run SequentialFeatureSelector's greedy search to the end and return the order features were chosen in
+
+    A selector with n_features_to_select=k selects the first k features of the forward path, or removes the
+    first n_features - k features of the backward path, so one path answers every n_features_to_select.
+
+    STATUS: WORKING
+
+    : param estimator: selector estimator
+    : type estimator: sklearn estimator
+    : param X: training data
+    : type X: np.ndarray
+    : param y: training labels
+    : type y: np.ndarray
+    : param direction: 'forward' or 'backward'
+    : type direction: string
+    : param cv: selector CV splits
+    : type cv: integer or CV splitter
+    : param scoring: selector scoring
+    : type scoring: string, callable or None
+    : return: feature indexes in the order they were added (forward) or removed (backward)
+    : rtype: np.ndarray
+    """
+
+    n_features = X.shape[1]
+    cv = check_cv(cv, y, classifier=is_classifier(estimator))
+    estimator = clone(estimator)
+    current_mask = np.zeros(shape=n_features, dtype=bool)
+    path = []
+    for _ in range(0, n_features - 1, 1):
+        scores = {}
+        for feature_idx in np.flatnonzero(~current_mask):
+            candidate_mask = current_mask.copy()
+            candidate_mask[feature_idx] = True
+            if direction == 'backward':
+                candidate_mask = ~candidate_mask
+            scores[feature_idx] = cross_val_score(estimator, X[:, candidate_mask], y, cv=cv, scoring=scoring).mean()
+        new_feature_idx = max(scores, key=lambda feature_idx: scores[feature_idx])  # first best, as in sklearn
+        current_mask[new_feature_idx] = True
+        path.append(new_feature_idx)
+
+    return np.array(path, dtype=np.intp)
+
+
+def path_support(path: np.ndarray, n_features: int, n_features_to_select: int, direction: str) -> np.ndarray:
+    """
+    Selected feature mask for n_features_to_select taken from a selection path
+
+    : return: boolean support mask (None if n_features_to_select is invalid, as SequentialFeatureSelector would raise)
+    : rtype: np.ndarray
+    """
+
+    if not 0 < n_features_to_select < n_features:
+        return None
+    if direction == 'forward':
+        support = np.zeros(shape=n_features, dtype=bool)
+        support[path[:n_features_to_select]] = True
+    else:
+        support = np.ones(shape=n_features, dtype=bool)
+        support[path[:n_features - n_features_to_select]] = False
+
+    return support
+
+
+def _timed_path(estimator, direction, X, y, train, cv, scoring):
+    start = time.perf_counter()
+    path = selection_path(estimator=estimator, X=X[train], y=y[train], direction=direction, cv=cv, scoring=scoring)
+    return path, time.perf_counter() - start
+
+
+def _fit_and_score(classifier, X, y, support, train, test, scorers):
+    X_support = X[:, support]
+    start = time.perf_counter()
+    classifier = clone(classifier).fit(X_support[train], y[train])
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    scores = {name: scorer(classifier, X_support[test], y[test]) for name, scorer in scorers.items()}
+    return scores, fit_time, time.perf_counter() - start
+
+
+class PathFeatureSearchCV:
+    """
+    Drop-in replacement for GridSearchCV over a ('selector', 'classifier') Pipeline with a SequentialFeatureSelector
+
+    - One selection path is computed per (selector estimator, direction, fold) and shared by every n_features_to_select
+    - Classifier fits are cached per (fold, selected features), as different selectors often agree
+    - Paths and fits are spread across a process pool
+    - Paths and fits found in the result cache are not recomputed
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, estimator, param_grid, scoring: list, refit, cv: int = 5, n_jobs: int = -1, verbose: int = 0, cache: ResultCache = None) -> None:
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.scoring = scoring
+        self.refit = refit
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+        self.cache = cache
+
+    def fit(self, X, y):
+        X_frame = X
+        X = np.asarray(X)
+        y = np.asarray(y)
+        n_features = X.shape[1]
+        selector = self.estimator.named_steps['selector']
+        classifier = self.estimator.named_steps['classifier']
+        scorers = {name: get_scorer(name) for name in self.scoring}
+        candidate_params = list(ParameterGrid(self.param_grid))
+        folds = list(check_cv(self.cv, y, classifier=True).split(X, y))
+        digests = [fold_digest(X=X, y=y, train=train, test=test) for train, test in folds] if self.cache is not None else [None] * len(folds)
+        parallel = Parallel(n_jobs=self.n_jobs, verbose=self.verbose)
+
+        # Resolve each candidate's selector settings
+        settings = []
+        path_settings = {}
+        for params in candidate_params:
+            candidate = clone(selector).set_params(**{k[len('selector__'):]: v for k, v in params.items() if k.startswith('selector__')})
+            path_key = (repr(candidate.estimator), candidate.direction, repr(candidate.cv), repr(candidate.scoring))
+            path_settings.setdefault(path_key, (candidate.estimator, candidate.direction, candidate.cv, candidate.scoring))
+            settings.append((path_key, candidate.direction, candidate.n_features_to_select))
+
+        # One selection path per (selector estimator, direction, fold)
+        path_tasks = [(path_key, f) for path_key in path_settings for f in range(0, len(folds), 1)]
+        out = run_cached(parallel=parallel, cache=self.cache,
+                         tasks=[(ResultCache.key('path', digests[f], *path_settings[path_key]),
+                                 delayed(_timed_path)(*path_settings[path_key][:2], X, y, folds[f][0], *path_settings[path_key][2:]))
+                                for path_key, f in path_tasks])
+        paths = dict(zip(path_tasks, out))
+
+        # One classifier fit per (fold, selected features)
+        supports = {}
+        for c, (path_key, direction, n_features_to_select) in enumerate(settings):
+            for f in range(0, len(folds), 1):
+                support = path_support(path=paths[(path_key, f)][0], n_features=n_features,
+                                       n_features_to_select=n_features_to_select, direction=direction)
+                supports[(c, f)] = None if support is None else (f, support.tobytes())
+        fit_keys = sorted(set(s for s in supports.values() if s is not None))
+        out = run_cached(parallel=parallel, cache=self.cache,
+                         tasks=[(ResultCache.key('fit', digests[f], classifier, support, sorted(scorers)),
+                                 delayed(_fit_and_score)(classifier, X, y, np.frombuffer(support, dtype=bool), folds[f][0], folds[f][1], scorers))
+                                for f, support in fit_keys])
+        fits = dict(zip(fit_keys, out))
+
+        # Collect results
+        fit_times = np.zeros(shape=(len(candidate_params), len(folds)))
+        score_times = np.zeros(shape=(len(candidate_params), len(folds)))
+        test_scores = {name: np.full(shape=(len(candidate_params), len(folds)), fill_value=np.nan) for name in scorers}
+        for (c, f), key in supports.items():
+            fit_times[c, f] = paths[(settings[c][0], f)][1]  # path time is shared between candidates
+            if key is None:
+                continue
+            scores, fit_time, score_time = fits[key]
+            fit_times[c, f] += fit_time
+            score_times[c, f] = score_time
+            for name in scorers:
+                test_scores[name][c, f] = scores[name]
+        self.cv_results_ = format_results(candidate_params=candidate_params, n_splits=len(folds), fit_times=fit_times,
+                                          score_times=score_times, test_scores=test_scores)
+        self.n_splits_ = len(folds)
+
+        # Refit best candidate on all training data
+        self.best_index_ = self.refit(self.cv_results_)
+        self.best_params_ = candidate_params[self.best_index_]
+        start = time.perf_counter()
+        self.best_estimator_ = clone(self.estimator).set_params(**clone(self.best_params_, safe=False)).fit(X_frame, y)
+        self.refit_time_ = time.perf_counter() - start
+
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+
+# Parameters that never change the predictions of a classifier (given its other parameters)
+prediction_invariant_params = {'KNeighborsClassifier': lambda p: ['algorithm', 'leaf_size'],  # up to ties in neighbour distances
+                               'SVC': lambda p: ['decision_function_shape'] + (['gamma'] if p.get('kernel') == 'linear' else [])}
+
+
+def dedupe_candidates(param_grid, prefix: str = 'classifier__') -> tuple:
+    """
+    Expand a param_grid and keep one candidate per group of prediction-equivalent candidates
+
+    STATUS: WORKING
+
+    : param param_grid: GridSearchCV style parameter grid with the classifier given as '<prefix[:-2]>'
+    : type param_grid: dict or list of dict
+    : param prefix: classifier step prefix
+    : type prefix: string
+    : return: unique candidates, number of candidates in each group
+    : rtype: tuple(list of dict, list of int)
+    """
+
+    groups = {}
+    for params in ParameterGrid(param_grid):
+        classifier = params.get(prefix[:-2])
+        name = type(classifier).__name__
+        own = {k[len(prefix):]: v for k, v in params.items() if k.startswith(prefix)}
+        ignored = prediction_invariant_params.get(name, lambda p: [])(own)
+        key = (name,) + tuple(sorted((k, repr(v)) for k, v in own.items() if k not in ignored))
+        if key in groups:
+            groups[key][1] += 1
+        else:
+            groups[key] = [params, 1]
+
+    return [g[0] for g in groups.values()], [g[1] for g in groups.values()]
+
+
+def _fit_and_score_params(estimator, params, X, y, train, test, scorers):
+    start = time.perf_counter()
+    try:
+        estimator = clone(estimator).set_params(**clone(params, safe=False)).fit(X[train], y[train])
+    except Exception:
+        return {name: np.nan for name in scorers}, time.perf_counter() - start, 0.0
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    scores = {name: scorer(estimator, X[test], y[test]) for name, scorer in scorers.items()}
+    return scores, fit_time, time.perf_counter() - start
+
+
+tie_tolerance = 1e-7  # relative gap below which neighbour distances or vote totals are treated as tied
+
+
+class _Predictions(ClassifierMixin, BaseEstimator):
+    """
+    Scorer adapter returning precomputed predictions
+    """
+
+    def __init__(self, classes, y_pred) -> None:
+        self.classes = classes
+        self.y_pred = y_pred
+        self.classes_ = classes
+
+    def predict(self, X):
+        return self.y_pred
+
+
+def shared_classifier(estimator):
+    """
+    Classifier of an estimator that is a classifier, or a Pipeline holding only a classifier (None otherwise)
+
+    : rtype: sklearn estimator
+    """
+
+    if isinstance(estimator, Pipeline):
+        return estimator.steps[0][1] if len(estimator.steps) == 1 else None
+    return estimator if is_classifier(estimator) else None
+
+
+def shared_state_key(estimator) -> tuple:
+    """
+    Precomputed state a configured candidate can be evaluated from: the neighbour graph of a KNN metric or the
+    kernel matrix of an SVC kernel (None if the candidate is fitted on its own)
+
+    : rtype: tuple
+    """
+
+    classifier = shared_classifier(estimator=estimator)
+    if type(classifier) is KNeighborsClassifier and not callable(classifier.weights) and not callable(classifier.metric):
+        return ('knn', classifier.metric, classifier.p, repr(classifier.metric_params))
+    if type(classifier) is SVC and classifier.kernel in ('linear', 'rbf', 'poly', 'sigmoid'):
+        kernel_params = {'rbf': ('gamma',), 'poly': ('gamma', 'degree', 'coef0'), 'sigmoid': ('gamma', 'coef0')}.get(classifier.kernel, ())
+        return ('svc', classifier.kernel) + tuple(repr(getattr(classifier, name)) for name in kernel_params)
+    return None
+
+
+def _score_predictions(classes, y_pred, y_test, scorers: dict, memo: dict) -> dict:
+    """
+    Scores of precomputed predictions, candidates of a group predicting the same labels are scored once
+
+    : rtype: dict
+    """
+
+    key = y_pred.tobytes()
+    if key not in memo:
+        adapter = _Predictions(classes=classes, y_pred=y_pred)
+        memo[key] = {name: scorer(adapter, None, y_test) for name, scorer in scorers.items()}
+    return memo[key]
+
+
+def _knn_group(classifiers: list, X_train, y_train, X_test, y_test, scorers: dict) -> list:
+    """
+    Evaluate KNN candidates of one metric from a single neighbour query, k-max + 1 neighbours deep
+
+    Candidates differing in algorithm or leaf_size share predictions, except for test rows whose k-th and (k+1)-th
+    neighbour distances or two highest distance-weighted vote totals are tied: sklearn's algorithms may break such
+    ties differently, so these rows are predicted by the candidate itself.
+
+    : rtype: list
+    """
+
+    first = classifiers[0]
+    n_train = X_train.shape[0]
+    depth = min(max(c.n_neighbors for c in classifiers) + 1, n_train)
+    start = time.perf_counter()
+    graph = NearestNeighbors(n_neighbors=depth, algorithm='brute', metric=first.metric, p=first.p, metric_params=first.metric_params).fit(X_train)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    dist, index = graph.kneighbors(X=X_test, n_neighbors=depth)
+    query_time = time.perf_counter() - start
+    classes, y_encoded = np.unique(y_train, return_inverse=True)
+    labels = y_encoded[index]
+
+    votes = {}
+    memo = {}
+    out = []
+    for classifier in classifiers:
+        k, weights = classifier.n_neighbors, classifier.weights
+        if k > n_train:
+            out.append(None)  # fitted on its own to reproduce sklearn's error
+            continue
+        if (k, weights) not in votes:
+            votes[(k, weights)] = _knn_predict(k=k, weights=weights, dist=dist, labels=labels, classes=classes)
+        y_pred, tied, vote_time = votes[(k, weights)]
+        own_fit_time = own_predict_time = 0.0
+        if tied.any():
+            start = time.perf_counter()
+            model = clone(classifier).fit(X_train, y_train)
+            own_fit_time = time.perf_counter() - start
+            start = time.perf_counter()
+            y_pred = y_pred.copy()
+            y_pred[tied] = model.predict(X_test[tied])
+            own_predict_time = time.perf_counter() - start
+        start = time.perf_counter()
+        scores = _score_predictions(classes=classes, y_pred=y_pred, y_test=y_test, scorers=scorers, memo=memo)
+        out.append((scores, fit_time + own_fit_time, query_time + vote_time + own_predict_time + time.perf_counter() - start))
+
+    return out
+
+
+def _knn_predict(k: int, weights: str, dist: np.ndarray, labels: np.ndarray, classes: np.ndarray) -> tuple:
+    """
+    Predictions, tied test rows and vote time of one (k, weights) setting from the neighbour graph
+
+    : rtype: tuple
+    """
+
+    start = time.perf_counter()
+    n_test, depth = dist.shape
+    tied = np.isclose(dist[:, k], dist[:, k - 1], rtol=tie_tolerance, atol=0.0) if k < depth else np.zeros(shape=n_test, dtype=bool)
+    if weights == 'distance':
+        with np.errstate(divide='ignore'):
+            w = 1.0 / dist[:, :k]
+        exact = np.isinf(w)
+        exact_rows = exact.any(axis=1)
+        w[exact_rows] = exact[exact_rows]  # exact matches outvote everything else, as in sklearn
+    else:
+        w = np.ones(shape=(n_test, k))
+    votes = np.zeros(shape=(n_test, classes.shape[0]))
+    np.add.at(votes, (np.broadcast_to(np.arange(n_test)[:, None], (n_test, k)), labels[:, :k]), w)
+    if weights == 'distance' and classes.shape[0] > 1:  # totals of equal distances may differ in the last bits between algorithms
+        top = -np.sort(-votes, axis=1)[:, :2]
+        tied |= np.isclose(top[:, 0], top[:, 1], rtol=tie_tolerance, atol=0.0) & ~exact_rows
+
+    return classes[votes.argmax(axis=1)], tied, time.perf_counter() - start
+
+
+def _svc_group(classifiers: list, X_train, y_train, X_test, y_test, scorers: dict) -> list:
+    """
+    Evaluate SVC candidates of one kernel from a single precomputed kernel matrix
+
+    Candidates differing only in decision_function_shape (without break_ties) share predictions.
+
+    : rtype: list
+    """
+
+    first = classifiers[0]
+    X_train = np.asarray(X_train, dtype=np.float64)
+    X_test = np.asarray(X_test, dtype=np.float64)
+    kernel_params = {}
+    if first.kernel != 'linear':
+        if first.gamma == 'scale':
+            variance = X_train.var()
+            kernel_params['gamma'] = 1.0 / (X_train.shape[1] * variance) if variance != 0 else 1.0
+        elif first.gamma == 'auto':
+            kernel_params['gamma'] = 1.0 / X_train.shape[1]
+        else:
+            kernel_params['gamma'] = float(first.gamma)
+    if first.kernel in ('poly', 'sigmoid'):
+        kernel_params['coef0'] = first.coef0
+    if first.kernel == 'poly':
+        kernel_params['degree'] = first.degree
+    start = time.perf_counter()
+    K_train = pairwise_kernels(X=X_train, metric=first.kernel, **kernel_params)
+    kernel_time = time.perf_counter() - start
+    start = time.perf_counter()
+    K_test = pairwise_kernels(X=X_test, Y=X_train, metric=first.kernel, **kernel_params)
+    test_kernel_time = time.perf_counter() - start
+
+    results = {}
+    memo = {}
+    out = []
+    for classifier in classifiers:
+        params = classifier.get_params()
+        for name in ('kernel', 'gamma', 'degree', 'coef0') + (() if params['break_ties'] else ('decision_function_shape',)):
+            params.pop(name)
+        key = repr(sorted(params.items()))
+        if key not in results:
+            start = time.perf_counter()
+            try:
+                model = SVC(kernel='precomputed', **params).fit(K_train, y_train)
+            except Exception:
+                results[key] = ({name: np.nan for name in scorers}, kernel_time + time.perf_counter() - start, 0.0)
+            else:
+                fit_time = kernel_time + time.perf_counter() - start
+                start = time.perf_counter()
+                scores = _score_predictions(classes=model.classes_, y_pred=model.predict(K_test), y_test=y_test, scorers=scorers, memo=memo)
+                results[key] = (scores, fit_time, test_kernel_time + time.perf_counter() - start)
+        out.append(results[key])
+
+    return out
+
+
+def _fit_and_score_shared(estimator, candidates: list, X, y, train, test, scorers, shared: bool = True):
+    """
+    Evaluate candidates sharing one precomputed state on one fold, candidates the shared state cannot answer exactly
+    are fitted on their own
+
+    : rtype: list
+    """
+
+    configured = [clone(estimator).set_params(**clone(params, safe=False)) for params in candidates]
+    classifiers = [shared_classifier(estimator=c) for c in configured]
+    key = shared_state_key(estimator=configured[0]) if shared else None
+    if key is None:
+        out = [None] * len(candidates)
+    elif key[0] == 'knn':
+        out = _knn_group(classifiers=classifiers, X_train=X[train], y_train=y[train], X_test=X[test], y_test=y[test], scorers=scorers)
+    else:
+        out = _svc_group(classifiers=classifiers, X_train=X[train], y_train=y[train], X_test=X[test], y_test=y[test], scorers=scorers)
+
+    return [result if result is not None else _fit_and_score_params(estimator, params, X, y, train, test, scorers)
+            for params, result in zip(candidates, out)]
+
+
+def evaluate_candidates(parallel, estimator, candidates: list, X, y, folds: list, scorers: dict, cache: ResultCache = None, shared: bool = True) -> list:
+    """
+    Fold results of every candidate, computing only those missing from the result cache
+
+    STATUS: WORKING
+
+    - With shared, the missing (candidate, fold) pairs are grouped by fold and shared_state_key, one task per group
+    - Otherwise each pair is fitted on its own, as in GridSearchCV
+
+    : param parallel: joblib Parallel instance
+    : type parallel: joblib.Parallel
+    : param estimator: base estimator
+    : type estimator: sklearn estimator
+    : param candidates: candidate parameters
+    : type candidates: list of dict
+    : param X: features
+    : type X: np.ndarray
+    : param y: labels
+    : type y: np.ndarray
+    : param folds: (train, test) index pairs
+    : type folds: list
+    : param scorers: scorer of each score name
+    : type scorers: dict
+    : param cache: result cache (default: evaluate every pair)
+    : type cache: ResultCache
+    : param shared: evaluate dependent candidates from shared precomputed state
+    : type shared: boolean
+    : return: (scores, fit_time, score_time) of each candidate and fold, candidate major
+    : rtype: list
+    """
+
+    if cache is not None:
+        digests = [fold_digest(X=X, y=y, train=train, test=test) for train, test in folds]
+        keys = [[ResultCache.key('fit_params', digest, token, sorted(scorers)) for digest in digests]
+                for token in candidate_tokens(estimator, candidates, cache)]
+        results = cache.get(keys=[key for candidate_keys in keys for key in candidate_keys])
+    else:
+        keys = [[(c, f) for f in range(0, len(folds), 1)] for c in range(0, len(candidates), 1)]
+        results = {}
+
+    # Group the missing pairs by fold and shared state
+    groups = {}
+    for c, params in enumerate(candidates):
+        state = shared_state_key(estimator=clone(estimator).set_params(**clone(params, safe=False))) if shared else None
+        for f in range(0, len(folds), 1):
+            if keys[c][f] not in results:
+                groups.setdefault((f, state) if state is not None else (f, 'own', c), {})[keys[c][f]] = params
+    out = parallel(delayed(_fit_and_score_shared)(estimator, list(members.values()), X, y, folds[group[0]][0], folds[group[0]][1], scorers, shared)
+                   for group, members in groups.items())
+    new = {key: result for members, group_out in zip(groups.values(), out) for key, result in zip(members, group_out)}
+    if cache is not None:
+        cache.put(items=new)
+    results.update(new)
+
+    return [results[key] for candidate_keys in keys for key in candidate_keys]
+
+
+class HalvingSearchCV:
+    """
+    Successive halving replacement for GridSearchCV
+
+    - Prediction-equivalent candidates are evaluated once
+    - Each round evaluates the surviving candidates on a larger share of the folds and training samples, then keeps
+      the best 1/factor by rank_score
+    - The last round uses every fold and all training samples, its cv_results are passed to refit
+    - Fold results found in the result cache are not recomputed
+    - KNN and SVC candidates are evaluated from shared neighbour graphs and kernel matrices (see evaluate_candidates)
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, estimator, param_grid, scoring: list, refit, cv: int = 5, factor: int = 3, min_resources: int = None,
+                 rank_score: str = 'recall_micro', n_jobs: int = -1, verbose: int = 0, random_state: int = 0, cache: ResultCache = None,
+                 shared: bool = True) -> None:
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.scoring = scoring
+        self.refit = refit
+        self.cv = cv
+        self.factor = factor
+        self.min_resources = min_resources
+        self.rank_score = rank_score
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+        self.random_state = random_state
+        self.cache = cache
+        self.shared = shared
+
+    def fit(self, X, y):
+        X_frame = X
+        X = np.asarray(X)
+        y = np.asarray(y)
+        scorers = {name: get_scorer(name) for name in self.scoring}
+        candidates, group_sizes = dedupe_candidates(param_grid=self.param_grid)
+        self.n_candidates_ = sum(group_sizes)
+        self.n_unique_candidates_ = len(candidates)
+        folds = list(check_cv(self.cv, y, classifier=True).split(X, y))
+        n_classes = np.unique(y).shape[0]
+        n_train = min(len(train) for train, _ in folds)
+        min_resources = self.min_resources if self.min_resources is not None else 10 * n_classes
+        parallel = Parallel(n_jobs=self.n_jobs, verbose=self.verbose)
+
+        # Number of rounds: halve until <= factor candidates remain, or the smallest sample budget is reached
+        n_rounds = 1
+        while self.factor**n_rounds < len(candidates) and n_train / self.factor**n_rounds >= min_resources:
+            n_rounds += 1
+
+        self.history_ = []
+        rng = np.random.default_rng(seed=self.random_state)
+        for r in range(0, n_rounds, 1):
+            start = time.perf_counter()
+            fraction = float(self.factor)**(r - n_rounds + 1)
+            last = r == n_rounds - 1
+            n_folds = len(folds) if last else max(2, int(np.ceil(len(folds) * fraction)))
+            round_folds = []
+            for train, test in folds[:n_folds]:
+                if not last:  # stratified subsample of the training fold
+                    n_samples = max(min_resources, int(len(train) * fraction))
+                    train = np.concatenate([rng.permutation(train[y[train] == c])[:max(1, int(np.ceil(n_samples * np.mean(y[train] == c))))]
+                                            for c in np.unique(y[train])])
+                round_folds.append((train, test))
+            out = evaluate_candidates(parallel=parallel, estimator=self.estimator, candidates=candidates, X=X, y=y, folds=round_folds,
+                                      scorers=scorers, cache=self.cache, shared=self.shared)
+            test_scores = {name: np.array([o[0][name] for o in out]).reshape(len(candidates), n_folds) for name in scorers}
+            fit_times = np.array([o[1] for o in out]).reshape(len(candidates), n_folds)
+            score_times = np.array([o[2] for o in out]).reshape(len(candidates), n_folds)
+            self.history_.append({'round': r, 'n_candidates': len(candidates), 'n_folds': n_folds,
+                                  'n_samples': int(np.mean([len(train) for train, _ in round_folds])), 'time': time.perf_counter() - start})
+            if last:
+                break
+            mean_scores = np.nan_to_num(np.mean(a=test_scores[self.rank_score], axis=1), nan=-np.inf)
+            keep = max(1, int(np.ceil(len(candidates) / self.factor)))
+            survivors = np.sort(np.argsort(-mean_scores, kind='stable')[:keep])
+            candidates = [candidates[i] for i in survivors]
+
+        self.cv_results_ = format_results(candidate_params=candidates, n_splits=len(folds), fit_times=fit_times,
+                                          score_times=score_times, test_scores=test_scores)
+        self.n_splits_ = len(folds)
+
+        # Refit best candidate on all training data
+        self.best_index_ = self.refit(self.cv_results_)
+        self.best_params_ = candidates[self.best_index_]
+        start = time.perf_counter()
+        self.best_estimator_ = clone(self.estimator).set_params(**clone(self.best_params_, safe=False)).fit(X_frame, y)
+        self.refit_time_ = time.perf_counter() - start
+
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+
+class CachedGridSearchCV:
+    """
+    Exhaustive replacement for GridSearchCV whose fold results are stored in and reused from a result cache
+
+    KNN and SVC candidates are evaluated from shared neighbour graphs and kernel matrices (see evaluate_candidates),
+    with the same test scores as GridSearchCV, also on tied data (tests/test_model_search.py).
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, estimator, param_grid, scoring: list, refit, cv: int = 5, n_jobs: int = -1, verbose: int = 0, cache: ResultCache = None,
+                 shared: bool = True) -> None:
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.scoring = scoring
+        self.refit = refit
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+        self.cache = cache
+        self.shared = shared
+
+    def fit(self, X, y):
+        X_frame = X
+        X = np.asarray(X)
+        y = np.asarray(y)
+        scorers = {name: get_scorer(name) for name in self.scoring}
+        candidate_params = list(ParameterGrid(self.param_grid))
+        folds = list(check_cv(self.cv, y, classifier=True).split(X, y))
+        out = evaluate_candidates(parallel=Parallel(n_jobs=self.n_jobs, verbose=self.verbose), estimator=self.estimator, candidates=candidate_params,
+                                  X=X, y=y, folds=folds, scorers=scorers, cache=self.cache, shared=self.shared)
+        test_scores = {name: np.array([o[0][name] for o in out]).reshape(len(candidate_params), len(folds)) for name in scorers}
+        self.cv_results_ = format_results(candidate_params=candidate_params, n_splits=len(folds),
+                                          fit_times=np.array([o[1] for o in out]), score_times=np.array([o[2] for o in out]), test_scores=test_scores)
+        self.n_splits_ = len(folds)
+
+        # Refit best candidate on all training data
+        self.best_index_ = self.refit(self.cv_results_)
+        self.best_params_ = candidate_params[self.best_index_]
+        start = time.perf_counter()
+        self.best_estimator_ = clone(self.estimator).set_params(**clone(self.best_params_, safe=False)).fit(X_frame, y)
+        self.refit_time_ = time.perf_counter() - start
+
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
@@ -0,0 +1,151 @@
+# INCREMENTAL MODEL UPDATE FUNCTIONS
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Folds the rows of newly recorded sessions into an exported model instead of running the full classification search
+# NOTE: The scaler keeps a running min/max, the model's stored state is mapped onto the new scaling (z' = a z + b per feature) before the new rows are added
+# NOTE: ComplementNB is updated exactly (as if refitted on all rows), KNN appends to its index, SVC is refitted on its support vectors and the new rows (approximate, the error grows with every update)
+
+
+import time as tm
+import numpy as np
+import tables as tb
+from sklearn.base import clone
+from sklearn.preprocessing import MinMaxScaler
+from Dataset import readFeatures, list_table_nums
+from ModelExport import exportModel, loadModel
+from Instrumentation import span
+
+
+def running_scaler(model, X_new: np.ndarray) -> MinMaxScaler:
+    """
+    MinMaxScaler over the model's training range extended by the new rows, in the training precision
+
+    : rtype: MinMaxScaler
+    """
+
+    data_min = np.minimum(np.asarray(model.data_min, dtype=np.float64), X_new.min(axis=0))
+    data_max = np.maximum(np.asarray(model.data_max, dtype=np.float64), X_new.max(axis=0))
+
+    return MinMaxScaler(feature_range=model.feature_range).fit(X=np.vstack([data_min, data_max]).astype(model.dtype))
+
+
+def rescale_map(model, scaler: MinMaxScaler) -> tuple:
+    """
+    Per selected feature (a, b) such that the new scaling of a row is a * old scaling + b
+
+    : rtype: tuple
+    """
+
+    old_scale = np.asarray(model.scaler_scale, dtype=np.float64)[model.feature_indexes]
+    old_min = np.asarray(model.scaler_min, dtype=np.float64)[model.feature_indexes]
+    new_scale = np.asarray(scaler.scale_, dtype=np.float64)[model.feature_indexes]
+    new_min = np.asarray(scaler.min_, dtype=np.float64)[model.feature_indexes]
+    a = np.divide(new_scale, old_scale, out=np.ones_like(new_scale), where=old_scale != 0)
+
+    return a, new_min - a * old_min
+
+
+def update_cnb(estimator, a: np.ndarray, b: np.ndarray, Z: np.ndarray, y: np.ndarray):
+    """
+    Rescale the per-class feature sums (sum(a z + b) = a sum(z) + b n) and partial_fit the new rows
+
+    : rtype: sklearn estimator
+    """
+
+    estimator.feature_count_ = a * estimator.feature_count_ + b * estimator.class_count_[:, None]
+
+    return estimator.partial_fit(X=Z, y=y)
+
+
+def update_knn(estimator, a: np.ndarray, b: np.ndarray, Z: np.ndarray, y: np.ndarray):
+    """
+    Rescale the indexed rows and rebuild the index with the new rows appended
+
+    : rtype: sklearn estimator
+    """
+
+    X = np.vstack([(a * estimator._fit_X + b).astype(Z.dtype), Z])
+    labels = np.concatenate([estimator.classes_[estimator._y], y])
+
+    return clone(estimator=estimator).fit(X=X, y=labels)
+
+
+def update_svc(estimator, a: np.ndarray, b: np.ndarray, Z: np.ndarray, y: np.ndarray):
+    """
+    Refit on the rescaled support vectors and the new rows, with the fitted kernel width kept
+
+    Approximate: the old rows that were not support vectors are dropped, and those that would become support vectors
+    with the new rows are lost, so the model drifts further from a full refit with every update (run C to retrain).
+
+    : rtype: sklearn estimator
+    """
+
+    X = np.vstack([(a * estimator.support_vectors_ + b).astype(Z.dtype), Z])
+    labels = np.concatenate([np.repeat(estimator.classes_, estimator.n_support_), y])
+
+    return clone(estimator=estimator).set_params(gamma=float(estimator._gamma)).fit(X=X, y=labels)
+
+
+update_methods = {'ComplementNB': update_cnb, 'MultinomialNB': update_cnb, 'KNeighborsClassifier': update_knn, 'SVC': update_svc}
+
+
+def updateModel(hdfFile: str, modelFile: str, sessions: list = None, outFile: str = None):
+    """
+    Fold the rows of new sessions into an exported model and write the updated model
+
+    STATUS: WORKING
+
+    : param hdfFile: feature .h5 filename
+    : type hdfFile: string
+    : param modelFile: model filename written by exportModel
+    : type modelFile: string
+    : param sessions: table numbers to fold in (default: tables the model was not trained on, the latest table if the
+                      model does not record its sessions)
+    : type sessions: list
+    : param outFile: updated model filename (default: modelFile)
+    : type outFile: string
+    : return: updated model
+    : rtype: GestureModel
+    """
+
+    model = loadModel(modelFile=modelFile)
+    name = type(model.model).__name__
+    if name not in update_methods:
+        raise ValueError(f"{name} cannot be updated incrementally, expected one of {list(update_methods)} (run C to retrain)")
+
+    with tb.open_file(filename=hdfFile, mode='r') as h5file:
+        available = list_table_nums(h5file=h5file)
+        if sessions is None:
+            sessions = available[-1:] if model.sessions is None else [n for n in available if n not in model.sessions]
+        if not sessions:
+            print("No new sessions to fold in")
+            return model
+        with span(name='read_features'):
+            rows = readFeatures(h5file=h5file, fields=['label'] + list(model.feature_names), labels=sorted(model.gesture_map), table_nums=sessions)
+    if rows.shape[0] == 0:
+        print(f"Sessions {sessions} have no rows of the model's gestures")
+        return model
+    X_new = np.column_stack([rows[f].astype(np.float64) for f in model.feature_names])
+    y_new = rows['label']
+
+    if name == 'SVC':
+        print("SVC update is approximate (refit on the support vectors and the new rows), repeated updates drift from a full refit, run C to retrain")
+    accuracy = (model.predict(X=X_new) == y_new).mean()
+    start = tm.perf_counter()
+    with span(name='model_update', rows_folded=y_new.shape[0]):
+        scaler = running_scaler(model=model, X_new=X_new)
+        a, b = rescale_map(model=model, scaler=scaler)
+        Z_new = np.asarray((X_new.astype(model.dtype) * scaler.scale_ + scaler.min_)[:, model.feature_indexes])
+        estimator = update_methods[name](model.model, a=a, b=b, Z=Z_new, y=y_new)
+    update_time = tm.perf_counter() - start
+
+    trained_sessions = sorted(set(model.sessions or []) | set(int(n) for n in sessions))
+    outFile = modelFile if outFile is None else outFile
+    exportModel(modelFile=outFile, scaler=scaler, feature_names=model.feature_names, selected_features=model.selected_features,
+                model=estimator, gesture_map=model.gesture_map, sessions=trained_sessions)
+    updated = loadModel(modelFile=outFile)
+    print(f"Folded {y_new.shape[0]} rows of sessions {sessions} into {name} in {update_time:.3f} s")
+    print(f"Accuracy on the new rows: {accuracy:.4f} before, {(updated.predict(X=X_new) == y_new).mean():.4f} after the update")
+    print(f"Updated model written to {outFile}")
+
+    return updated
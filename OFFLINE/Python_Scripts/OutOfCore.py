@@ -0,0 +1,194 @@
+# OUT-OF-CORE TRAINING FUNCTIONS
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Tables are streamed in blocks (Dataset.iterFeatures) and the scaler and incremental estimators are fitted block by block, memory use depends on block_rows and not on the file size
+# NOTE: The holdout is drawn per session and label from the label columns only, so it is stratified and the same in every pass
+# NOTE: Naive Bayes models get one pass (partial_fit sums counts), SGD models one pass per epoch over reshuffled blocks
+
+
+import time as tm
+import numpy as np
+import tables as tb
+from itertools import groupby
+from sklearn.base import clone
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import ComplementNB, GaussianNB
+from config import feature_names, gesture_names
+from Dataset import iterFeatures, list_table_nums
+from ModelExport import exportModel
+from Instrumentation import span, peak_rss
+
+
+random_state = 0
+stream_estimators = {'SGD (hinge)': SGDClassifier(loss='hinge', random_state=random_state),
+                     'SGD (log loss)': SGDClassifier(loss='log_loss', random_state=random_state),
+                     'ComplementNB': ComplementNB(),
+                     'GaussianNB': GaussianNB()}
+single_pass = ('ComplementNB', 'MultinomialNB', 'GaussianNB')  # a second partial_fit pass would count every row twice
+
+
+def holdout_split(h5file: tb.File, table_nums: list, test_split: float, labels: list = None) -> tuple:
+    """
+    Stratified holdout from the label columns: each label's held out rows so far are kept at round(test_split * rows so
+    far) as the sessions are read, so the holdout is stratified over labels and spread over sessions
+
+    : rtype: tuple
+    """
+
+    rng = np.random.default_rng(seed=random_state)
+    seen, taken, splits = {}, {}, {}
+    for num, blocks in groupby(iterFeatures(h5file=h5file, fields=['label'], table_nums=table_nums), key=lambda block: block[0]):
+        label = np.concatenate([rows['label'] for _, _, rows in blocks])
+        train = np.zeros(shape=label.shape[0], dtype=bool)
+        holdout = np.zeros(shape=label.shape[0], dtype=bool)
+        for l in np.unique(label).tolist():
+            if labels is not None and l not in labels:
+                continue
+            rows = np.flatnonzero(label == l)
+            seen[l] = seen.get(l, 0) + rows.shape[0]
+            n = min(rows.shape[0], max(0, int(round(test_split * seen[l])) - taken.get(l, 0)))
+            holdout[rng.choice(rows, size=n, replace=False)] = True
+            train[rows] = True
+            taken[l] = taken.get(l, 0) + n
+        train &= ~holdout
+        splits[num] = (np.packbits(train), np.packbits(holdout))  # one bit per row
+    counts = {l: (seen[l] - taken[l], taken[l]) for l in sorted(seen)}
+
+    return splits, np.array(sorted(seen)), counts
+
+
+def stream_blocks(h5file: tb.File, splits: dict, which: int, block_rows: int, rng: np.random.Generator = None):
+    """
+    (X, y) blocks of about block_rows training (which=0) or holdout (which=1) rows; with rng the sessions are read in
+    random order and the rows of each block are shuffled
+
+    : rtype: generator
+    """
+
+    table_nums = list(splits) if rng is None else rng.permutation(list(splits)).tolist()
+    buffer, buffered = [], 0
+    for num, start, rows in iterFeatures(h5file=h5file, fields=['label'] + feature_names, table_nums=table_nums, block_rows=block_rows):
+        keep = np.unpackbits(splits[num][which])[start:start + rows.shape[0]].astype(bool)
+        if keep.any():
+            buffer.append(rows[keep])
+            buffered += buffer[-1].shape[0]
+        if buffered >= block_rows:
+            yield block_arrays(rows=np.concatenate(buffer), rng=rng)
+            buffer, buffered = [], 0
+    if buffered:
+        yield block_arrays(rows=np.concatenate(buffer), rng=rng)
+
+
+def block_arrays(rows: np.ndarray, rng: np.random.Generator = None) -> tuple:
+    """
+    Feature matrix (stored precision, as importData) and labels of a block, optionally shuffled
+
+    : rtype: tuple
+    """
+
+    if rng is not None:
+        rows = rows[rng.permutation(rows.shape[0])]
+
+    return np.column_stack([rows[f] for f in feature_names]), rows['label']
+
+
+def holdout_metrics(confusion: np.ndarray) -> dict:
+    """
+    Accuracy and macro precision/recall of a confusion matrix (rows: true label, columns: predicted label), both averaged
+    over every class with 0 for classes never predicted or not in the holdout (sklearn labels=classes, zero_division=0)
+
+    : rtype: dict
+    """
+
+    diagonal = np.diag(confusion)
+    predicted = confusion.sum(axis=0)
+    actual = confusion.sum(axis=1)
+    precision = np.divide(diagonal, predicted, out=np.zeros_like(diagonal), where=predicted > 0)
+    recall = np.divide(diagonal, actual, out=np.zeros_like(diagonal), where=actual > 0)
+
+    return {'accuracy': diagonal.sum() / max(1.0, confusion.sum()), 'precision': precision.mean(), 'recall': recall.mean()}
+
+
+def trainOutOfCore(hdfFile: str, test_split: float = 0.2, block_rows: int = 16384, epochs: int = 5, labels: list = None,
+                   modelFile: str = None) -> list:
+    """
+    Fit the MinMax scaler and incremental estimators (stream_estimators) block by block over the feature tables,
+    evaluate them on a stratified holdout and report the peak RSS
+
+    STATUS: WORKING
+
+    : param hdfFile: feature .h5 filename
+    : type hdfFile: string
+    : param test_split: fraction of each label's rows held out
+    : type test_split: float
+    : param block_rows: rows per training block
+    : type block_rows: integer
+    : param epochs: passes over the training rows for SGD models
+    : type epochs: integer
+    : param labels: gesture labels to train on (default: all labels)
+    : type labels: list
+    : param modelFile: export the estimator with the best holdout recall to this model file (default: not exported)
+    : type modelFile: string
+    : return: one dict per estimator (estimator, accuracy, precision, recall, fit_time [s])
+    : rtype: list
+    """
+
+    estimators = {name: clone(estimator=estimator) for name, estimator in stream_estimators.items()}
+    start_rss = peak_rss()
+    with tb.open_file(filename=hdfFile, mode='r') as h5file:
+        table_nums = list_table_nums(h5file=h5file)
+        with span(name='holdout_split'):
+            splits, classes, counts = holdout_split(h5file=h5file, table_nums=table_nums, test_split=test_split, labels=labels)
+        n_train = sum(train for train, _ in counts.values())
+        n_holdout = sum(holdout for _, holdout in counts.values())
+        print(f"Streaming {n_train} training and {n_holdout} holdout rows of {len(table_nums)} sessions in blocks of {block_rows} rows")
+
+        # Scaler: running min/max over the training rows
+        scaler = MinMaxScaler()
+        with span(name='fit_scaler'):
+            for X, _ in stream_blocks(h5file=h5file, splits=splits, which=0, block_rows=block_rows):
+                scaler.partial_fit(X=X)
+
+        # Estimators: one partial_fit per block, SGD models for every epoch
+        rng = np.random.default_rng(seed=random_state)
+        fit_time = {name: 0.0 for name in estimators}
+        for epoch in range(0, epochs, 1):
+            active = {name: estimator for name, estimator in estimators.items() if epoch == 0 or type(estimator).__name__ not in single_pass}
+            if not active:
+                break
+            with span(name='train_epoch') as s:
+                for X, y in stream_blocks(h5file=h5file, splits=splits, which=0, block_rows=block_rows, rng=rng):
+                    Z = scaler.transform(X=X)
+                    s.add(counter='rows_trained', n=y.shape[0])
+                    for name, estimator in active.items():
+                        start = tm.perf_counter()
+                        estimator.partial_fit(Z, y, classes=classes)
+                        fit_time[name] += tm.perf_counter() - start
+
+        # Holdout evaluation, accumulated in confusion matrices
+        confusion = {name: np.zeros(shape=(classes.shape[0], classes.shape[0])) for name in estimators}
+        with span(name='evaluate_holdout'):
+            for X, y in stream_blocks(h5file=h5file, splits=splits, which=1, block_rows=block_rows):
+                Z = scaler.transform(X=X)
+                true = np.searchsorted(classes, y)
+                for name, estimator in estimators.items():
+                    np.add.at(confusion[name], (true, np.searchsorted(classes, estimator.predict(Z))), 1)
+
+    results = [{'estimator': name, **holdout_metrics(confusion=confusion[name]), 'fit_time': fit_time[name]} for name in estimators]
+    print(f"{'ESTIMATOR':>16} {'ACCURACY':>9} {'PRECISION':>10} {'RECALL':>8} {'FIT [s]':>8}")
+    for r in results:
+        print(f"{r['estimator']:>16} {r['accuracy']:>9.4f} {r['precision']:>10.4f} {r['recall']:>8.4f} {r['fit_time']:>8.3f}")
+    end_rss = peak_rss()
+    if end_rss is None:
+        print("Peak RSS: unavailable (no resource module and psutil is not installed)")
+    else:
+        print(f"Peak RSS: {end_rss / 2**20:.1f} MB ({start_rss / 2**20:.1f} MB before training)")
+
+    if modelFile is not None:
+        best = max(results, key=lambda r: r['recall'])
+        exportModel(modelFile=modelFile, scaler=scaler, feature_names=feature_names, selected_features=feature_names,
+                    model=estimators[best['estimator']], gesture_map={int(g): gesture_names[g] for g in classes}, sessions=table_nums)
+        print(f"Exported {best['estimator']} to {modelFile}")
+
+    return results
@@ -0,0 +1,224 @@
+# EXHAUSTIVE FEATURE SUBSET SEARCH FUNCTIONS USED BY CLASSIFICATION.PY
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Every subset of the features is scored on every fold from per-fold sufficient statistics, in vectorised batches
+# NOTE: Closed-form models: LDA (lsqr solver), Gaussian NB and ComplementNB, matching sklearn's predictions with default parameters
+# NOTE: Cost grows with 2^features x test rows, intended for the 16 columns of feature_names
+
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator
+from sklearn.feature_selection import SelectorMixin
+from sklearn.model_selection import check_cv
+from sklearn.utils.validation import validate_data
+
+
+BLOCK_ELEMENTS = 2 ** 24  # most elements (128 MB of float64) of a batch of joint log-likelihoods
+lda_ridge = 1e-10  # ridge added to the pooled covariance (relative to each feature's variance) so every subset can be solved
+var_smoothing = 1e-9  # GaussianNB default
+cnb_alpha = 1.0  # ComplementNB default
+
+
+def subset_masks(n_features: int, max_features: int = None) -> np.ndarray:
+    """
+    Boolean masks of all non-empty feature subsets (up to max_features features), in binary counting order
+
+    : rtype: np.ndarray
+    """
+
+    codes = np.arange(start=1, stop=2 ** n_features, step=1)
+    masks = ((codes[:, None] >> np.arange(start=0, stop=n_features, step=1)) & 1).astype(bool)
+    if max_features is not None:
+        masks = masks[masks.sum(axis=1) <= max_features]
+
+    return masks
+
+
+def batches(n_subsets: int, row_elements: int):
+    """
+    Subset index ranges whose batch of row_elements values per subset fits in BLOCK_ELEMENTS
+
+    : rtype: generator
+    """
+
+    size = max(1, BLOCK_ELEMENTS // max(1, row_elements))
+    for start in range(0, n_subsets, size):
+        yield slice(start, min(start + size, n_subsets))
+
+
+class FoldStatistics:
+    """
+    Sufficient statistics of a training fold: class priors, means and variances, pooled covariance and feature sums
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, X_train: np.ndarray, y_train: np.ndarray) -> None:
+        self.classes, y_encoded = np.unique(y_train, return_inverse=True)
+        one_hot = np.eye(self.classes.shape[0])[y_encoded]
+        counts = one_hot.sum(axis=0)
+        self.log_prior = np.log(counts / counts.sum())
+        self.feature_count = one_hot.T @ X_train  # per-class feature sums (ComplementNB)
+        self.means = self.feature_count / counts[:, None]
+        centred = X_train - self.means[y_encoded]
+        self.variances = (one_hot.T @ centred ** 2) / counts[:, None]
+        self.covariance = np.einsum('c,cij->ij', counts / counts.sum(),
+                                    np.stack([np.cov(centred[y_encoded == c], rowvar=False, bias=True).reshape(X_train.shape[1], X_train.shape[1])
+                                              for c in range(0, self.classes.shape[0], 1)]))  # class covariances weighted by priors, as LDA
+        self.feature_variance = X_train.var(axis=0)
+
+
+def lda_predictions(stats: FoldStatistics, X_test: np.ndarray, masks: np.ndarray) -> np.ndarray:
+    """
+    LDA (lsqr solver) predictions of every subset: each subset's covariance is padded with the identity so the batch
+    is solved as (subsets, features, features) systems
+
+    : rtype: np.ndarray
+    """
+
+    n_features = masks.shape[1]
+    m = masks.astype(np.float64)
+    variance = np.diag(stats.covariance)
+    ridge = lda_ridge * np.where(variance > 0, variance, np.trace(stats.covariance) / n_features)  # constant features: mean variance
+    out = np.empty(shape=(masks.shape[0], X_test.shape[0]), dtype=np.intp)
+    for batch in batches(n_subsets=masks.shape[0], row_elements=X_test.shape[0] * stats.classes.shape[0] + n_features * n_features):
+        mb = m[batch]
+        covariance = stats.covariance * mb[:, :, None] * mb[:, None, :] + np.eye(n_features) * (1.0 - mb[:, None, :] + ridge * mb[:, None, :])
+        means = stats.means[None, :, :] * mb[:, None, :]
+        coef = np.linalg.solve(covariance, means.transpose(0, 2, 1))  # zero on unselected features
+        intercept = -0.5 * np.einsum('bcj,bjc->bc', means, coef) + stats.log_prior
+        out[batch] = (X_test @ coef + intercept[:, None, :]).argmax(axis=2)
+
+    return out
+
+
+def gnb_predictions(stats: FoldStatistics, X_test: np.ndarray, masks: np.ndarray) -> np.ndarray:
+    """
+    Gaussian NB predictions of every subset from per-feature log-likelihoods
+
+    GaussianNB adds var_smoothing times the largest feature variance of the subset to all variances, so subsets are
+    grouped by their highest variance feature and each group uses its own per-feature log-likelihoods.
+
+    : rtype: np.ndarray
+    """
+
+    n_classes = stats.classes.shape[0]
+    n_test, n_features = X_test.shape
+    out = np.empty(shape=(masks.shape[0], n_test), dtype=np.intp)
+    largest = np.where(masks, stats.feature_variance, -np.inf).argmax(axis=1)
+    for g in np.unique(largest):
+        variances = stats.variances + var_smoothing * stats.feature_variance[g]
+        log_likelihood = (-0.5 * np.log(2.0 * np.pi * variances)[:, None, :]
+                          - 0.5 * (X_test[None, :, :] - stats.means[:, None, :]) ** 2 / variances[:, None, :]).reshape(n_classes * n_test, n_features)
+        group = np.flatnonzero(largest == g)
+        for batch in batches(n_subsets=group.shape[0], row_elements=n_classes * n_test):
+            jll = (log_likelihood @ masks[group[batch]].T.astype(np.float64)).reshape(n_classes, n_test, -1) + stats.log_prior[:, None, None]
+            out[group[batch]] = jll.argmax(axis=0).T
+
+    return out
+
+
+def cnb_predictions(stats: FoldStatistics, X_test: np.ndarray, masks: np.ndarray) -> np.ndarray:
+    """
+    ComplementNB predictions of every subset: the complement counts are normalised over the subset's features, so
+    jll = -sum(x log(comp)) + sum(x) log(sum(comp))
+
+    : rtype: np.ndarray
+    """
+
+    n_classes = stats.classes.shape[0]
+    complement = stats.feature_count.sum(axis=0) + cnb_alpha - stats.feature_count
+    log_complement = np.log(complement)
+    out = np.empty(shape=(masks.shape[0], X_test.shape[0]), dtype=np.intp)
+    for batch in batches(n_subsets=masks.shape[0], row_elements=X_test.shape[0] * (n_classes + masks.shape[1])):
+        mb = masks[batch].astype(np.float64)
+        jll = -((X_test[None, :, :] * mb[:, None, :]) @ log_complement.T)
+        jll += (X_test @ mb.T).T[:, :, None] * np.log(mb @ complement.T)[:, None, :]
+        out[batch] = jll.argmax(axis=2)
+
+    return out
+
+
+subset_models = {'lda': lda_predictions, 'gnb': gnb_predictions, 'cnb': cnb_predictions}
+
+
+def rankSubsets(X, y, cv: int = 10, models: tuple = ('lda', 'gnb', 'cnb'), max_features: int = None, feature_names: list = None) -> pd.DataFrame:
+    """
+    Cross-validated accuracy of every feature subset for closed-form models, ranked
+
+    STATUS: WORKING
+
+    : param X: scaled (non-negative for ComplementNB) training features
+    : type X: array-like
+    : param y: training labels
+    : type y: array-like
+    : param cv: number of stratified folds (or a CV splitter)
+    : type cv: integer
+    : param models: closed-form models to score, from 'lda', 'gnb' and 'cnb'
+    : type models: tuple
+    : param max_features: largest subset size (default: all features)
+    : type max_features: integer
+    : param feature_names: column names (default: column indexes)
+    : type feature_names: list
+    : return: one row per subset and model (features, indexes, n_features, model, mean_test_score, std_test_score, rank),
+              best first, smaller subsets first on equal scores
+    : rtype: pd.DataFrame
+    """
+
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    feature_names = list(feature_names) if feature_names is not None else [str(object=j) for j in range(0, X.shape[1], 1)]
+    masks = subset_masks(n_features=X.shape[1], max_features=max_features)
+    folds = list(check_cv(cv, y, classifier=True).split(X, y))
+    scores = {model: np.empty(shape=(masks.shape[0], len(folds))) for model in models}
+    for f, (train, test) in enumerate(folds):
+        stats = FoldStatistics(X_train=X[train], y_train=y[train])
+        for model in models:
+            predictions = subset_models[model](stats=stats, X_test=X[test], masks=masks)
+            scores[model][:, f] = (stats.classes[predictions] == y[test]).mean(axis=1)
+
+    indexes = [tuple(np.flatnonzero(mask).tolist()) for mask in masks]
+    table = pd.concat([pd.DataFrame(data={'features': [tuple(feature_names[j] for j in index) for index in indexes], 'indexes': indexes,
+                                          'n_features': masks.sum(axis=1), 'model': model,
+                                          'mean_test_score': scores[model].mean(axis=1), 'std_test_score': scores[model].std(axis=1)})
+                       for model in models], ignore_index=True)
+    table = table.sort_values(by=['mean_test_score', 'n_features', 'std_test_score'], ascending=[False, True, True], kind='stable', ignore_index=True)
+    table['rank'] = table['mean_test_score'].rank(method='min', ascending=False).astype(int)
+
+    return table
+
+
+def top_subsets(table: pd.DataFrame, n: int) -> list:
+    """
+    Column indexes of the n best distinct subsets of a rankSubsets table
+
+    : rtype: list
+    """
+
+    return list(dict.fromkeys(table['indexes']))[:n]
+
+
+class SubsetSelector(SelectorMixin, BaseEstimator):
+    """
+    Feature selector keeping a fixed subset of columns, so ranked subsets can be searched as pipeline parameters
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, features: tuple = (0,)) -> None:
+        """
+        : param features: column indexes to keep
+        : type features: tuple
+        """
+
+        self.features = features
+
+    def fit(self, X, y=None):
+        validate_data(self, X=X, dtype=None, ensure_all_finite=False)
+        return self
+
+    def _get_support_mask(self) -> np.ndarray:
+        mask = np.zeros(shape=self.n_features_in_, dtype=bool)
+        mask[list(self.features)] = True
+        return mask
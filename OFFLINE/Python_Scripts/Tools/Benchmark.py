@@ -0,0 +1,253 @@
+# BENCHMARK FUNCTIONS
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+
+
+import os
+import sys
+import json
+import platform
+import tempfile
+import numpy as np
+import tables as tb
+import time as tm
+import datetime as dt
+from sklearn.pipeline import Pipeline
+from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.svm import SVC
+from sklearn.neighbors import KNeighborsClassifier
+from config import NUM_GESTURES, feature_names, gesture_names
+from Dataset import readFeatures, createFeatureTable
+from FeatureCollection import featureData, feature_dtype, PacketDecoder, packetRows
+from FeatureExtraction import extractFeatures
+from ModelExport import exportModel, loadModel
+from Classification import importData
+from Tools.Visualisation import visualiseFeatureDistribution
+from Tools.Synthetic import syntheticEMG, session_labels, featurePackets, syntheticFeatureFile
+
+
+resultsFile = 'Benchmark_Results.json'
+grid_search_space = [{'classifier': [SVC()], 'classifier__C': [1.0, 10.0], 'classifier__gamma': ['scale']},
+                     {'classifier': [KNeighborsClassifier()], 'classifier__n_neighbors': [3, 5]}]
+
+
+def build_sessions(source: np.ndarray, hdfFile: str, sessions: int, repetitions: int, compressed: bool) -> None:
+    """
+    Write a .h5 file of sessions tables, each holding NUM_GESTURES * repetitions rows taken cyclically from source
+
+    : rtype: None
+    """
+
+    rows_per_session = NUM_GESTURES * repetitions
+    with tb.open_file(filename=hdfFile, mode='w') as h5file:
+        h5file.create_group(where='/', name='features')
+        for s in range(0, sessions, 1):
+            index = np.arange(start=s * rows_per_session, stop=(s + 1) * rows_per_session, step=1) % source.shape[0]
+            table = createFeatureTable(h5file=h5file, name='fset_' + str(object=s), description=featureData, title='',
+                                       expectedrows=rows_per_session, compressed=compressed)
+            table.append(rows=source[index])
+            table.flush()
+
+
+def time_read(hdfFile: str, repeats: int) -> float:
+    """
+    Best full-scan read time [s] of the fields used by importData
+
+    : rtype: float
+    """
+
+    best = np.inf
+    for _ in range(0, repeats, 1):
+        start = tm.perf_counter()
+        with tb.open_file(filename=hdfFile, mode='r') as h5file:
+            readFeatures(h5file=h5file, fields=['label'] + feature_names)
+        best = min(best, tm.perf_counter() - start)
+
+    return best
+
+
+def benchmarkStorage(hdfFile: str, sessions: list = [10, 100, 1000], repetitions: int = 20, repeats: int = 5) -> list:
+    """
+    Compare file size and full-scan read time of the default and the chunked, compressed table layouts
+
+    Sessions are built from the rows of an existing feature file so the compression ratio reflects real data.
+
+    STATUS: WORKING
+
+    : param hdfFile: .h5 file providing the feature rows
+    : type hdfFile: string
+    : param sessions: numbers of sessions (tables) to benchmark
+    : type sessions: list
+    : param repetitions: repetitions per gesture in each session
+    : type repetitions: integer
+    : param repeats: read timing repeats (best is reported)
+    : type repeats: integer
+    : return: results, one dictionary per number of sessions and layout
+    : rtype: list
+    """
+
+    with tb.open_file(filename=hdfFile, mode='r') as h5file:
+        source = readFeatures(h5file=h5file, fields=list(feature_dtype.names))
+    source = source.astype(feature_dtype)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in sessions:
+            for layout in ('default', 'compressed'):
+                filename = os.path.join(tmpdir, layout + '_' + str(object=n) + '.h5')
+                start = tm.perf_counter()
+                build_sessions(source=source, hdfFile=filename, sessions=n, repetitions=repetitions, compressed=layout == 'compressed')
+                write_time = tm.perf_counter() - start
+                results.append({'sessions': n, 'layout': layout, 'rows': n * NUM_GESTURES * repetitions,
+                                'size': os.path.getsize(filename=filename), 'write': write_time,
+                                'read': time_read(hdfFile=filename, repeats=repeats)})
+
+    print(f"{'SESSIONS':>8} {'LAYOUT':>10} {'ROWS':>8} {'SIZE [kB]':>10} {'WRITE [s]':>10} {'READ [s]':>10}")
+    for r in results:
+        print(f"{r['sessions']:>8} {r['layout']:>10} {r['rows']:>8} {r['size']/1e3:>10.1f} {r['write']:>10.3f} {r['read']:>10.4f}")
+
+    return results
+
+
+def best_time(fn, repeats: int) -> float:
+    """
+    Best wall time [s] of repeats calls of fn
+
+    : rtype: float
+    """
+
+    best = np.inf
+    for _ in range(0, repeats, 1):
+        start = tm.perf_counter()
+        fn()
+        best = min(best, tm.perf_counter() - start)
+
+    return best
+
+
+def result(benchmark: str, rows: int, seconds: float, **extra) -> dict:
+    return dict({'benchmark': benchmark, 'rows': int(rows), 'seconds': float(seconds),
+                 'rows_per_s': float(rows / seconds) if seconds > 0 else None}, **extra)
+
+
+def benchmarkSuite(rows: list = [100, 500, 10000, 100000], repetitions: int = 100, max_fit_rows: int = 20000, repeats: int = 3,
+                   outFile: str = resultsFile, seed: int = 0) -> list:
+    """
+    Time each hot path on its own with synthetic data and append the results to a .json file
+
+    Timed: serial packet decoding, HDF5 appends, importData, scaling and splitting, GridSearchCV fitting,
+    single-sample predict latency of the exported model (sklearn and compiled) and the headless feature distribution report.
+
+    STATUS: WORKING
+
+    : param rows: dataset sizes [rows] to benchmark
+    : type rows: list
+    : param repetitions: repetitions per gesture in each synthetic session (rows per session = NUM_GESTURES * repetitions)
+    : type repetitions: integer
+    : param max_fit_rows: largest training set used for GridSearchCV fitting and the predict latency model
+    : type max_fit_rows: integer
+    : param repeats: timing repeats for the fast benchmarks (best is reported)
+    : type repeats: integer
+    : param outFile: .json results file, each run is appended
+    : type outFile: string
+    : param seed: random seed
+    : type seed: integer
+    : return: results of this run
+    : rtype: list
+    """
+
+    rng = np.random.default_rng(seed=seed)
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in rows:
+            print(f"ROWS: {n}")
+            labels = np.resize(session_labels(repetitions=repetitions), n)
+            features = extractFeatures(data=syntheticEMG(labels=labels, rng=rng))
+
+            # Serial decode
+            stream = featurePackets(features=features)
+            decoded = {}
+            def decode():
+                decoded['packets'], decoded['numbers'] = PacketDecoder().decode(buffer=bytearray(stream))
+            results.append(result(benchmark='serial_decode', rows=n, seconds=best_time(fn=decode, repeats=repeats), bytes=len(stream)))
+
+            # HDF5 append, flushed once per gesture as in collectFeatureData
+            rowsArray = packetRows(packets=decoded['packets'], labels=labels, timestamp=np.uint64(tm.time_ns()))
+            appendFile = os.path.join(tmpdir, 'append.h5')
+            def append():
+                with tb.open_file(filename=appendFile, mode='w') as h5file:
+                    h5file.create_group(where='/', name='features')
+                    table = createFeatureTable(h5file=h5file, name='fset_0', description=featureData, title='', expectedrows=n)
+                    for start in range(0, n, repetitions):
+                        table.append(rows=rowsArray[start:start + repetitions])
+                        table.flush()
+            results.append(result(benchmark='hdf5_append', rows=n, seconds=best_time(fn=append, repeats=repeats)))
+
+            # importData over a file of synthetic sessions
+            hdfFile = os.path.join(tmpdir, 'Feature_Data_' + str(object=n) + '.h5')
+            sessions = max(1, n // (NUM_GESTURES * repetitions))
+            written = syntheticFeatureFile(hdfFile=hdfFile, sessions=sessions, repetitions=max(1, min(repetitions, n // NUM_GESTURES)), seed=seed)
+            dataframe = {}
+            def import_data():
+                dataframe['data'] = importData(hdfFile=hdfFile)
+            seconds = best_time(fn=import_data, repeats=repeats)
+            results.append(result(benchmark='import_data', rows=written, seconds=seconds, sessions=sessions))
+
+            # Scaling and splitting as in classifyFeatureData
+            X = dataframe['data'].drop(labels='label', axis=1).to_numpy(dtype=np.float16)
+            y = dataframe['data']['label'].to_numpy(dtype=np.int8)
+            split = {}
+            def scale_split():
+                split['scaler'] = MinMaxScaler(feature_range=(0, 1))
+                scaled_X = split['scaler'].fit_transform(X=X)
+                split['data'] = train_test_split(scaled_X, y, test_size=0.2, random_state=0, stratify=y)
+            results.append(result(benchmark='scale_split', rows=written, seconds=best_time(fn=scale_split, repeats=repeats)))
+
+            # GridSearchCV fitting
+            X_train, X_test, y_train, y_test = split['data']
+            fit_rows = min(X_train.shape[0], max_fit_rows)
+            grid_search = GridSearchCV(estimator=Pipeline(steps=[('classifier', SVC())]), param_grid=grid_search_space, cv=5)
+            start = tm.perf_counter()
+            grid_search.fit(X=X_train[:fit_rows], y=y_train[:fit_rows])
+            results.append(result(benchmark='grid_search_fit', rows=fit_rows, seconds=tm.perf_counter() - start,
+                                  candidates=len(grid_search.cv_results_['params']), best_score=float(grid_search.best_score_)))
+
+            # Single-sample predict latency of the exported model
+            modelFile = os.path.join(tmpdir, 'Gesture_Model.pkl')
+            exportModel(modelFile=modelFile, scaler=split['scaler'], feature_names=feature_names, selected_features=feature_names,
+                        model=grid_search.best_estimator_.named_steps['classifier'], gesture_map=dict(enumerate(gesture_names)))
+            samples = X[rng.integers(low=0, high=X.shape[0], size=1000)]
+            for benchmark, compiled in (('predict_latency', False), ('predict_latency_compiled', True)):
+                model = loadModel(modelFile=modelFile, compiled=compiled)
+                latencies = np.empty(shape=samples.shape[0])
+                for i, sample in enumerate(samples):
+                    start = tm.perf_counter()
+                    model.predict(X=sample)
+                    latencies[i] = tm.perf_counter() - start
+                results.append(result(benchmark=benchmark, rows=1, seconds=float(latencies.mean()), fit_rows=fit_rows,
+                                      p50=float(np.percentile(a=latencies, q=50)), p99=float(np.percentile(a=latencies, q=99)),
+                                      model=type(grid_search.best_estimator_.named_steps['classifier']).__name__))
+
+            # Headless feature distribution report (statistics not cached)
+            start = tm.perf_counter()
+            visualiseFeatureDistribution(hdfFile=hdfFile, headless=True, outDir=os.path.join(tmpdir, 'figures'), n_jobs=1)
+            results.append(result(benchmark='visualise', rows=written, seconds=tm.perf_counter() - start))
+
+    # Report and append to results file
+    print(f"{'BENCHMARK':>24} {'ROWS':>8} {'SECONDS':>12} {'ROWS/S':>12}")
+    for r in results:
+        print(f"{r['benchmark']:>24} {r['rows']:>8} {r['seconds']:>12.6f} {r['rows_per_s']:>12.0f}")
+    run = {'created': dt.datetime.now().strftime("%d/%m/%Y, %H:%M:%S"), 'python': sys.version.split()[0],
+           'platform': platform.platform(), 'processor': platform.processor(), 'cpus': os.cpu_count(),
+           'repetitions': repetitions, 'results': results}
+    history = []
+    if os.path.exists(path=outFile):
+        with open(file=outFile, mode='r') as f:
+            history = json.load(fp=f)
+    history.append(run)
+    with open(file=outFile, mode='w') as f:
+        json.dump(obj=history, fp=f, indent=1)
+    print(f"Results appended to {outFile}")
+
+    return results
@@ -1,77 +1,185 @@
-# RAW DATA COLLECTION FUNCTION
+# RAW DATA COLLECTION FUNCTIONS
 # STATUS: WORKING
-# LAST UPDATED: 11/06/2024
-# NOTE: Repeated use will result in file being overwritten
+# LAST UPDATED: 18/10/2026
+# NOTE: Each repetition is read as one block, decoded in bulk and appended to the .h5 file as it arrives
+# NOTE: A new session is created for each run
+# NOTE: Use exportRawData to write a session to .xlsx
 
 
+import os
 import serial
-import struct
 import numpy as np
 import pandas as pd
-from config import NUM_GESTURES, BUFFER_RAW_SIZE, gesture_names
+import tables as tb
+import time as tm
+import datetime as dt
+from config import NUM_CHANNELS, NUM_GESTURES, BUFFER_RAW_SIZE, gesture_names
+from Dataset import compression_filters
+from Transport import openLink
+from Instrumentation import span
 
 
+rawFile = 'Raw_Data.h5'
 filename = 'Raw_Data.xlsx'
 
+FRAME_SIZE = 8  # sizeof(dataPacket), i.e. struct.calcsize('=ff'), one sample of each channel
+frame_dtype = np.dtype('<f4')  # little endian float for each channel
+SYSTEM_VOLTAGE = 3.3  # Teensy 4.0 system voltage [V], valid samples are within [0, SYSTEM_VOLTAGE]
 
-def collectRawData(port: str, baud: int, repetitions: int) -> None:
+
+class rawIndex(tb.IsDescription):
+    gesture = tb.UInt8Col(pos=0)
+    repetition = tb.UInt16Col(pos=1)
+    timestamp = tb.UInt64Col(pos=2)  # end of repetition [ns]
+
+
+def get_session_num(h5file: tb.File) -> int:
+    """
+    Get new session number based on existing sessions in the raw group of the .h5 file
+
+    : rtype: integer
+    """
+
+    if '/raw' not in h5file:
+        return 0
+    session_nums = [int(g._v_name.split('_')[-1]) for g in h5file.list_nodes(where='/raw', classname='Group')]
+
+    return max(session_nums) + 1 if session_nums else 0
+
+
+def createRawSession(h5file: tb.File, repetitions: int) -> tuple:
+    """
+    Create a session group holding an appendable data array of shape (rows, NUM_CHANNELS, BUFFER_RAW_SIZE), one row
+    (chunk) per repetition, and an index table with the gesture and repetition of each row
+
+    STATUS: WORKING
+
+    : param h5file: .h5 file object
+    : type h5file: File object
+    : param repetitions: number of repetitions to record for each gesture
+    : type repetitions: integer
+    : return: session group, data array and index table
+    : rtype: tuple
+    """
+
+    if '/raw' not in h5file:
+        h5file.create_group(where='/', name='raw')
+    session_time = dt.datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
+    group = h5file.create_group(where='/raw', name='rset_' + str(object=get_session_num(h5file=h5file)), title=f"Raw data for session {session_time}")
+    group._v_attrs.creation = session_time
+    group._v_attrs.repetitions = repetitions
+    data = h5file.create_earray(where=group, name='data', atom=tb.Float32Atom(), shape=(0, NUM_CHANNELS, BUFFER_RAW_SIZE),
+                                filters=compression_filters, expectedrows=NUM_GESTURES * repetitions,
+                                chunkshape=(1, NUM_CHANNELS, BUFFER_RAW_SIZE))
+    index = h5file.create_table(where=group, name='index', description=rawIndex, expectedrows=NUM_GESTURES * repetitions)
+
+    return group, data, index
+
+
+def decodeFrames(block: bytes, out: np.ndarray) -> None:
+    """
+    Decode a block of raw data frames into a (channels, samples) array in one pass
+
+    STATUS: WORKING
+
+    : param block: received bytes, BUFFER_RAW_SIZE frames of NUM_CHANNELS floats
+    : type block: bytes
+    : param out: output array of shape (NUM_CHANNELS, BUFFER_RAW_SIZE)
+    : type out: np.ndarray
+    : return: None
+    : rtype: None
+    """
+
+    out[...] = np.frombuffer(buffer=block, dtype=frame_dtype).reshape(-1, NUM_CHANNELS).T
+
+
+def collectRawData(port: str, baud: int, repetitions: int, hdfFile: str = rawFile) -> None:
     """
-    Read the feature data from the specified serial port, decode it and add it to the .h5 file.
+    Read the raw data from the specified serial port, decode it and append it to a new session in the .h5 file.
 
     STATUS: WORKING
 
-    : param port: serial comport to read from
+    : param port: serial comport, device path or pySerial URL to read from
     : type port: string
     : param baud: serial comport baudrate
     : type baud: integer
-    : param h5file: .h5 file object
-    : type h5file: File object
     : param repetitions: number of repetitions to record for each gesture
     : type repetitions: integer
-    : return: table number
-    : rtype: integer
+    : param hdfFile: .h5 filename
+    : type hdfFile: string
+    : return: None
+    : rtype: None
     """
 
+    link = None
+    h5file = tb.open_file(filename=hdfFile, mode='a')
     try:
+        group, rawData, rawTable = createRawSession(h5file=h5file, repetitions=repetitions)
+        print(f"Session: {group._v_name}")
+
         # Define the serial connection
         print("Attempting to establish serial connection")
-        link = serial.Serial(port=port, baudrate=baud, bytesize=serial.EIGHTBITS, timeout=None, parity=serial.PARITY_EVEN, rtscts=True)
-        if link.is_open:
-            link.close()
-            link.open()
+        link = openLink(port=port, baud=baud, timeout=None, parity=serial.PARITY_EVEN, rtscts=True, reset=False)
         serial_errors = 0
+        link_closed = False
 
         if link:
             print("Serial connection established")
             print("Starting...")
 
-            #labels = []
-            dataframes = []
-            columns = []
+            block_size = BUFFER_RAW_SIZE * FRAME_SIZE
+            datapoints = np.empty(shape=(NUM_GESTURES, repetitions, NUM_CHANNELS, BUFFER_RAW_SIZE), dtype=np.float32)
+            decode_time = 0.0
+            recorded = 0
+            start_time = tm.perf_counter()
             for ges in range(0, NUM_GESTURES, 1):
+                if link_closed:
+                    break
                 print(f"Gesture: {gesture_names[ges]}")
                 for rep in range(0, repetitions, 1):
                     print(f"Repetition: {rep}")
-                    #labels.append(gesture_names[ges])
-                    datapoints = [[], []]
-                    columns += ['g' + str(object=ges) + '_r' + str(object=rep) + '_ch0', 'g' + str(object=ges) + '_r' + str(object=rep) + '_ch1']
-                    for data in range(0, BUFFER_RAW_SIZE, 1):
-                        # Read data
-                        serial_read = link.read(size=8)
-                        # Decode data
-                        data_struct = struct.unpack('=ff', serial_read)
-                        #print(data_struct)
-                        # Add data to list
-                        datapoints[0].append(data_struct[0])
-                        datapoints[1].append(data_struct[1])
-                    #print(datapoints)
-                    dataframes.append(pd.DataFrame(data=datapoints, dtype=np.float16))
-            #print(dataframes)
-            dataframe = pd.concat(objs=dataframes, axis=0, ignore_index=True).transpose()
-            dataframe.to_excel(excel_writer=filename, sheet_name="Raw Data", float_format="%.4f", header=columns, index_label='index')
+                    # Read whole repetition
+                    block = bytearray()
+                    with span(name='serial_read') as s:
+                        while len(block) < block_size:
+                            chunk = link.read(size=block_size - len(block))
+                            if not chunk:  # link closed
+                                break
+                            block += chunk
+                        s.add(counter='bytes_read', n=len(block))
+                    if len(block) < block_size:  # short block, the repetition is not recorded
+                        serial_errors += 1
+                        link_closed = True
+                        print(f"Link closed after {len(block)} of {block_size} bytes, stopping")
+                        break
+
+                    # Decode data
+                    with span(name='decode_frames', packets_decoded=BUFFER_RAW_SIZE) as s:
+                        decodeFrames(block=block, out=datapoints[ges, rep])
+                    decode_time += s.wall
+                    invalid = np.count_nonzero(~((datapoints[ges, rep] >= 0.0) & (datapoints[ges, rep] <= SYSTEM_VOLTAGE)))  # also nan
+                    if invalid:  # kept, but counted as a serial error
+                        serial_errors += 1
+                        print(f"Invalid samples: {invalid}")
+
+                    # Write repetition to file
+                    with span(name='hdf5_append', rows_written=1):
+                        rawData.append(sequence=datapoints[ges, rep][None])
+                        rawTable.append(rows=[(ges, rep, tm.time_ns())])
+                        rawData.flush()
+                        rawTable.flush()
+                    recorded += 1
+
+            # Report sample rates (one sample = one frame of all channels)
+            samples = recorded * BUFFER_RAW_SIZE
+            duration = tm.perf_counter() - start_time
+            print(f"Samples: {samples} in {duration:.2f} s ({samples/duration:.0f} samples/s)")
+            print(f"Decoding: {decode_time*1e3:.2f} ms ({samples/max(decode_time, 1e-9):.0f} samples/s)")
+            group._v_attrs.achieved_sample_rate = samples / duration  # samples/s
+            group._v_attrs.serial_errors = serial_errors
 
         print(f"Serial Errors: {serial_errors}")
-        print("Data Collection Completed Successfully")
+        print("Data Collection Stopped Early" if link_closed else "Data Collection Completed Successfully")
         print("EXITING...")
     except serial.SerialException as se:
         print("SERIAL EXCEPTION OCCURED IN RAW DATA COLLECTION PROCESS!\n")
@@ -81,4 +189,36 @@ def collectRawData(port: str, baud: int, repetitions: int) -> None:
         import traceback
         traceback.print_exc()
     finally:
-        link.close()
+        if link is not None:
+            link.close()
+        h5file.close()
+
+
+def exportRawData(hdfFile: str = rawFile, session: int = None, excelFile: str = filename) -> None:
+    """
+    Export a raw data session to .xlsx, one column per gesture, repetition and channel (g0_r0_ch0, g0_r0_ch1, ...)
+
+    STATUS: WORKING
+
+    : param hdfFile: .h5 filename
+    : type hdfFile: string
+    : param session: session number to export (default: latest session)
+    : type session: integer
+    : param excelFile: .xlsx filename (overwritten)
+    : type excelFile: string
+    : return: None
+    : rtype: None
+    """
+
+    with tb.open_file(filename=hdfFile, mode='r') as h5file:
+        if session is None:
+            session = get_session_num(h5file=h5file) - 1
+        group = h5file.get_node(where='/raw', name='rset_' + str(object=session))
+        data = group.data.read()
+        index = group.index.read()
+
+    # Columns are (gesture, repetition, channel), rows are samples
+    columns = ['g' + str(object=ges) + '_r' + str(object=rep) + '_ch' + str(object=cha) for ges, rep in zip(index['gesture'], index['repetition']) for cha in range(0, NUM_CHANNELS, 1)]
+    dataframe = pd.DataFrame(data=data.reshape(-1, BUFFER_RAW_SIZE).T, columns=columns)
+    dataframe.to_excel(excel_writer=excelFile, sheet_name="Raw Data", float_format="%.4f", index_label='index')
+    print(f"Exported {os.path.basename(p=hdfFile)} session {session} to {excelFile}")
@@ -0,0 +1,290 @@
+# VIRTUAL SERIAL DEVICE EMULATING FDCRECEIVER.INO AND RDCRECEIVER.INO
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: pty transport is Linux/macOS only, the socket transport works everywhere (connect with socket://host:port)
+
+
+import os
+import socket
+import select
+import threading
+import numpy as np
+import tables as tb
+import time as tm
+from config import NUM_CHANNELS, NUM_GESTURES, extracted_features
+from Dataset import readFeatures
+from FeatureExtraction import extractFeatures
+from Tools.Synthetic import syntheticEMG, session_labels, featurePackets, rawFrames
+
+
+def featureStream(repetitions: int, hdfFile: str = None, seed: int = 0) -> list:
+    """
+    Feature packet sets as sent by fdcReceiver.ino for one session, recorded (first rows of a feature .h5 file,
+    in gesture order) or synthetic
+
+    Recorded Hjorth activity is recomputed from the float16 mav and rms so the sets pass the packet validity check.
+
+    STATUS: WORKING
+
+    : param repetitions: repetitions per gesture
+    : type repetitions: integer
+    : param hdfFile: feature .h5 file to replay (default: synthetic data)
+    : type hdfFile: string
+    : param seed: random seed for synthetic data
+    : type seed: integer
+    : return: one bytes object per repetition (packet set) in transmission order
+    : rtype: list
+    """
+
+    labels = session_labels(repetitions=repetitions)
+    if hdfFile is None:
+        features = extractFeatures(data=syntheticEMG(labels=labels, rng=np.random.default_rng(seed=seed)))
+    else:
+        with tb.open_file(filename=hdfFile, mode='r') as h5file:
+            rows = readFeatures(h5file=h5file)
+        features = np.empty(shape=(labels.shape[0], NUM_CHANNELS, len(extracted_features)), dtype=np.float64)
+        for ges in range(0, NUM_GESTURES, 1):
+            gesture_rows = rows[rows['label'] == ges]
+            index = np.arange(start=0, stop=repetitions, step=1) % max(1, gesture_rows.shape[0])
+            for cha in range(0, NUM_CHANNELS, 1):
+                for f, feature in enumerate(extracted_features):
+                    features[ges * repetitions:(ges + 1) * repetitions, cha, f] = gesture_rows['ch' + str(object=cha) + '_' + feature][index]
+        # Stored features are float16, restore the Hjorth activity identity checked by validSets
+        features[..., 5] = features[..., 1] ** 2 - features[..., 0] ** 2
+    stream = featurePackets(features=features)
+    set_size = len(stream) // labels.shape[0]
+
+    return [stream[i:i + set_size] for i in range(0, len(stream), set_size)]
+
+
+def rawStream(repetitions: int, hdfFile: str = None, session: int = None, seed: int = 0) -> list:
+    """
+    Raw data frames as sent by rdcReceiver.ino for one session, recorded (a Raw_Data.h5 session) or synthetic
+
+    STATUS: WORKING
+
+    : param repetitions: repetitions per gesture (synthetic data only)
+    : type repetitions: integer
+    : param hdfFile: raw .h5 file to replay (default: synthetic data)
+    : type hdfFile: string
+    : param session: raw session number to replay (default: latest session)
+    : type session: integer
+    : param seed: random seed for synthetic data
+    : type seed: integer
+    : return: one bytes object per repetition in transmission order
+    : rtype: list
+    """
+
+    if hdfFile is None:
+        data = syntheticEMG(labels=session_labels(repetitions=repetitions), rng=np.random.default_rng(seed=seed))
+    else:
+        with tb.open_file(filename=hdfFile, mode='r') as h5file:
+            groups = sorted(h5file.list_nodes(where='/raw', classname='Group'), key=lambda g: int(g._v_name.split('_')[-1]))
+            group = groups[-1] if session is None else h5file.get_node(where='/raw', name='rset_' + str(object=session))
+            data = group.data.read()
+
+    return [rawFrames(data=data[i:i + 1]) for i in range(0, data.shape[0], 1)]
+
+
+class SerialEmulator(threading.Thread):
+    """
+    Replay repetitions over a pty pair or a TCP socket at an adjustable rate, with jitter and injected corruption
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, chunks: list, transport: str = 'pty', rate: float = 1.0, jitter: float = 0.0, corruption: float = 0.0,
+                 loop: bool = False, host: str = 'localhost', tcp_port: int = 0, seed: int = 0) -> None:
+        """
+        : param chunks: bytes sent per repetition, as returned by featureStream or rawStream
+        : type chunks: list
+        : param transport: 'pty' or 'socket'
+        : type transport: string
+        : param rate: repetitions sent per second (0 sends as fast as the reader takes them)
+        : type rate: float
+        : param jitter: standard deviation of the send interval as a fraction of the interval
+        : type jitter: float
+        : param corruption: probability of corrupting a repetition (one byte flipped, inserted or dropped)
+        : type corruption: float
+        : param loop: replay the chunks until stopped
+        : type loop: boolean
+        """
+
+        super().__init__(name='SerialEmulator', daemon=True)
+        self.chunks = chunks
+        self.rate = rate
+        self.jitter = jitter
+        self.corruption = corruption
+        self.loop = loop
+        self.rng = np.random.default_rng(seed=seed)
+        self.stop_event = threading.Event()
+        self.finished = threading.Event()
+        self.bytes_sent = 0
+        self.chunks_sent = 0
+        self.corrupted = {'flip': 0, 'insert': 0, 'drop': 0}
+        self.transport = transport
+        if transport == 'pty':
+            import tty  # POSIX only
+            self.master, slave = os.openpty()
+            tty.setraw(fd=slave)
+            self.port = os.ttyname(slave)
+            os.close(slave)  # the master reports a hang-up until the reader opens the slave
+            os.set_blocking(self.master, False)
+            self.poll = select.poll()
+            self.poll.register(self.master, select.POLLOUT | select.POLLHUP)
+        elif transport == 'socket':
+            self.server = socket.socket(family=socket.AF_INET, type=socket.SOCK_STREAM)
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server.bind((host, tcp_port))
+            self.server.listen(1)
+            self.port = f"socket://{host}:{self.server.getsockname()[1]}"
+        else:
+            raise ValueError(f"Unknown transport {transport}, expected 'pty' or 'socket'")
+
+    def corrupt(self, chunk: bytes) -> bytes:
+        """
+        Flip, insert or drop one random byte of the chunk
+
+        : rtype: bytes
+        """
+
+        kind = ['flip', 'insert', 'drop'][int(self.rng.integers(low=0, high=3))]
+        pos = int(self.rng.integers(low=0, high=len(chunk)))
+        self.corrupted[kind] += 1
+        if kind == 'flip':
+            return chunk[:pos] + bytes([chunk[pos] ^ (1 << int(self.rng.integers(low=0, high=8)))]) + chunk[pos + 1:]
+        if kind == 'insert':
+            return chunk[:pos] + bytes([int(self.rng.integers(low=0, high=256))]) + chunk[pos:]
+        return chunk[:pos] + chunk[pos + 1:]
+
+    def wait_pty(self) -> None:
+        """
+        Wait until the reader opens the pty, then give it time to reset its input buffer
+
+        : rtype: None
+        """
+
+        while any(event & select.POLLHUP for _, event in self.poll.poll(100)):
+            if self.stop_event.is_set():
+                raise OSError("Emulator stopped")
+            tm.sleep(0.05)
+        tm.sleep(0.1)
+
+    def write_pty(self, data: memoryview) -> int:
+        """
+        Write to the pty master once it is writable, so a stop is not blocked by a reader that stopped reading
+
+        : rtype: integer
+        """
+
+        while True:
+            events = self.poll.poll(100)
+            if any(event & select.POLLHUP for _, event in events):
+                raise OSError("Reader closed the link")
+            if events:
+                return os.write(self.master, data)
+            if self.stop_event.is_set():
+                raise OSError("Emulator stopped")
+
+    def run(self) -> None:
+        conn = None
+        try:
+            if self.transport == 'socket':
+                conn, _ = self.server.accept()
+                tm.sleep(0.1)  # give the reader time to reset its input buffer
+                write = conn.sendall
+            else:
+                self.wait_pty()
+                write = self.write_pty
+            interval = 1.0 / self.rate if self.rate > 0 else 0.0
+            next_time = tm.perf_counter()
+            while not self.stop_event.is_set():
+                for chunk in self.chunks:
+                    if self.stop_event.is_set():
+                        break
+                    if self.corruption > 0 and self.rng.random() < self.corruption:
+                        chunk = self.corrupt(chunk=chunk)
+                    if interval:
+                        next_time += interval * max(0.0, 1.0 + self.jitter * self.rng.standard_normal())
+                        delay = next_time - tm.perf_counter()
+                        if delay > 0:
+                            tm.sleep(delay)
+                    view = memoryview(chunk)
+                    while view:  # os.write may write part of the chunk
+                        written = write(view)
+                        if written is None:  # sendall
+                            break
+                        view = view[written:]
+                    self.bytes_sent += len(chunk)
+                    self.chunks_sent += 1
+                if not self.loop:
+                    break
+            self.finished.set()
+            self.stop_event.wait()  # the Teensy keeps the link open after the last repetition
+        except OSError:
+            pass  # reader closed the link or emulator stopped
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.join(timeout=1.0)
+
+    def close(self) -> None:
+        if self.transport == 'pty':
+            os.close(self.master)
+        else:
+            self.server.close()
+
+    def summary(self) -> str:
+        return (f"Sent {self.chunks_sent} repetitions ({self.bytes_sent} bytes), "
+                f"corrupted: {sum(self.corrupted.values())} {self.corrupted}")
+
+
+def emulate(mode: str = 'feature', transport: str = 'pty', repetitions: int = 2, rate: float = 0.2, jitter: float = 0.0,
+            corruption: float = 0.0, loop: bool = False, hdfFile: str = None, tcp_port: int = 7777) -> None:
+    """
+    Run an emulated fdcReceiver.ino ('feature') or rdcReceiver.ino ('raw') until interrupted
+
+    STATUS: WORKING
+
+    : param mode: 'feature' or 'raw'
+    : type mode: string
+    : param transport: 'pty' or 'socket'
+    : type transport: string
+    : param repetitions: repetitions per gesture (match --reps of the collection process)
+    : type repetitions: integer
+    : param rate: repetitions per second (the hardware sends one every ~6 s, 0 is unthrottled)
+    : type rate: float
+    : param jitter: standard deviation of the send interval as a fraction of the interval
+    : type jitter: float
+    : param corruption: probability of corrupting a repetition
+    : type corruption: float
+    : param loop: replay the session until interrupted
+    : type loop: boolean
+    : param hdfFile: recorded .h5 file to replay (default: synthetic data)
+    : type hdfFile: string
+    : param tcp_port: TCP port of the socket transport
+    : type tcp_port: integer
+    : return: None
+    : rtype: None
+    """
+
+    chunks = featureStream(repetitions=repetitions, hdfFile=hdfFile) if mode == 'feature' else rawStream(repetitions=repetitions, hdfFile=hdfFile)
+    emulator = SerialEmulator(chunks=chunks, transport=transport, rate=rate, jitter=jitter, corruption=corruption, loop=loop, tcp_port=tcp_port)
+    emulator.start()
+    print(f"EMULATING {'fdcReceiver.ino' if mode == 'feature' else 'rdcReceiver.ino'} ON {emulator.port}")
+    try:
+        announced = False
+        while emulator.is_alive():
+            emulator.join(timeout=0.5)
+            if emulator.finished.is_set() and not announced:
+                print(f"Session sent, link held open until interrupted (Ctrl+C). {emulator.summary()}")
+                announced = True
+    except KeyboardInterrupt:
+        print("EXITING...")
+    finally:
+        emulator.stop()
+        print(emulator.summary())
+        emulator.close()
@@ -0,0 +1,121 @@
+# SYNTHETIC EMG, FEATURE PACKET AND FEATURE FILE GENERATORS
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Stand-in for the Teensy when benchmarking or load-testing, the byte streams match fdcReceiver.ino and rdcReceiver.ino
+
+
+import numpy as np
+import tables as tb
+import time as tm
+import datetime as dt
+from config import NUM_CHANNELS, NUM_GESTURES, BUFFER_RAW_SIZE, TONE_ON, TONE_OFF, ZERO_OFFSET
+from FeatureCollection import featureData, packet_dtype
+from FeatureExtraction import extractFeatures, featureRows
+from Dataset import createFeatureTable, recordSession
+
+
+SYSTEM_VOLTAGE = 3.3  # Teensy 4.0 system voltage [V]
+BASELINE_NOISE = 0.01  # [V]
+
+# Burst amplitude [V] of each gesture on each channel
+gesture_amplitudes = np.linspace(start=0.05, stop=0.4, num=NUM_GESTURES * NUM_CHANNELS).reshape(NUM_GESTURES, NUM_CHANNELS)[:, ::-1] * \
+    np.array([1.0, 0.6])[:NUM_CHANNELS]
+
+
+def syntheticEMG(labels, rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Generate raw two-channel EMG windows: noise around the zero offset with a gesture-dependent burst while the tone is on
+
+    STATUS: WORKING
+
+    : param labels: gesture label of each window
+    : type labels: array-like
+    : param rng: random generator (default: seeded with 0)
+    : type rng: np.random.Generator
+    : return: raw data [V] of shape (windows, NUM_CHANNELS, BUFFER_RAW_SIZE)
+    : rtype: np.ndarray
+    """
+
+    rng = np.random.default_rng(seed=0) if rng is None else rng
+    labels = np.asarray(labels, dtype=np.intp)
+    envelope = np.zeros(shape=BUFFER_RAW_SIZE)
+    envelope[TONE_ON:TONE_OFF] = np.sin(np.linspace(start=0, stop=np.pi, num=TONE_OFF - TONE_ON))
+    amplitude = gesture_amplitudes[labels] * rng.uniform(low=0.7, high=1.3, size=(labels.shape[0], NUM_CHANNELS))  # effort varies per repetition
+    data = ZERO_OFFSET + rng.normal(scale=BASELINE_NOISE, size=(labels.shape[0], NUM_CHANNELS, BUFFER_RAW_SIZE))
+    data += amplitude[..., None] * envelope * rng.normal(size=data.shape)
+
+    return np.clip(a=data, a_min=0.0, a_max=SYSTEM_VOLTAGE)
+
+
+def session_labels(repetitions: int) -> np.ndarray:
+    return np.repeat(np.arange(start=0, stop=NUM_GESTURES, step=1), repetitions)
+
+
+def featurePackets(features: np.ndarray) -> bytes:
+    """
+    Encode features as the '@HfffHHfff' feature structs sent by fdcReceiver.ino (channel 0, channel 1, channel 0, ...)
+
+    STATUS: WORKING
+
+    : param features: features of shape (windows, NUM_CHANNELS, 8) as returned by extractFeatures
+    : type features: np.ndarray
+    : return: byte stream
+    : rtype: bytes
+    """
+
+    packets = np.zeros(shape=features.shape[:2], dtype=packet_dtype)
+    packets['channel'] = np.arange(start=0, stop=features.shape[1], step=1)
+    for f, feature in enumerate(['mav', 'rms', 'wl', 'zc', 'wa', 'hj_a', 'hj_m', 'hj_c']):
+        packets[feature] = features[..., f]
+
+    return packets.tobytes()
+
+
+def rawFrames(data: np.ndarray) -> bytes:
+    """
+    Encode raw data as the '=ff' data packets sent by rdcReceiver.ino, one frame per sample
+
+    STATUS: WORKING
+
+    : param data: raw data of shape (windows, NUM_CHANNELS, BUFFER_RAW_SIZE)
+    : type data: np.ndarray
+    : return: byte stream
+    : rtype: bytes
+    """
+
+    return np.ascontiguousarray(np.swapaxes(a=data, axis1=1, axis2=2), dtype='<f4').tobytes()
+
+
+def syntheticFeatureFile(hdfFile: str, sessions: int, repetitions: int, seed: int = 0) -> int:
+    """
+    Write a feature .h5 file of synthetic sessions, laid out as by collectFeatureData
+
+    STATUS: WORKING
+
+    : param hdfFile: .h5 filename (overwritten)
+    : type hdfFile: string
+    : param sessions: number of sessions (tables)
+    : type sessions: integer
+    : param repetitions: repetitions per gesture in each session
+    : type repetitions: integer
+    : param seed: random seed
+    : type seed: integer
+    : return: number of rows written
+    : rtype: integer
+    """
+
+    rng = np.random.default_rng(seed=seed)
+    labels = session_labels(repetitions=repetitions)
+    with tb.open_file(filename=hdfFile, mode='w') as h5file:
+        group = h5file.create_group(where='/', name='features')
+        group._v_attrs.creation = dt.datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
+        for s in range(0, sessions, 1):
+            features = extractFeatures(data=syntheticEMG(labels=labels, rng=rng))
+            timestamps = tm.time_ns() + np.arange(start=0, stop=labels.shape[0], step=1, dtype=np.uint64) * np.uint64(6e9)  # ~6 s per repetition
+            table = createFeatureTable(h5file=h5file, name='fset_' + str(object=s), description=featureData, title='Synthetic feature data',
+                                       expectedrows=labels.shape[0])
+            table.append(rows=featureRows(features=features, labels=labels, timestamps=timestamps))
+            table.flush()
+            recordSession(h5file=h5file, table=table, repetitions=repetitions)
+
+    return sessions * labels.shape[0]
@@ -0,0 +1,52 @@
+# SERIAL TRANSPORT FUNCTIONS SHARED BY THE COLLECTION PROCESSES
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Any pySerial URL can be used in place of a comport, e.g. socket://localhost:7777 or the pty printed by Tools/SerialEmulator.py
+
+
+import serial
+
+
+def port_url(port) -> str:
+    """
+    Comport number (e.g. 3 -> COM3), device path or pySerial URL of the link
+
+    : param port: comport number, device path (e.g. /dev/ttyACM0) or URL (e.g. socket://localhost:7777, loop://)
+    : type port: integer or string
+    : return: port name or URL for serial_for_url
+    : rtype: string
+    """
+
+    port = str(object=port)
+    return "COM" + port if port.isdigit() else port
+
+
+def openLink(port, baud: int, timeout: float = None, parity: str = serial.PARITY_NONE, rtscts: bool = False, reset: bool = True) -> serial.SerialBase:
+    """
+    Open a serial link, or any transport pySerial supports through serial_for_url
+
+    STATUS: WORKING
+
+    : param port: comport number, device path or pySerial URL
+    : type port: integer or string
+    : param baud: baudrate (ignored by non-serial transports)
+    : type baud: integer
+    : param timeout: read timeout [s] (None blocks until the requested bytes arrive)
+    : type timeout: float
+    : param parity: parity setting
+    : type parity: string
+    : param rtscts: enable hardware flow control
+    : type rtscts: boolean
+    : param reset: discard bytes received before the link was opened
+    : type reset: boolean
+    : return: open link
+    : rtype: serial.SerialBase
+    """
+
+    link = serial.serial_for_url(url=port_url(port=port), do_not_open=True, baudrate=baud, bytesize=serial.EIGHTBITS,
+                                 parity=parity, timeout=timeout, rtscts=rtscts)
+    link.open()
+    if reset:
+        link.reset_input_buffer()
+
+    return link
@@ -1,11 +1,22 @@
 # CONFIG FILE
-# LAST UPDATED: 12/06/2024
+# LAST UPDATED: 18/10/2026
 
 
 NUM_CHANNELS = 2
 NUM_GESTURES = 5
 BUFFER_RAW_SIZE = 500
 
+# Feature extraction settings (IMPORTANT: must match those in fdcReceiver.ino)
+SMOOTH = True  # moving average smoothing before feature extraction
+WINDOW = 20  # moving average window length
+TONE_ON = 200
+TONE_OFF = 300
+START_CUT_ERROR = 25
+END_CUT_ERROR = 50
+BUFFER_CUT_SIZE = START_CUT_ERROR + (TONE_OFF - TONE_ON) + END_CUT_ERROR
+ZERO_OFFSET = 1.65  # Zero Crossings zero offset [V]
+WILLISON_THRESHOLD = 0.01  # Willison Amplitude threshold [V]
+
 columns = [('timestamp', 'u8'), ('label', 'u2'),
            ('ch0_mav', 'f2'), ('ch1_mav', 'f2'),
            ('ch0_rms', 'f2'), ('ch1_rms', 'f2'),
@@ -25,4 +36,6 @@ feature_names = ['ch0_mav', 'ch1_mav',
                  'ch0_hj_m', 'ch1_hj_m',
                  'ch0_hj_c', 'ch1_hj_c']
 
+extracted_features = ['mav', 'rms', 'wl', 'zc', 'wa', 'hj_a', 'hj_m', 'hj_c']  # feature order in the feature struct
+
 gesture_names = ['asl for 1', 'asl for 2', 'asl for 3', 'asl for 4', 'asl for 5']
@@ -1,24 +1,36 @@
 # STATUS: WORKING
-# LAST UPDATED: 10/06/2024
+# LAST UPDATED: 18/10/2026
 # https://forum.dronebotworkshop.com/c-plus-plus/serial-data-transfer-from-arduino-to-python/
 
 
 import os
+import atexit
 import argparse
+import numpy as np
 import tables as tb
 from serial.tools import list_ports
 from FeatureCollection import collectFeatureData
 from Tools.Visualisation import visualiseFeatureDistribution
-from Classification import classifyFeatureData
-from Tools.RawDataCollection import collectRawData
+from Classification import classifyFeatureData, evaluateSessions
+from ModelExport import model_filename
+from ModelUpdate import updateModel
+from OutOfCore import trainOutOfCore
+from Tools.RawDataCollection import collectRawData, exportRawData
+from Tools.Benchmark import benchmarkStorage, benchmarkSuite
+from Tools.SerialEmulator import emulate
+from Dataset import list_tables, get_catalogue, migrateFeatureFile
+from Transport import port_url
+import Instrumentation
+from config import NUM_GESTURES, feature_names
 
 
 hdfFile = os.path.join(os.getcwd(), 'Feature_Data.h5')
+rawFile = os.path.join(os.getcwd(), 'Raw_Data.h5')
 
 
 def print_all() -> None:
     """
-    Print all table numbers belonging to each group in the .h5 file
+    Print all tables in the features group of the .h5 file with their row and label counts
 
     STATUS: WORKING
 
@@ -27,47 +39,57 @@ def print_all() -> None:
     """
 
     if os.path.exists(path=hdfFile):
+        h5file = None
         try:
             # Open .h5 file for reading
             h5file = tb.open_file(filename=hdfFile, mode='r')
 
-            # List all nodes in .h5 file
-            nodes = []
-            for node in h5file:
-                nodes.append(str(object=node))
-
-            # Filter listed nodes based on those that are groups
-            filtered_groups = list(filter(lambda x: '(Group)' in x, nodes))
-            groups = [(x.split(" ")[0]) for x in filtered_groups]
-
-            # Print a list of each table belonging to each group
-            for grp in groups:
-                gf_string = grp + '/'
-                filtered_tables = list(filter(lambda x: gf_string in x, nodes))
-                filtered_tables = list(
-                    filter(lambda x: '(Table' in x, filtered_tables))
-                tables = [x.split(' ')[0] for x in filtered_tables]
-                print(f"GROUP: {grp}")
-
-                for tbl in tables:
-                    table_name = tbl.split('/')[-1]
-                    print(f"\tTABLE: {table_name}")
-                    nodeObject = h5file.get_node(where=grp, name=table_name)
-                    repetitions = list(set([x['repetition'] for x in nodeObject.iterrows()]))  # type: ignore
-                    repetitions.sort()
-                    print(f"\t\tREP NUMS: {repetitions}")
+            # Print each table belonging to the features group, from the catalogue if there is one
+            print("GROUP: /features")
+            catalogue = get_catalogue(h5file=h5file)
+            if catalogue is not None:
+                for session in np.sort(catalogue.read(), order='table_num'):
+                    print(f"\tTABLE: {session['table_name'].decode()} ({session['creation'].decode()})")
+                    print(f"\t\tROWS: {session['rows']}, LABEL COUNTS: {session['label_counts'].tolist()}, REPETITIONS: {session['repetitions']}")
+            else:
+                for table in list_tables(h5file=h5file):
+                    label_counts = np.bincount(table.col('label'), minlength=NUM_GESTURES)
+                    print(f"\tTABLE: {table.name}")
+                    print(f"\t\tROWS: {table.nrows}, LABEL COUNTS: {label_counts.tolist()}")
         except:
             print("PYTABLES EXCEPTION OCCURRED!")
             print(f"IF HDF5ExtError: Most likely cause is {hdfFile} is empty")
             print("EXITING...")
+            exit(code=1)
         finally:
             # Close the .h5 file
-            h5file.close()
-            exit(code=1)
+            if h5file is not None:
+                h5file.close()
     else:
         print(f"{os.path.basename(p=hdfFile)} AT {os.path.dirname(p=hdfFile)} DOES NOT EXIST.\n")
 
 
+def report_metrics(metricsFile: str = None, show: bool = False) -> None:
+    """
+    Print the timing summary and/or append the recorded spans to a .jsonl file, registered to run at exit
+
+    STATUS: WORKING
+
+    : param metricsFile: .jsonl filename (default: not exported)
+    : type metricsFile: string
+    : param show: print the summary table
+    : type show: boolean
+    : return: None
+    : rtype: None
+    """
+
+    if show:
+        print(Instrumentation.summary())
+    if metricsFile is not None:
+        Instrumentation.exportMetrics(jsonFile=metricsFile)
+        print(f"Metrics appended to {metricsFile}")
+
+
 def run(parser, args) -> None:
     """
     Run the chosen process
@@ -86,22 +108,62 @@ def run(parser, args) -> None:
 
     if args.command == 'F':  # Feature Data Collection
         print("STARTING FEATURE DATA COLLECTION...")
-        comport = "COM" + str(object=args.port)
-        collectFeatureData(port=comport, baud=args.baud, hdfFile=hdfFile, repetitions=args.reps)
+        collectFeatureData(port=port_url(port=args.port), baud=args.baud, hdfFile=hdfFile, repetitions=args.reps, compressed=not args.uncompressed)
 
     elif args.command == 'V':  # Feature Data Distribution Visualisation
         print("STARTING FEATURE DATA DISTRIBUTION VISUALISATION...")
-        visualiseFeatureDistribution(hdfFile=hdfFile)
+        visualiseFeatureDistribution(hdfFile=hdfFile, headless=args.headless, sessions=args.sessions, outDir=args.out)
+
+    elif args.command == 'C' and args.loso:  # Session evaluation
+        print("STARTING SESSION EVALUATION...")
+        evaluateSessions(hdfFile=hdfFile, folds=args.folds, modelFile=os.path.join(os.path.dirname(hdfFile), model_filename), cache=not args.nocache)
+
+    elif args.command == 'C' and args.stream:  # Out-of-core training
+        print("STARTING OUT-OF-CORE TRAINING...")
+        trainOutOfCore(hdfFile=hdfFile, test_split=args.splt / 100.0, block_rows=args.block, epochs=args.epochs,
+                       modelFile=os.path.join(os.path.dirname(hdfFile), model_filename))
 
     elif args.command == 'C':  # Classification
+        if args.topk is not None and not 1 <= args.topk <= len(feature_names):
+            parser.error(f"--topk must be between 1 and {len(feature_names)} (the number of features), got {args.topk}")
         print("STARTING CLASSIFICATION...")
         test_split = args.splt / 100.0
-        classifyFeatureData(hdfFile=hdfFile, test_split=test_split)
+        classifyFeatureData(hdfFile=hdfFile, test_split=test_split, search=args.search,
+                            latency_budget=None if args.latency is None else args.latency / 1e3,
+                            size_budget=None if args.size is None else int(args.size * 1e3), tolerance=args.tolerance,
+                            cache=not args.nocache, features=args.features, top_k=args.topk)
+
+    elif args.command == 'U':  # Incremental model update
+        print("STARTING MODEL UPDATE...")
+        modelFile = os.path.join(os.path.dirname(hdfFile), model_filename)
+        updateModel(hdfFile=hdfFile, modelFile=modelFile, sessions=args.sessions, outFile=args.out)
 
     elif args.command == 'R':  # Raw Data Collection
         print("STARTING RAW DATA COLLECTION...")
-        comport = "COM" + str(object=args.port)
-        collectRawData(port=comport, baud=args.baud, repetitions=args.reps)
+        collectRawData(port=port_url(port=args.port), baud=args.baud, repetitions=args.reps, hdfFile=rawFile)
+        if args.excel:
+            exportRawData(hdfFile=rawFile)
+
+    elif args.command == 'X':  # Raw Data Excel Export
+        print("STARTING RAW DATA EXPORT...")
+        exportRawData(hdfFile=rawFile, session=args.session)
+
+    elif args.command == 'M':  # Migrate .h5 file to the compressed layout
+        print("STARTING FEATURE DATA MIGRATION...")
+        migrateFeatureFile(hdfFile=hdfFile if args.file is None else args.file)
+
+    elif args.command == 'B':  # Benchmarks
+        if args.storage:
+            print("STARTING STORAGE BENCHMARK...")
+            benchmarkStorage(hdfFile=hdfFile, sessions=args.sessions, repetitions=args.reps)
+        else:
+            print("STARTING BENCHMARK SUITE...")
+            benchmarkSuite(rows=args.rows, outFile=args.out)
+
+    elif args.command == 'E':  # Serial device emulator
+        print("STARTING SERIAL EMULATOR...")
+        emulate(mode=args.mode, transport=args.transport, repetitions=args.reps, rate=args.rate, jitter=args.jitter,
+                corruption=args.corruption, loop=args.loop, hdfFile=args.file, tcp_port=args.tcp_port)
 
     elif args.command == 'LIST':
         # List available comports
@@ -131,6 +193,8 @@ def main() -> None:
         description='Offline process selection.',
         epilog="See '<command> --help' to read about a specific sub-command."
     )
+    parser.add_argument('--metrics', default=None, type=str, help='append per-stage timings and counters to this .jsonl file at exit')
+    parser.add_argument('--timings', action='store_true', help='print the per-stage timing summary at exit')
     subparsers = parser.add_subparsers(
         dest='command',
         help='Sub-commands'
@@ -138,27 +202,83 @@ def main() -> None:
 
     # Create subparser for Feature Data Collection
     parser_F = subparsers.add_parser(name='F', help='Feature Data Collection Process')
-    parser_F.add_argument('--port', required=True, type=int, help='comport number')
-    parser_F.add_argument('--baud', default=115200, choices=(9600, 115200), type=int, help='baudrate (default: %(default)s)')
+    parser_F.add_argument('--port', required=True, type=str, help='comport number, device path or pySerial URL (e.g. socket://localhost:7777)')
+    parser_F.add_argument('--baud', default=115200, choices=(9600, 115200, 230400, 460800, 921600, 2000000), type=int, help='baudrate (default: %(default)s)')
     parser_F.add_argument('--reps', default=2, type=int, help='number of reptitions to record (default: %(default)s)')
+    parser_F.add_argument('--uncompressed', action='store_true', help='create the table with the default (unchunked, uncompressed) layout')
     parser_F.set_defaults(func=run)
     
     # Create subparser for Feature Data Distribution Visualisation
     parser_V = subparsers.add_parser(name='V', help='Feature Data Distribution Visualisation Process')
+    parser_V.add_argument('--headless', action='store_true', help='only save the figures, without showing them')
+    parser_V.add_argument('--sessions', action='store_true', help='also save the figures of each session')
+    parser_V.add_argument('--out', default='.', type=str, help='output directory for the figures (default: %(default)s)')
     parser_V.set_defaults(func=run)
 
     # Create subparser for Classification
     parser_C = subparsers.add_parser(name='C', help='Classification Process')
     parser_C.add_argument("--splt", default=20, type=int, choices=range(10, 51, 1), help='percentage test split to use (min: 10, max: 50, step: 1 | default: %(default)s)')
+    parser_C.add_argument("--search", default='parallel', choices=('grid', 'parallel', 'halving'), type=str, help='hyperparameter search mode (default: %(default)s)')
+    parser_C.add_argument("--latency", default=None, type=float, help='single-sample predict latency budget of the final model [ms], selects the cheapest model within --tolerance')
+    parser_C.add_argument("--size", default=None, type=float, help='model size budget of the final model [kB]')
+    parser_C.add_argument("--tolerance", default=None, type=float, help='recall tolerance below the best model for --latency/--size (default: one standard deviation)')
+    parser_C.add_argument("--loso", action='store_true', help='leave-one-session-out evaluation of the exported model configuration (SVC if there is none) instead')
+    parser_C.add_argument("--folds", default=None, type=int, help='GroupKFold folds over sessions for --loso (default: one fold per session)')
+    parser_C.add_argument("--features", default='sequential', choices=('sequential', 'exhaustive'), type=str,
+                          help='feature selection: SequentialFeatureSelector search, or every subset ranked with LDA/GNB/CNB then the best cross-validated with SVC (default: %(default)s)')
+    parser_C.add_argument("--topk", default=None, type=int, help='prune the wrapper feature search to the K best features of the filter ranking (MI, ANOVA F, Fisher, ReliefF)')
+    parser_C.add_argument("--nocache", action='store_true', help='evaluate every candidate again instead of reusing results from the CV result cache')
+    parser_C.add_argument("--stream", action='store_true', help='stream the tables in blocks and fit incremental models (SGD, NB) instead, for files larger than memory')
+    parser_C.add_argument("--block", default=16384, type=int, help='rows per block for --stream (default: %(default)s)')
+    parser_C.add_argument("--epochs", default=5, type=int, help='passes over the training rows for the SGD models of --stream (default: %(default)s)')
     parser_C.set_defaults(func=run)
 
+    # Create subparser for Incremental Model Update
+    parser_U = subparsers.add_parser(name='U', help='Fold newly recorded sessions into the exported model without retraining (exact for ComplementNB and KNN, approximate for SVC)')
+    parser_U.add_argument('--sessions', default=None, nargs='+', type=int, help='table numbers to fold in (default: tables the model was not trained on)')
+    parser_U.add_argument('--out', default=None, type=str, help='updated model file (default: overwrite %s)' % model_filename)
+    parser_U.set_defaults(func=run)
+
     # Create subparser for Raw Data Collection
     parser_R = subparsers.add_parser(name='R', help='Raw Data Collection Process')
-    parser_R.add_argument('--port', required=True, type=int, help='comport number')
-    parser_R.add_argument('--baud', default=115200, choices=(9600, 115200), type=int, help='baudrate (default: %(default)s)')
+    parser_R.add_argument('--port', required=True, type=str, help='comport number, device path or pySerial URL (e.g. socket://localhost:7777)')
+    parser_R.add_argument('--baud', default=115200, choices=(9600, 115200, 230400, 460800, 921600, 2000000), type=int, help='baudrate (default: %(default)s)')
     parser_R.add_argument('--reps', default=1, type=int, help='number of reptitions to record (default: %(default)s)')
+    parser_R.add_argument('--excel', action='store_true', help='also export the session to Raw_Data.xlsx')
     parser_R.set_defaults(func=run)
 
+    # Create subparser for Raw Data Excel Export
+    parser_X = subparsers.add_parser(name='X', help='Export a raw data session to Raw_Data.xlsx')
+    parser_X.add_argument('--session', default=None, type=int, help='session number (default: latest session)')
+    parser_X.set_defaults(func=run)
+
+    # Create subparser for Migration
+    parser_M = subparsers.add_parser(name='M', help='Rewrite a .h5 file into the chunked, compressed layout with a session catalogue')
+    parser_M.add_argument('--file', default=None, type=str, help='.h5 file to migrate (default: %s)' % os.path.basename(p=hdfFile))
+    parser_M.set_defaults(func=run)
+
+    # Create subparser for Benchmarks
+    parser_B = subparsers.add_parser(name='B', help='Benchmark the hot paths with synthetic data, or the .h5 storage layouts')
+    parser_B.add_argument('--rows', default=[100, 500, 10000, 100000], nargs='+', type=int, help='dataset sizes for the suite (default: %(default)s)')
+    parser_B.add_argument('--out', default='Benchmark_Results.json', type=str, help='results file the suite run is appended to (default: %(default)s)')
+    parser_B.add_argument('--storage', action='store_true', help='run the storage benchmark using the rows of the .h5 file instead')
+    parser_B.add_argument('--sessions', default=[10, 100, 1000], nargs='+', type=int, help='numbers of sessions for the storage benchmark (default: %(default)s)')
+    parser_B.add_argument('--reps', default=20, type=int, help='repetitions per gesture in each session for the storage benchmark (default: %(default)s)')
+    parser_B.set_defaults(func=run)
+
+    # Create subparser for Serial Emulator
+    parser_E = subparsers.add_parser(name='E', help='Emulate fdcReceiver.ino or rdcReceiver.ino on a pty or socket, connect F or R to the printed port')
+    parser_E.add_argument('--mode', default='feature', choices=('feature', 'raw'), type=str, help='byte stream to send (default: %(default)s)')
+    parser_E.add_argument('--transport', default='pty', choices=('pty', 'socket'), type=str, help='virtual link (default: %(default)s)')
+    parser_E.add_argument('--reps', default=2, type=int, help='repetitions per gesture, match --reps of F or R (default: %(default)s)')
+    parser_E.add_argument('--rate', default=0.2, type=float, help='repetitions per second, 0 is unthrottled (default: %(default)s)')
+    parser_E.add_argument('--jitter', default=0.0, type=float, help='send interval standard deviation as a fraction of the interval (default: %(default)s)')
+    parser_E.add_argument('--corruption', default=0.0, type=float, help='probability of corrupting a repetition (default: %(default)s)')
+    parser_E.add_argument('--loop', action='store_true', help='replay the session until interrupted')
+    parser_E.add_argument('--file', default=None, type=str, help='recorded .h5 file to replay (default: synthetic data)')
+    parser_E.add_argument('--tcp_port', default=7777, type=int, help='TCP port of the socket transport (default: %(default)s)')
+    parser_E.set_defaults(func=run)
+
     # Create subparser for Listing
     parser_list = subparsers.add_parser(name='LIST', help='List available ports and .h5 file structure.')
     parser_list.set_defaults(func=run)
@@ -166,7 +286,11 @@ def main() -> None:
     # Parse args
     args = parser.parse_args()
     if args.command is not None:
-        args.func(parser, args)
+        Instrumentation.enabled = args.timings or args.metrics is not None
+        if Instrumentation.enabled:
+            atexit.register(report_metrics, metricsFile=args.metrics, show=args.timings)
+        with Instrumentation.span(name='command_' + args.command):
+            args.func(parser, args)
     else:
         parser.print_help()
 
@@ -0,0 +1,11 @@
+# PYTEST CONFIGURATION
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: The scripts import each other as top-level modules, so Python_Scripts is put on the import path
+
+
+import os
+import sys
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,55 @@
+# FEATURECOLLECTION.PY PACKET VALIDATION AND DECODING TESTS
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+
+
+import numpy as np
+from config import NUM_CHANNELS
+from FeatureCollection import validSets, PacketDecoder, packet_dtype
+from FeatureExtraction import extractFeatures
+from Tools.Synthetic import syntheticEMG, session_labels, featurePackets
+
+
+def packet_stream(flat: bool = False) -> bytes:
+    """
+    Feature packets of one synthetic session, the first repetition with a flat channel 1 window if flat
+
+    : rtype: bytes
+    """
+
+    data = syntheticEMG(labels=session_labels(repetitions=2), rng=np.random.default_rng(seed=0))
+    if flat:
+        data[0, 1] = 2.0  # disconnected electrode
+    features = extractFeatures(data=data)
+    features[..., 5] = features[..., 1] ** 2 - features[..., 0] ** 2  # activity identity checked by validSets
+
+    return featurePackets(features=features)
+
+
+def test_flat_window_is_valid():
+    packets = np.frombuffer(buffer=packet_stream(flat=True), dtype=packet_dtype)
+
+    assert np.isnan(packets['hj_m'][1]) and np.isnan(packets['hj_c'][1]) and packets['hj_a'][1] == 0
+    assert validSets(packets=packets).all()
+
+
+def test_nan_is_rejected_outside_flat_windows():
+    for feature in ('mav', 'rms', 'wl', 'hj_m', 'hj_c'):
+        packets = np.frombuffer(buffer=packet_stream(), dtype=packet_dtype).copy()
+        packets[feature][2] = np.nan
+        valid = validSets(packets=packets)
+        assert not valid[1] and valid[0] and valid[2:].all(), feature
+
+
+def test_decoder_keeps_flat_sets_and_resyncs():
+    stream = packet_stream(flat=True)
+    set_size = PacketDecoder.set_size
+    corrupted = stream[:3 * set_size] + b'\x07' + stream[3 * set_size:]
+    decoder = PacketDecoder()
+    buffer = bytearray(corrupted)
+    packets, numbers = decoder.decode(buffer=buffer)
+
+    assert packets.shape[0] == len(stream) // set_size * NUM_CHANNELS
+    assert numbers.tolist() == list(range(0, len(stream) // set_size, 1))
+    assert decoder.corrupted_sets == 1 and decoder.bytes_discarded == 1 and decoder.lost_sets == 0
+    assert not buffer
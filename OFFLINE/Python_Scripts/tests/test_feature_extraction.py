@@ -0,0 +1,172 @@
+# FEATUREEXTRACTION.PY PARITY TESTS AGAINST THE FDCRECEIVER.INO EXTRACT() FUNCTION
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: firmware_extract is a loop-by-loop transcription of extract(), with IEEE division so flat windows give nan as on the Teensy
+
+
+import numpy as np
+import pytest
+from config import BUFFER_RAW_SIZE, WINDOW, TONE_ON, START_CUT_ERROR, BUFFER_CUT_SIZE, ZERO_OFFSET, WILLISON_THRESHOLD, extracted_features
+from FeatureExtraction import extractFeatures, featureRows
+
+
+def firmware_extract(data: np.ndarray, smoothing: bool) -> list:
+    """
+    Features of one channel buffer computed as fdcReceiver.ino extract()
+
+    : rtype: list
+    """
+
+    data = [float(v) for v in data]
+    buffer_size = BUFFER_RAW_SIZE
+
+    if smoothing:
+        buffer_smooth = [0.0] * buffer_size
+        for i in range(0, buffer_size - WINDOW, 1):
+            mean = 0.0
+            for j in range(0, WINDOW, 1):
+                mean += data[i + j]
+            mean /= WINDOW
+            buffer_smooth[i] = mean
+        data = buffer_smooth
+        buffer_size = BUFFER_RAW_SIZE - WINDOW
+
+    buffer_cut = [0.0] * BUFFER_CUT_SIZE
+    for i in range(0, BUFFER_CUT_SIZE, 1):
+        buffer_cut[i] = data[(TONE_ON - START_CUT_ERROR) + i]
+    data = buffer_cut
+    buffer_size = BUFFER_CUT_SIZE
+
+    mean_absolute_value = 0.0
+    for i in range(0, buffer_size, 1):
+        mean_absolute_value += data[i]
+    mean_absolute_value /= buffer_size
+
+    squared_mean = 0.0
+    for i in range(0, buffer_size, 1):
+        squared_mean += data[i] ** 2
+    root_mean_square = np.sqrt(squared_mean / buffer_size)
+
+    waveform_length = 0.0
+    for i in range(0, buffer_size - 1, 1):
+        waveform_length += abs(data[i + 1] - data[i])
+
+    zero_crossings = 0
+    for i in range(0, buffer_size - 1, 1):
+        if data[i] >= ZERO_OFFSET and data[i + 1] < ZERO_OFFSET:
+            zero_crossings += 1
+        if data[i] < ZERO_OFFSET and data[i + 1] >= ZERO_OFFSET:
+            zero_crossings += 1
+
+    willison_amplitude = 0
+    for i in range(0, buffer_size - 1, 1):
+        if abs(data[i] - data[i + 1]) >= WILLISON_THRESHOLD:
+            willison_amplitude += 1
+
+    var_zero = 0.0
+    for i in range(0, buffer_size, 1):
+        var_zero += (data[i] - mean_absolute_value) ** 2
+    var_zero /= buffer_size
+    activity = var_zero
+
+    df_one = [0.0] * buffer_size
+    for i in range(0, buffer_size - 1, 1):
+        df_one[i] = data[i + 1] - data[i]
+    mav_one = 0.0
+    for i in range(0, buffer_size, 1):
+        mav_one += df_one[i]
+    mav_one /= buffer_size
+    var_one = 0.0
+    for i in range(0, buffer_size, 1):
+        var_one += (df_one[i] - mav_one) ** 2
+    var_one /= (buffer_size - 1)
+
+    df_two = [0.0] * buffer_size
+    for i in range(0, buffer_size - 1, 1):
+        df_two[i] = df_one[i + 1] - df_one[i]
+    mav_two = 0.0
+    for i in range(0, buffer_size, 1):
+        mav_two += df_two[i]
+    mav_two /= buffer_size
+    var_two = 0.0
+    for i in range(0, buffer_size, 1):
+        var_two += (df_two[i] - mav_two) ** 2
+    var_two /= (buffer_size - 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mobility = np.sqrt(np.float64(var_one) / np.float64(var_zero))
+        complexity = np.sqrt(np.float64(var_two) / np.float64(var_one)) / mobility
+
+    return [mean_absolute_value, root_mean_square, waveform_length, zero_crossings, willison_amplitude, activity, mobility, complexity]
+
+
+def emg_windows(windows: int, seed: int = 0) -> np.ndarray:
+    """
+    Noisy windows around the zero offset with a burst in the gesture range, so every feature is non-trivial
+
+    : rtype: np.ndarray
+    """
+
+    rng = np.random.default_rng(seed=seed)
+    data = ZERO_OFFSET + 0.02 * rng.standard_normal(size=(windows, 2, BUFFER_RAW_SIZE))
+    data[..., TONE_ON:TONE_ON + 100] += 0.3 * rng.standard_normal(size=(windows, 2, 100))
+
+    return data
+
+
+@pytest.mark.parametrize('smoothing', [True, False])
+def test_matches_firmware(smoothing):
+    data = emg_windows(windows=4)
+    features = extractFeatures(data=data, smoothing=smoothing)
+
+    assert features.shape == (4, 2, len(extracted_features))
+    for w in range(0, data.shape[0], 1):
+        for cha in range(0, data.shape[1], 1):
+            expected = firmware_extract(data=data[w, cha], smoothing=smoothing)
+            np.testing.assert_allclose(features[w, cha], expected, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize('smoothing', [True, False])
+def test_only_cut_window_is_used(smoothing):
+    data = emg_windows(windows=1, seed=1)
+    start = TONE_ON - START_CUT_ERROR
+    if smoothing:  # the smoothed sample i averages raw samples i to i + WINDOW - 1
+        first, last = start, start + BUFFER_CUT_SIZE + WINDOW - 1
+    else:
+        first, last = start, start + BUFFER_CUT_SIZE
+    changed = data.copy()
+    changed[..., :first] = 3.0
+    changed[..., last:] = 0.0
+
+    # Smoothing uses a running sum over the whole buffer, so samples outside the window change the rounding only
+    np.testing.assert_allclose(extractFeatures(data=changed, smoothing=smoothing), extractFeatures(data=data, smoothing=smoothing), rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(extractFeatures(data=changed, smoothing=smoothing)[0, 0], firmware_extract(data=changed[0, 0], smoothing=smoothing), rtol=1e-9, atol=1e-12)
+
+
+def test_short_buffer_is_rejected():
+    with pytest.raises(ValueError):
+        extractFeatures(data=np.zeros(shape=(1, 2, TONE_ON - START_CUT_ERROR + BUFFER_CUT_SIZE - 1)), smoothing=False)
+
+
+@pytest.mark.parametrize('smoothing', [True, False])
+def test_flat_window_gives_nan_hjorth(smoothing):
+    data = np.full(shape=(1, 2, BUFFER_RAW_SIZE), fill_value=2.0)  # exactly representable, so the activity is exactly 0
+    data[0, 1] = 0.5  # one channel above, one below the zero offset
+    features = extractFeatures(data=data, smoothing=smoothing)
+
+    for cha in range(0, 2, 1):
+        expected = firmware_extract(data=data[0, cha], smoothing=smoothing)
+        assert np.isnan(expected[6]) and np.isnan(expected[7])
+        np.testing.assert_allclose(features[0, cha], expected, rtol=1e-9, atol=1e-12)  # nan positions must match too
+        assert features[0, cha, 3] == 0 and features[0, cha, 4] == 0 and features[0, cha, 5] == 0
+
+
+def test_feature_rows_keep_channels_apart():
+    features = extractFeatures(data=emg_windows(windows=3, seed=2))
+    rows = featureRows(features=features, labels=[0, 1, 2], timestamps=7)
+
+    assert rows['label'].tolist() == [0, 1, 2]
+    assert (rows['timestamp'] == 7).all()
+    for cha in range(0, 2, 1):
+        for f, feature in enumerate(extracted_features):
+            np.testing.assert_array_equal(rows['ch' + str(object=cha) + '_' + feature], features[:, cha, f].astype(rows.dtype['ch0_' + feature]))
@@ -0,0 +1,65 @@
+# FEATURERANKING.PY TESTS AGAINST SKLEARN AND ON KNOWN INFORMATIVE FEATURES
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: The signal features shift with the label (strongly on channel 1, weakly on channel 0), the noise features do not
+
+
+import numpy as np
+import pytest
+from sklearn.feature_selection import f_classif, mutual_info_classif
+from FeatureRanking import rankFeatures, top_features, random_state
+
+
+feature_names = ['ch0_noise', 'ch0_signal', 'ch1_noise', 'ch1_signal']
+
+
+def labelled_data(rows: int = 600, seed: int = 0) -> tuple:
+    """
+    Noise and signal features of 3 classes, in feature_names order
+
+    : rtype: tuple
+    """
+
+    rng = np.random.default_rng(seed=seed)
+    y = rng.integers(low=0, high=3, size=rows)
+    X = rng.standard_normal(size=(rows, 4))
+    X[:, 1] += 0.5 * y
+    X[:, 3] += 3.0 * y
+
+    return X, y
+
+
+def test_scores_match_sklearn():
+    X, y = labelled_data()
+    table = rankFeatures(X=X, y=y, feature_names=feature_names).set_index('feature').loc[feature_names]
+
+    f, _ = f_classif(X, y)
+    np.testing.assert_allclose(table['anova'], f, rtol=1e-10)
+    np.testing.assert_allclose(table['mi'], mutual_info_classif(X, y, random_state=random_state), rtol=1e-10)
+    classes = np.unique(y)
+    between = sum((y == c).sum() * (X[y == c].mean(axis=0) - X.mean(axis=0)) ** 2 for c in classes)
+    within = sum((y == c).sum() * X[y == c].var(axis=0) for c in classes)
+    np.testing.assert_allclose(table['fisher'], between / within, rtol=1e-10)
+
+
+@pytest.mark.parametrize('method', ['mi', 'anova', 'fisher', 'relieff'])
+def test_signal_ranks_above_noise(method):
+    X, y = labelled_data()
+    table = rankFeatures(X=X, y=y, feature_names=feature_names).set_index('feature')
+
+    assert table.loc['ch1_signal', method + '_rank'] == 1
+    assert table.loc['ch0_signal', method + '_rank'] == 2
+    assert table.loc['ch0_signal', method] > max(table.loc['ch0_noise', method], table.loc['ch1_noise', method])
+
+
+def test_ranking_and_top_features():
+    X, y = labelled_data()
+    table = rankFeatures(X=X, y=y, feature_names=feature_names)
+
+    assert table['feature'].tolist()[:2] == ['ch1_signal', 'ch0_signal']  # best first
+    assert table['rank'].tolist()[:2] == [1, 2]
+    assert table.set_index('type')['type_rank'].to_dict() == {'signal': 1, 'noise': 2}
+    assert set(table.attrs['timings']) == {'statistics', 'mi', 'anova', 'fisher', 'relieff'}
+    assert top_features(table=table, k=1, feature_names=feature_names) == ['ch1_signal']
+    assert top_features(table=table, k=2, feature_names=feature_names) == ['ch0_signal', 'ch1_signal']  # feature_names order
+    assert top_features(table=table, k=4, feature_names=feature_names) == feature_names
@@ -0,0 +1,38 @@
+# INFERENCEENGINE.PY TESTS AGAINST THE SKLEARN PREDICTIONS
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Random 5 class data, so many samples are tied in the one-vs-one vote and break_ties changes the predictions
+
+
+import numpy as np
+import pytest
+from sklearn.svm import SVC
+from InferenceEngine import compileEstimator
+
+
+def random_data(rows: int, seed: int = 0) -> tuple:
+    """
+    Uniform features and random labels of 5 classes
+
+    : rtype: tuple
+    """
+
+    rng = np.random.default_rng(seed=seed)
+
+    return rng.random(size=(rows, 6)), rng.integers(low=0, high=5, size=rows)
+
+
+@pytest.mark.parametrize('kernel', ['linear', 'rbf', 'poly'])
+@pytest.mark.parametrize('break_ties', [False, True])
+def test_svc_matches_sklearn(kernel, break_ties):
+    X, y = random_data(rows=400)
+    Z, _ = random_data(rows=2000, seed=1)
+    estimator = SVC(kernel=kernel, C=0.5, break_ties=break_ties).fit(X, y)
+
+    np.testing.assert_array_equal(compileEstimator(estimator=estimator).predict(Z=Z), estimator.predict(Z))
+
+
+def test_svc_break_ties_ovo_is_rejected():
+    X, y = random_data(rows=100)
+    with pytest.raises(ValueError):
+        compileEstimator(estimator=SVC(break_ties=True, decision_function_shape='ovo').fit(X, y))
@@ -0,0 +1,186 @@
+# MODELSEARCH.PY TESTS AGAINST GRIDSEARCHCV AND CROSS-VALIDATION
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Small 3 class data, so the searches run in a few seconds
+
+
+import sklearn
+import numpy as np
+import pytest
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.datasets import make_classification
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, cross_validate
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.svm import SVC
+from ModelSearch import dedupe_candidates, HalvingSearchCV, CachedGridSearchCV, ResultCache, run_cached
+
+
+scoring = ['recall_micro', 'precision_micro']
+
+
+def classification_data(rows: int = 300, seed: int = 0) -> tuple:
+    """
+    Features in [0, 1] of 3 classes
+
+    : rtype: tuple
+    """
+
+    X, y = make_classification(n_samples=rows, n_features=4, n_informative=3, n_redundant=0, n_classes=3, random_state=seed)
+    X = (X - X.min(axis=0)) / (X.max(axis=0) - X.min(axis=0))
+
+    return X, y
+
+
+def test_dedupe_collapses_equivalent_knn_and_svc():
+    param_grid = [{'classifier': [KNeighborsClassifier()],
+                   'classifier__n_neighbors': [1, 3],
+                   'classifier__algorithm': ['auto', 'ball_tree', 'kd_tree', 'brute'],
+                   'classifier__leaf_size': [10, 30]},
+                  {'classifier': [SVC()],
+                   'classifier__kernel': ['linear', 'rbf'],
+                   'classifier__gamma': ['scale', 1e-3],
+                   'classifier__decision_function_shape': ['ovr', 'ovo']}]
+    candidates, group_sizes = dedupe_candidates(param_grid=param_grid)
+
+    knn = [c for c in candidates if isinstance(c['classifier'], KNeighborsClassifier)]
+    svc = [c for c in candidates if isinstance(c['classifier'], SVC)]
+    assert sorted(c['classifier__n_neighbors'] for c in knn) == [1, 3]  # algorithm and leaf_size never change the predictions
+    assert sorted((c['classifier__kernel'], str(c['classifier__gamma'])) for c in svc) == [('linear', 'scale'), ('rbf', '0.001'), ('rbf', 'scale')]
+    assert sum(group_sizes) == 16 + 8
+    assert sorted(group_sizes) == [2, 2, 4, 8, 8]
+
+
+def test_halving_last_round_gives_full_fold_results():
+    X, y = classification_data()
+    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=0)
+    estimator = Pipeline(steps=[('classifier', SVC())])
+    param_grid = [{'classifier': [KNeighborsClassifier()], 'classifier__n_neighbors': [1, 3, 5, 7, 9, 11, 13, 15, 17],
+                   'classifier__algorithm': ['auto', 'brute']},
+                  {'classifier': [SVC()], 'classifier__C': [0.1, 1.0, 10.0, 100.0], 'classifier__kernel': ['rbf', 'linear']}]
+    seen = []
+
+    def refit(cv_results) -> int:
+        seen.append(cv_results)
+        return int(np.argmax(cv_results['mean_test_recall_micro']))
+
+    search = HalvingSearchCV(estimator=estimator, param_grid=param_grid, scoring=scoring, refit=refit, cv=cv, n_jobs=1).fit(X, y)
+
+    assert search.n_candidates_ == 26 and search.n_unique_candidates_ == 17
+    assert len(search.history_) > 1
+    last = search.history_[-1]
+    assert last['n_folds'] == 5 and last['n_samples'] == 240  # every fold, all training samples
+    assert len(seen) == 1 and len(seen[0]['params']) == last['n_candidates']
+    for index, params in enumerate(seen[0]['params']):
+        expected = cross_validate(estimator=clone(estimator).set_params(**params), X=X, y=y, cv=cv, scoring=scoring)
+        for name in scoring:
+            np.testing.assert_allclose([seen[0][f"split{i}_test_{name}"][index] for i in range(0, 5, 1)], expected[f"test_{name}"])
+    assert search.best_params_ is seen[0]['params'][search.best_index_]
+
+
+def cached_search(cacheFile: str, X, y, cv, param_grid: dict = None, scores: list = scoring) -> tuple:
+    """
+    Fit a CachedGridSearchCV of SVC candidates with a new ResultCache on cacheFile
+
+    : rtype: tuple(ResultCache, dict)
+    """
+
+    cache = ResultCache(cacheFile=cacheFile)
+    param_grid = param_grid if param_grid is not None else {'classifier__C': [0.1, 1.0], 'classifier__kernel': ['rbf', 'linear']}
+    search = CachedGridSearchCV(estimator=Pipeline(steps=[('classifier', SVC())]), param_grid=param_grid, scoring=scores,
+                                refit=lambda cv_results: 0, cv=cv, n_jobs=1, cache=cache)
+
+    return cache, search.fit(X, y).cv_results_
+
+
+def test_run_cached_round_trip(tmp_path):
+    cacheFile = str(tmp_path / 'CV_Cache.sqlite')
+    calls = []
+
+    def task(n):
+        calls.append(n)
+        return {'score': n / 10.0, 'array': np.arange(n)}
+
+    tasks = [(ResultCache.key('task', n), delayed(task)(n)) for n in [1, 2, 2, 3]]
+    first = run_cached(parallel=Parallel(n_jobs=1), tasks=tasks, cache=ResultCache(cacheFile=cacheFile))
+    assert sorted(calls) == [1, 2, 3]  # the repeated key runs once
+
+    cache = ResultCache(cacheFile=cacheFile)  # new instance, same file
+    second = run_cached(parallel=Parallel(n_jobs=1), tasks=tasks, cache=cache)
+    assert sorted(calls) == [1, 2, 3] and cache.hits == 3 and cache.misses == 0
+    for a, b in zip(first, second):
+        assert a['score'] == b['score']
+        np.testing.assert_array_equal(a['array'], b['array'])
+
+
+def test_search_cache_hits_and_invalidation(tmp_path, monkeypatch):
+    cacheFile = str(tmp_path / 'CV_Cache.sqlite')
+    X, y = classification_data(rows=120)
+    cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=0)
+    pairs = 4 * 3
+
+    first, first_results = cached_search(cacheFile=cacheFile, X=X, y=y, cv=cv)
+    assert first.hits == 0 and first.misses == pairs
+    again, again_results = cached_search(cacheFile=cacheFile, X=X, y=y, cv=cv)
+    assert again.hits == pairs and again.misses == 0
+    for key in first_results:
+        if key.startswith(('mean_test', 'split')):
+            np.testing.assert_array_equal(again_results[key], first_results[key])
+
+    # Data: one changed value is in the train or test rows of every fold
+    changed = X.copy()
+    changed[0, 0] += 1e-6
+    assert cached_search(cacheFile=cacheFile, X=changed, y=y, cv=cv)[0].misses == pairs
+    relabelled = y.copy()
+    relabelled[0] = (relabelled[0] + 1) % 3
+    assert cached_search(cacheFile=cacheFile, X=X, y=relabelled, cv=cv)[0].misses == pairs
+
+    # Folds
+    assert cached_search(cacheFile=cacheFile, X=X, y=y, cv=StratifiedKFold(n_splits=3, shuffle=True, random_state=1))[0].misses == pairs
+
+    # Parameters: only the new candidates are evaluated
+    cache, _ = cached_search(cacheFile=cacheFile, X=X, y=y, cv=cv, param_grid={'classifier__C': [1.0, 10.0], 'classifier__kernel': ['rbf', 'linear']})
+    assert cache.hits == 2 * 3 and cache.misses == 2 * 3
+
+    # Scorers
+    assert cached_search(cacheFile=cacheFile, X=X, y=y, cv=cv, scores=scoring + ['accuracy'])[0].misses == pairs
+
+    # sklearn version
+    monkeypatch.setattr(sklearn, '__version__', '0.0.0')
+    assert cached_search(cacheFile=cacheFile, X=X, y=y, cv=cv)[0].misses == pairs
+
+
+def tied_data(rows: int = 150, seed: int = 0) -> tuple:
+    """
+    Features rounded to one decimal, so there are duplicate rows and equal neighbour distances
+
+    : rtype: tuple
+    """
+
+    X, y = classification_data(rows=rows, seed=seed)
+
+    return np.round(X, decimals=1), y
+
+
+@pytest.mark.parametrize('param_grid', [{'classifier': [KNeighborsClassifier()],
+                                         'classifier__n_neighbors': [1, 2, 3, 4, 5, 8, 15],
+                                         'classifier__weights': ['uniform', 'distance'],
+                                         'classifier__algorithm': ['auto', 'ball_tree', 'kd_tree', 'brute'],
+                                         'classifier__p': [1, 2]},
+                                        {'classifier': [SVC()],
+                                         'classifier__C': [0.1, 1.0, 100.0],
+                                         'classifier__kernel': ['rbf', 'linear', 'poly'],
+                                         'classifier__gamma': ['scale', 0.5],
+                                         'classifier__decision_function_shape': ['ovr', 'ovo']}], ids=['knn', 'svc'])
+def test_shared_search_matches_gridsearchcv_on_ties(param_grid):
+    X, y = tied_data()
+    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=0)
+    estimator = Pipeline(steps=[('classifier', SVC())])
+    shared = CachedGridSearchCV(estimator=estimator, param_grid=param_grid, scoring=scoring, refit=lambda cv_results: 0, cv=cv, n_jobs=1).fit(X, y)
+    expected = GridSearchCV(estimator=estimator, param_grid=param_grid, scoring=scoring, refit=False, cv=cv).fit(X, y)
+
+    for name in scoring:
+        np.testing.assert_array_equal(shared.cv_results_[f"mean_test_{name}"], expected.cv_results_[f"mean_test_{name}"])
+        for i in range(0, 5, 1):
+            np.testing.assert_array_equal(shared.cv_results_[f"split{i}_test_{name}"], expected.cv_results_[f"split{i}_test_{name}"])
@@ -0,0 +1,62 @@
+# MODELUPDATE.PY TESTS AGAINST A FULL REFIT
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: The model is trained on the first synthetic session and updated with the other two, which widen the scaler range
+
+
+import numpy as np
+import pytest
+import tables as tb
+from sklearn.base import clone
+from sklearn.naive_bayes import ComplementNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import MinMaxScaler
+from config import feature_names, gesture_names
+from Dataset import readFeatures, list_table_nums
+from ModelExport import exportModel
+from ModelUpdate import updateModel
+from Tools.Synthetic import syntheticFeatureFile
+
+
+selected_features = ['ch0_mav', 'ch0_rms', 'ch0_wl', 'ch1_mav', 'ch1_rms', 'ch1_wl']
+
+
+def session_arrays(hdfFile: str, table_nums: list = None) -> tuple:
+    """
+    Feature matrix (stored precision) and labels of the given sessions
+
+    : rtype: tuple
+    """
+
+    with tb.open_file(filename=hdfFile, mode='r') as h5file:
+        rows = readFeatures(h5file=h5file, fields=['label'] + feature_names, table_nums=table_nums)
+
+    return np.column_stack([rows[f] for f in feature_names]), rows['label']
+
+
+@pytest.mark.parametrize('estimator', [ComplementNB(), KNeighborsClassifier(n_neighbors=5), KNeighborsClassifier(n_neighbors=3, weights='distance')],
+                         ids=['cnb', 'knn_uniform', 'knn_distance'])
+def test_update_matches_full_refit(tmp_path, estimator):
+    hdfFile = str(tmp_path / 'Feature_Data.h5')
+    modelFile = str(tmp_path / 'Gesture_Model.pkl')
+    syntheticFeatureFile(hdfFile=hdfFile, sessions=3, repetitions=5)
+    with tb.open_file(filename=hdfFile, mode='r') as h5file:
+        first = list_table_nums(h5file=h5file)[:1]
+    X_old, y_old = session_arrays(hdfFile=hdfFile, table_nums=first)
+    scaler = MinMaxScaler().fit(X=X_old)
+    indexes = [feature_names.index(f) for f in selected_features]
+    model = clone(estimator=estimator).fit(X=scaler.transform(X=X_old)[:, indexes], y=y_old)
+    exportModel(modelFile=modelFile, scaler=scaler, feature_names=feature_names, selected_features=selected_features, model=model,
+                gesture_map={int(g): gesture_names[g] for g in np.unique(y_old)}, sessions=first)
+
+    updated = updateModel(hdfFile=hdfFile, modelFile=modelFile)
+
+    X_all, y_all = session_arrays(hdfFile=hdfFile)
+    with tb.open_file(filename=hdfFile, mode='r') as h5file:
+        assert updated.sessions == list_table_nums(h5file=h5file)
+    assert (updated.data_min < scaler.data_min_).any() or (updated.data_max > scaler.data_max_).any()  # the range was widened
+    Z_all = updated.transform(X=X_all)
+    refit = clone(estimator=estimator).fit(X=Z_all, y=y_all)
+    np.testing.assert_array_equal(updated.predict(X=X_all), refit.predict(Z_all))
+    if isinstance(estimator, ComplementNB):
+        np.testing.assert_allclose(updated.model.feature_count_, refit.feature_count_, rtol=1e-5)
@@ -0,0 +1,78 @@
+# OUTOFCORE.PY TESTS OF THE STREAMED HOLDOUT AGAINST SKLEARN
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Small blocks, so sessions are split across blocks and blocks span sessions
+
+
+import numpy as np
+import pytest
+import tables as tb
+from sklearn.metrics import accuracy_score, precision_score, recall_score
+from sklearn.naive_bayes import GaussianNB
+from sklearn.preprocessing import MinMaxScaler
+from Dataset import readFeatures, list_table_nums
+from OutOfCore import holdout_split, stream_blocks, holdout_metrics
+from Tools.Synthetic import syntheticFeatureFile
+
+
+@pytest.fixture(scope='module')
+def feature_file(tmp_path_factory):
+    hdfFile = str(tmp_path_factory.mktemp('out_of_core') / 'Feature_Data.h5')
+    syntheticFeatureFile(hdfFile=hdfFile, sessions=3, repetitions=8)
+
+    return hdfFile
+
+
+def test_holdout_split_is_disjoint_and_deterministic(feature_file):
+    with tb.open_file(filename=feature_file, mode='r') as h5file:
+        table_nums = list_table_nums(h5file=h5file)
+        splits, classes, counts = holdout_split(h5file=h5file, table_nums=table_nums, test_split=0.25, labels=[0, 1, 2])
+        again, _, _ = holdout_split(h5file=h5file, table_nums=table_nums, test_split=0.25, labels=[0, 1, 2])
+        label = {num: readFeatures(h5file=h5file, fields=['label'], table_nums=[num])['label'] for num in table_nums}
+
+    assert classes.tolist() == [0, 1, 2]
+    held = {l: 0 for l in classes.tolist()}
+    for num in table_nums:
+        train, holdout = (np.unpackbits(bits)[:label[num].shape[0]].astype(bool) for bits in splits[num])
+        assert not (train & holdout).any()
+        np.testing.assert_array_equal(train | holdout, np.isin(label[num], classes))  # every row of the selected labels, no other
+        for bits, same in zip(splits[num], again[num]):
+            np.testing.assert_array_equal(bits, same)
+        for l in held:
+            held[l] += int((holdout & (label[num] == l)).sum())
+    for l, (n_train, n_holdout) in counts.items():
+        assert n_holdout == held[l] == round(0.25 * (n_train + n_holdout))
+
+
+@pytest.mark.parametrize('labels', [None, [0, 2, 3]])
+def test_streamed_metrics_match_sklearn(feature_file, labels):
+    with tb.open_file(filename=feature_file, mode='r') as h5file:
+        splits, classes, _ = holdout_split(h5file=h5file, table_nums=list_table_nums(h5file=h5file), test_split=0.3, labels=labels)
+        train = list(stream_blocks(h5file=h5file, splits=splits, which=0, block_rows=7))
+        holdout = list(stream_blocks(h5file=h5file, splits=splits, which=1, block_rows=7))
+    X_train, y_train = np.vstack([X for X, _ in train]), np.concatenate([y for _, y in train])
+    scaler = MinMaxScaler().fit(X=X_train)
+    estimator = GaussianNB().fit(X=scaler.transform(X=X_train)[:, :2], y=y_train)  # two features, so the predictions are imperfect
+
+    confusion = np.zeros(shape=(classes.shape[0], classes.shape[0]))
+    for X, y in holdout:
+        np.add.at(confusion, (np.searchsorted(classes, y), np.searchsorted(classes, estimator.predict(scaler.transform(X=X)[:, :2]))), 1)
+    metrics = holdout_metrics(confusion=confusion)
+
+    y_true = np.concatenate([y for _, y in holdout])
+    y_pred = estimator.predict(scaler.transform(X=np.vstack([X for X, _ in holdout]))[:, :2])
+    assert metrics['accuracy'] == pytest.approx(accuracy_score(y_true, y_pred))
+    assert metrics['precision'] == pytest.approx(precision_score(y_true, y_pred, labels=classes, average='macro', zero_division=0))
+    assert metrics['recall'] == pytest.approx(recall_score(y_true, y_pred, labels=classes, average='macro', zero_division=0))
+
+
+def test_metrics_average_over_every_class():
+    y_true = np.array([0, 0, 1, 1, 1, 3])  # class 2 is not in the holdout
+    y_pred = np.array([0, 1, 1, 1, 0, 1])  # class 3 is never predicted
+    classes = np.arange(0, 4, 1)
+    confusion = np.zeros(shape=(4, 4))
+    np.add.at(confusion, (y_true, y_pred), 1)
+    metrics = holdout_metrics(confusion=confusion)
+
+    assert metrics['precision'] == pytest.approx(precision_score(y_true, y_pred, labels=classes, average='macro', zero_division=0))
+    assert metrics['recall'] == pytest.approx(recall_score(y_true, y_pred, labels=classes, average='macro', zero_division=0))
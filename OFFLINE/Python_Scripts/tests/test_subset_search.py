@@ -0,0 +1,54 @@
+# SUBSETSEARCH.PY TESTS AGAINST THE SKLEARN MODELS
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: 6 features of different scales, so every subset is checked (63) and the GaussianNB var_smoothing groups differ
+
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+from sklearn.naive_bayes import ComplementNB, GaussianNB
+from SubsetSearch import FoldStatistics, subset_masks, subset_models, rankSubsets
+
+
+sklearn_models = {'lda': lambda: LinearDiscriminantAnalysis(solver='lsqr'), 'gnb': GaussianNB, 'cnb': ComplementNB}
+
+
+def fold_data(seed: int = 0) -> tuple:
+    """
+    Non-negative features of 3 classes scaled from 1e-5 to 10 (the GaussianNB smoothing outweighs the smallest variances), split into a training and a test fold
+
+    : rtype: tuple
+    """
+
+    X, y = make_classification(n_samples=400, n_features=6, n_informative=4, n_redundant=1, n_classes=3, random_state=seed)
+    X = (X - X.min(axis=0)) / (X.max(axis=0) - X.min(axis=0)) * np.logspace(-5, 1, 6)
+
+    return X[:300], y[:300], X[300:], y[300:]
+
+
+@pytest.mark.parametrize('model', ['lda', 'gnb', 'cnb'])
+def test_predictions_match_sklearn(model):
+    X_train, y_train, X_test, _ = fold_data()
+    masks = subset_masks(n_features=X_train.shape[1])
+    stats = FoldStatistics(X_train=X_train, y_train=y_train)
+    predictions = stats.classes[subset_models[model](stats=stats, X_test=X_test, masks=masks)]
+
+    assert masks.shape[0] == 63
+    for mask, predicted in zip(masks, predictions):
+        expected = sklearn_models[model]().fit(X_train[:, mask], y_train).predict(X_test[:, mask])
+        np.testing.assert_array_equal(predicted, expected, err_msg=f"{model} subset {np.flatnonzero(mask).tolist()}")
+
+
+def test_rank_subsets_matches_cross_val_score():
+    X, y, _, _ = fold_data(seed=1)
+    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=0)
+    table = rankSubsets(X=X, y=y, cv=cv)
+
+    assert table.shape[0] == 3 * 63
+    assert (np.diff(table['mean_test_score'].to_numpy()) <= 0).all()
+    for _, row in table.iloc[::17].iterrows():
+        expected = cross_val_score(estimator=sklearn_models[row['model']](), X=X[:, list(row['indexes'])], y=y, cv=cv)
+        assert row['mean_test_score'] == pytest.approx(expected.mean())
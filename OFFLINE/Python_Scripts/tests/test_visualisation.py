@@ -0,0 +1,66 @@
+# VISUALISATION.PY DISTRIBUTION STATISTICS REGRESSION TESTS
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Covers the former channel mix-ups (hj_m read from ch0 for both channels, ch0 min paired with ch1 max, i += c indexing)
+
+
+import numpy as np
+import pandas as pd
+import pytest
+import tables as tb
+from config import NUM_GESTURES, NUM_CHANNELS, feature_names, extracted_features
+from Tools.Visualisation import featureStatistics, distribution_arrays, loadStatistics
+from Tools.Synthetic import syntheticFeatureFile
+from Dataset import readFeatures
+
+
+def synthetic_table(rows_per_gesture: int = 30, missing: int = 3, seed: int = 0) -> pd.DataFrame:
+    """
+    Feature table whose channels and gestures cover disjoint value ranges, one gesture without rows
+
+    : rtype: pd.DataFrame
+    """
+
+    rng = np.random.default_rng(seed=seed)
+    labels = np.repeat([g for g in range(0, NUM_GESTURES, 1) if g != missing], rows_per_gesture)
+    data = {'label': labels}
+    for name in feature_names:
+        cha = int(name[2])
+        data[name] = (100.0 * cha + 10.0 * labels + rng.random(size=labels.shape[0]) * (1.0 + cha)).astype(np.float32)
+
+    return pd.DataFrame(data=data)
+
+
+@pytest.mark.parametrize('feature', extracted_features)
+def test_distribution_matches_numpy(feature):
+    table = synthetic_table()
+    mean, errors = distribution_arrays(stats=featureStatistics(dataframe=table), feature=feature)
+
+    assert mean.shape == (NUM_GESTURES * NUM_CHANNELS,) and errors.shape == (2, NUM_GESTURES * NUM_CHANNELS)
+    for ges in range(0, NUM_GESTURES, 1):
+        for cha in range(0, NUM_CHANNELS, 1):
+            i = ges * NUM_CHANNELS + cha
+            values = table.loc[table['label'] == ges, 'ch' + str(object=cha) + '_' + feature].to_numpy(dtype=np.float64)
+            if values.shape[0] == 0:
+                assert np.isnan(mean[i]) and np.isnan(errors[:, i]).all()
+                continue
+            np.testing.assert_allclose(mean[i], values.mean(), rtol=1e-12)
+            np.testing.assert_allclose(mean[i] - errors[0, i], values.min(), rtol=1e-12)
+            np.testing.assert_allclose(mean[i] + errors[1, i], values.max(), rtol=1e-12)
+
+
+def test_statistics_from_file(tmp_path):
+    hdfFile = str(tmp_path / 'Feature_Data.h5')
+    syntheticFeatureFile(hdfFile=hdfFile, sessions=2, repetitions=5)
+    with tb.open_file(filename=hdfFile, mode='r') as h5file:
+        rows = readFeatures(h5file=h5file, fields=['label'] + feature_names)
+    stats = loadStatistics(hdfFile=hdfFile)
+
+    for feature in extracted_features:
+        mean, errors = distribution_arrays(stats=stats['all'], feature=feature)
+        for ges in range(0, NUM_GESTURES, 1):
+            for cha in range(0, NUM_CHANNELS, 1):
+                i = ges * NUM_CHANNELS + cha
+                values = rows['ch' + str(object=cha) + '_' + feature][rows['label'] == ges].astype(np.float64)
+                np.testing.assert_allclose([mean[i] - errors[0, i], mean[i], mean[i] + errors[1, i]],
+                                           [values.min(), values.mean(), values.max()], rtol=1e-12)
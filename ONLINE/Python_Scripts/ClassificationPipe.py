@@ -0,0 +1,327 @@
+# ONLINE CLASSIFICATION PIPELINE
+# STATUS: WORKING
+# LAST UPDATED: 18/10/2026
+# NOTE: Expects the 32 byte '@HfffHHfff' feature struct (channel number first) sent for each channel
+# NOTE: Bytes are buffered across reads and the stream is realigned on the next valid channel 0/channel 1 pair after corrupted or lost bytes
+
+
+import os
+import queue
+import pickle
+import argparse
+import threading
+import serial
+import numpy as np
+import time as tm
+
+
+NUM_CHANNELS = 2
+PACKET_SIZE = 32
+SET_SIZE = PACKET_SIZE * NUM_CHANNELS  # one packet per channel
+BUFFER_CUT_SIZE = 175  # IMPORTANT: must match buffer_cut_size in fdcReceiver.ino (upper bound of zc and wa)
+ACQUISITION_WINDOW = 5.0  # s (500 datapoints at 100 Hz)
+MODEL_VERSION = 1  # IMPORTANT: must match that in OFFLINE/Python_Scripts/ModelExport.py
+
+# Numpy equivalent of the '@HfffHHfff' feature struct
+packet_dtype = np.dtype({'names': ['channel', 'mav', 'rms', 'wl', 'zc', 'wa', 'hj_a', 'hj_m', 'hj_c'],
+                         'formats': ['<u2', '<f4', '<f4', '<f4', '<u2', '<u2', '<f4', '<f4', '<f4'],
+                         'offsets': [0, 4, 8, 12, 16, 18, 20, 24, 28],
+                         'itemsize': PACKET_SIZE})
+packet_features = ['mav', 'rms', 'wl', 'zc', 'wa', 'hj_a', 'hj_m', 'hj_c']
+
+modelFile = os.path.join(os.getcwd(), 'Gesture_Model.pkl')
+
+
+def loadModel(modelFile: str) -> dict:
+    """
+    Load the scaler parameters, selected feature indexes, model and gesture map exported by the offline classification process
+
+    STATUS: WORKING
+
+    : param modelFile: model filename
+    : type modelFile: string
+    : return: model dictionary
+    : rtype: dict
+    """
+
+    with open(file=modelFile, mode='rb') as f:
+        model = pickle.load(file=f)
+    if model.get('version') != MODEL_VERSION:
+        raise ValueError(f"{modelFile} has model version {model.get('version')}, expected {MODEL_VERSION}")
+    model['dtype'] = np.dtype(model['dtype'])  # precision the scaler was fitted in
+    model['scaler_min'] = np.asarray(model['scaler_min'], dtype=model['dtype'])
+    model['scaler_scale'] = np.asarray(model['scaler_scale'], dtype=model['dtype'])
+    model['feature_indexes'] = np.asarray(model['feature_indexes'], dtype=np.intp)
+
+    return model
+
+
+def validSet(packets: np.ndarray) -> bool:
+    """
+    Check a channel 0/channel 1 packet pair is plausible, as validSets in OFFLINE/Python_Scripts/FeatureCollection.py
+
+    : rtype: boolean
+    """
+
+    if packets['channel'][0] != 0 or packets['channel'][1] != 1:
+        return False
+    if (packets['zc'] > BUFFER_CUT_SIZE).any() or (packets['wa'] > BUFFER_CUT_SIZE).any():
+        return False
+    with np.errstate(invalid='ignore', over='ignore'):
+        for feature in ('mav', 'rms', 'wl', 'hj_a'):
+            if not (np.isfinite(packets[feature]) & (packets[feature] >= 0)).all():
+                return False
+        flat = packets['hj_a'] == 0  # the firmware sends nan mobility and complexity for a flat window
+        for feature in ('hj_m', 'hj_c'):
+            if not ((np.isfinite(packets[feature]) & (packets[feature] >= 0)) | (flat & np.isnan(packets[feature]))).all():
+                return False
+        mav = packets['mav'].astype(np.float64)
+        rms = packets['rms'].astype(np.float64)
+        return bool((np.abs(packets['hj_a'] - (rms**2 - mav**2)) <= 1e-6 * rms**2).all())
+
+
+def find_sync(data: bytes, start: int) -> int:
+    """
+    Offset of the first valid packet set at or after start (None if there is none in data)
+
+    : rtype: integer
+    """
+
+    raw = np.frombuffer(buffer=data, dtype=np.uint8)
+    candidates = np.arange(start=start, stop=max(start, len(data) - SET_SIZE + 1), step=1)
+    candidates = candidates[(raw[candidates] == 0) & (raw[candidates + 1] == 0) & (raw[candidates + PACKET_SIZE] == 1) & (raw[candidates + PACKET_SIZE + 1] == 0)]
+    for offset in candidates:
+        if validSet(packets=np.frombuffer(buffer=data, dtype=packet_dtype, count=NUM_CHANNELS, offset=int(offset))):
+            return int(offset)
+    return None
+
+
+def joinPackets(ch0_packet: bytes, ch1_packet: bytes) -> np.ndarray:
+    """
+    Decode the channel 0 and channel 1 feature packets and join them into one feature vector
+
+    The feature vector is ordered as the offline feature_names, i.e. ch0_mav, ch1_mav, ch0_rms, ch1_rms, ...
+
+    STATUS: WORKING
+
+    : param ch0_packet: channel 0 feature packet
+    : type ch0_packet: bytes
+    : param ch1_packet: channel 1 feature packet
+    : type ch1_packet: bytes
+    : return: feature vector of shape (1, 16)
+    : rtype: np.ndarray
+    """
+
+    packets = np.frombuffer(buffer=ch0_packet + ch1_packet, dtype=packet_dtype)
+    if packets['channel'][0] != 0 or packets['channel'][1] != 1:
+        raise ValueError(f"EXPECTED DATA FOR CHANNELS [0, 1], RECEIVED DATA FOR CHANNELS {list(packets['channel'])}")
+    features = np.empty(shape=(len(packet_features), NUM_CHANNELS), dtype=np.float64)
+    for f, feature in enumerate(packet_features):
+        features[f] = packets[feature]
+
+    return features.reshape(1, -1)
+
+
+class LatencyCounter:
+    """
+    Running latency statistics for a single pipeline stage
+
+    STATUS: WORKING
+    """
+
+    def __init__(self, name: str, history: int = 1024) -> None:
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = np.zeros(shape=history, dtype=np.float64)
+
+    def add(self, seconds: float) -> None:
+        self.recent[self.count % self.recent.shape[0]] = seconds
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def summary(self) -> str:
+        if self.count == 0:
+            return f"{self.name:>8}: no samples"
+        recent = self.recent[:min(self.count, self.recent.shape[0])]
+        return (f"{self.name:>8}: n={self.count} mean={self.total/self.count*1e3:.3f} ms "
+                f"p99={np.percentile(a=recent, q=99)*1e3:.3f} ms max={self.max*1e3:.3f} ms")
+
+
+class ClassificationPipe:
+    """
+    Long-running pipeline: serial reader thread -> bounded queue -> decode -> scale -> predict -> emit
+
+    When the queue is full the oldest packet is dropped, so predictions are never made on stale data.
+
+    STATUS: WORKING
+    """
+
+    stages = ['queue', 'decode', 'scale', 'predict', 'total']
+
+    def __init__(self, link, model: dict, queue_size: int = 8, emit=None) -> None:
+        self.link = link
+        self.model = model
+        self.packets = queue.Queue(maxsize=queue_size)
+        self.emit = emit if emit is not None else self.print_prediction
+        self.latency = {s: LatencyCounter(name=s) for s in self.stages}
+        self.dropped = 0
+        self.misaligned = 0  # resynchronisations after corrupted or lost bytes
+        self.discarded = 0  # bytes skipped while resynchronising
+        self.unclassified = 0  # sets the model rejected (e.g. nan Hjorth features of a flat window)
+        self.resyncing = False
+        self.predictions = 0
+        self.link_error = None  # exception that stopped the reader (e.g. SerialException when the device is unplugged)
+        self.running = threading.Event()
+        self.reader = threading.Thread(target=self.read, name='ClassificationPipe.read', daemon=True)
+
+    def split_sets(self, buffer: bytearray) -> list:
+        """
+        Remove all complete packet sets from the start of the buffer, skipping bytes up to the next valid set when the
+        set at the start is invalid; an incomplete set is left in the buffer for the next read
+
+        : param buffer: received bytes, removed in place
+        : type buffer: bytearray
+        : return: channel 0 + channel 1 packet bytes of each set
+        : rtype: list
+        """
+
+        sets = []
+        while len(buffer) >= SET_SIZE:
+            data = bytes(buffer)  # numpy views would block resizing the buffer
+            if validSet(packets=np.frombuffer(buffer=data, dtype=packet_dtype, count=NUM_CHANNELS)):
+                sets.append(data[:SET_SIZE])
+                del buffer[:SET_SIZE]
+                self.resyncing = False
+                continue
+            if not self.resyncing:
+                self.misaligned += 1
+                self.resyncing = True
+            sync = find_sync(data=data, start=1)
+            skip = sync if sync is not None else len(data) - SET_SIZE + 1  # keep a tail that may start a set
+            self.discarded += skip
+            del buffer[:skip]
+
+        return sets
+
+    def read(self) -> None:
+        """
+        Read the serial link into a byte buffer and put each complete packet set in the bounded queue, until stopped or
+        the link fails
+        """
+
+        buffer = bytearray()
+        while self.running.is_set():
+            try:
+                buffer += self.link.read(size=SET_SIZE)  # short on timeout, the bytes are kept for the next read
+            except OSError as error:  # serial.SerialException is an OSError
+                self.link_error = error
+                return
+            for packet_set in self.split_sets(buffer=buffer):
+                item = (tm.perf_counter(), packet_set)
+                try:
+                    self.packets.put_nowait(item)
+                except queue.Full:
+                    try:
+                        self.packets.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+                    self.packets.put_nowait(item)
+
+    def classify(self, ch0_packet: bytes, ch1_packet: bytes) -> int:
+        """
+        Classify one pair of channel packets, recording the latency of each stage
+
+        : return: predicted gesture label
+        : rtype: integer
+        """
+
+        start = tm.perf_counter()
+        features = joinPackets(ch0_packet=ch0_packet, ch1_packet=ch1_packet)
+        decoded = tm.perf_counter()
+        scaled = (features.astype(self.model['dtype']) * self.model['scaler_scale'] + self.model['scaler_min'])[:, self.model['feature_indexes']]
+        transformed = tm.perf_counter()
+        label = int(self.model['model'].predict(scaled)[0])
+        predicted = tm.perf_counter()
+        self.latency['decode'].add(seconds=decoded - start)
+        self.latency['scale'].add(seconds=transformed - decoded)
+        self.latency['predict'].add(seconds=predicted - transformed)
+
+        return label
+
+    def print_prediction(self, label: int, latency: float) -> None:
+        print(f"Gesture: {self.model['gesture_map'][label]} ({latency*1e3:.3f} ms)")
+
+    def run(self) -> None:
+        """
+        Run the pipeline until interrupted
+        """
+
+        self.running.set()
+        self.reader.start()
+        try:
+            while True:
+                try:
+                    arrival, packet_set = self.packets.get(timeout=0.5)
+                except queue.Empty:
+                    if not self.reader.is_alive():
+                        raise RuntimeError(f"Serial reader stopped: {self.link_error}") from self.link_error
+                    continue
+                self.latency['queue'].add(seconds=tm.perf_counter() - arrival)
+                try:
+                    label = self.classify(ch0_packet=packet_set[:PACKET_SIZE], ch1_packet=packet_set[PACKET_SIZE:])
+                except ValueError:
+                    self.unclassified += 1
+                    continue
+                latency = tm.perf_counter() - arrival
+                self.latency['total'].add(seconds=latency)
+                self.predictions += 1
+                self.emit(label, latency)
+        finally:
+            self.running.clear()
+
+    def report(self) -> None:
+        print(f"\nPredictions: {self.predictions}, Dropped Sets: {self.dropped}, Unclassified Sets: {self.unclassified}, "
+              f"Resynchronisations: {self.misaligned} ({self.discarded} bytes discarded)")
+        for s in self.stages:
+            print(self.latency[s].summary())
+        if self.latency['total'].count:
+            print(f"Worst-case decision latency is {self.latency['total'].max/ACQUISITION_WINDOW*100.0:.4f}% of one {ACQUISITION_WINDOW} s acquisition window")
+
+
+def main() -> None:
+    """
+    Main function
+
+    STATUS: WORKING
+    """
+
+    parser = argparse.ArgumentParser(prog='PROG', description='Online gesture classification.')
+    parser.add_argument('--port', required=True, type=str, help='serial port (e.g. COM3 or /dev/ttyACM0)')
+    parser.add_argument('--baud', default=115200, type=int, help='baudrate (default: %(default)s)')
+    parser.add_argument('--model', default=modelFile, type=str, help='persisted model file (default: %(default)s)')
+    parser.add_argument('--queue', default=8, type=int, help='input queue size in channel 0/channel 1 packet sets (default: %(default)s)')
+    args = parser.parse_args()
+
+    model = loadModel(modelFile=args.model)
+    link = serial.Serial(port=args.port, baudrate=args.baud, bytesize=serial.EIGHTBITS, timeout=1.0, parity=serial.PARITY_NONE)
+    link.reset_input_buffer()
+    pipe = ClassificationPipe(link=link, model=model, queue_size=args.queue)
+    print("STARTING ONLINE CLASSIFICATION...")
+    try:
+        pipe.run()
+    except KeyboardInterrupt:
+        print("EXITING...")
+    except RuntimeError as error:
+        print(f"{error}, EXITING...")
+    finally:
+        link.close()
+        pipe.report()
+
+
+if __name__ == '__main__':
+    main()